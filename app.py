@@ -1,10 +1,28 @@
-import pandas as pd
-import numpy as np
+import math
 import os
-from flask import Flask, render_template, request, send_file
-from flask_sqlalchemy import SQLAlchemy
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
-from reportlab.lib.styles import getSampleStyleSheet
+import tempfile
+import threading
+import time
+import click
+from flask import Flask, render_template, request, send_file, jsonify
+from sqlalchemy import func, insert, inspect, select, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from config import Config
+from database import db, pool_status
+from dashboard import dashboard
+from material_store import MaterialStore
+from cache import RankingCache
+from scoring import (DEFAULT_PROFILE, FRAGILITY_FACTOR, PROFILE_COMPONENTS,
+                     SENSITIVITY_EXCLUDED_CATEGORIES, MaterialFilter)
+from predictions import ModelsUnavailable, PredictionStore
+from similar_shipments import HistoryUnavailable, ShipmentIndexStore
+from write_behind import WriteBehindQueue
+from exports import XLSX_MIMETYPE, stream_result, write_excel
+from reports import ReportJobs, build_pdf
+from history import (before_cursor, encode_cursor, parse_date_range, range_filter,
+                     range_key, utc_timestamp, utcnow)
+import rollups
 
 app = Flask(__name__)
 
@@ -12,16 +30,12 @@ app = Flask(__name__)
 # DATABASE CONFIG
 # ==============================
 
-DATABASE_URL = os.environ.get("DATABASE_URL")
+# URL, pool sizing and driver all come from config.py / database.py, and
+# the same engine is shared with the dashboard blueprint.
+app.config.from_object(Config)
+db.init_app(app)
 
-# Fix for Render postgres URL
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-
-app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db = SQLAlchemy(app)
+app.register_blueprint(dashboard)
 
 # ==============================
 # DATABASE MODEL
@@ -40,6 +54,71 @@ class Recommendation(db.Model):
     total_co2 = db.Column(db.Float)
     strength = db.Column(db.Float)
     sustainability_score = db.Column(db.Float)
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow,
+                           server_default=utc_timestamp(), index=True)
+
+    # Per-material history in time order, for /api/recommendations?material=
+    __table_args__ = (
+        db.Index("ix_recommendation_material_created_at", "best_material", "created_at"),
+    )
+
+
+class WeightProfile(db.Model):
+    __tablename__ = "weight_profile"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    eco_weight = db.Column(db.Float, nullable=False)
+    cost_weight = db.Column(db.Float, nullable=False)
+    biodeg_weight = db.Column(db.Float, nullable=False)
+    strength_weight = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+
+    def weights(self):
+        return (self.eco_weight, self.cost_weight, self.biodeg_weight, self.strength_weight)
+
+# ==============================
+# SAVING RECOMMENDATIONS
+# ==============================
+
+# Optional write-behind: respond first, insert in background batches
+write_behind = None
+
+if os.environ.get("WRITE_BEHIND") == "1":
+    write_behind = WriteBehindQueue(
+        app, db, Recommendation,
+        batch_size=int(os.environ.get("WRITE_BEHIND_BATCH_SIZE", 500)),
+        flush_interval=float(os.environ.get("WRITE_BEHIND_FLUSH_INTERVAL", 1.0))
+    ).start()
+
+
+def recommendation_row(item, weight, units, fragility, best):
+    return {
+        "item": str(item),
+        "weight": float(weight),
+        "units": int(units),
+        "fragility": str(fragility),
+        "best_material": str(best["Material"]),
+        "total_cost": float(best["Total_Cost"]),
+        "total_co2": float(best["Total_CO2"]),
+        "strength": float(best["Strength"]),
+        "sustainability_score": float(best["Score"]),
+        # Stamped now, not when a write-behind batch reaches the database
+        "created_at": utcnow()
+    }
+
+
+def save_recommendations(rows):
+    if not rows:
+        return
+
+    if write_behind is not None:
+        write_behind.submit_many(rows)
+        return
+
+    # One executemany INSERT however many rows there are
+    db.session.execute(insert(Recommendation), rows)
+    db.session.commit()
 
 # ==============================
 # LOAD DATASET
@@ -48,11 +127,126 @@ class Recommendation(db.Model):
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 csv_path = os.path.join(BASE_DIR, "data", "final", "ml_dataset.csv")
 
-df = pd.read_csv(csv_path)
+# Compiled, memory-mapped copy of the CSV; see material_store.py
+material_store = MaterialStore.from_env(csv_path)
+material_store.get()
+
+# Number of ranked materials returned per shipment
+TOP_K = int(os.environ.get("RECOMMENDATION_TOP_K", 5))
+MAX_TOP_K = int(os.environ.get("RECOMMENDATION_MAX_TOP_K", 50))
+
+ranking_cache = RankingCache(int(os.environ.get("RANKING_CACHE_SIZE", 1024)))
+
+# ML-predicted ranking (notebooks/06), served from precomputed per-material
+# predictions; see predictions.py
+RANKING_MODES = ("rules", "ml")
+prediction_store = PredictionStore.from_env(material_store)
+
+
+# Built-in weights of the sustainability score; not stored in the database
+DEFAULT_PROFILE_NAME = "default"
+
+# The form's profile list is cached per process for this many seconds;
+# saving or deleting a profile refreshes it at once in the worker that did
+PROFILE_NAMES_TTL = float(os.environ.get("PROFILE_NAMES_TTL", 30))
+
+_profile_names = None
+_profile_names_at = 0.0
+_profile_names_lock = threading.Lock()
+
+
+def profile_names():
+    """Names of the stored profiles for the home form, without a database
+    round trip on most requests; empty while the table does not exist."""
+    global _profile_names, _profile_names_at
+
+    with _profile_names_lock:
+        if _profile_names is not None and time.monotonic() - _profile_names_at < PROFILE_NAMES_TTL:
+            return _profile_names
+
+        try:
+            names = db.session.execute(
+                select(WeightProfile.name).order_by(WeightProfile.name)).scalars().all()
+        except SQLAlchemyError:
+            # e.g. a deployment that has not created weight_profile yet
+            db.session.rollback()
+            app.logger.warning("Weight profiles unavailable", exc_info=True)
+            names = []
+
+        _profile_names, _profile_names_at = names, time.monotonic()
+        return names
+
+
+def forget_profile_names():
+    global _profile_names
+
+    with _profile_names_lock:
+        _profile_names = None
+
+
+def profile_weights(name):
+    """(eco, cost, biodeg, strength) weights of a stored profile, or None
+    for the default ones; raises LookupError for an unknown name."""
+    if not name or name == DEFAULT_PROFILE_NAME:
+        return None
+
+    profile = db.session.execute(
+        select(WeightProfile).where(WeightProfile.name == name)).scalar_one_or_none()
+
+    if profile is None:
+        raise LookupError(name)
+
+    weights = profile.weights()
+    return None if weights == DEFAULT_PROFILE else weights
+
+
+def _checked(value):
+    # Form checkboxes send "on"; JSON sends booleans
+    return value in (True, "on", "1", "true", "yes")
+
+
+def material_filter(values):
+    """MaterialFilter from the form or a batch payload's "filters" object;
+    None when nothing is constrained. Raises ValueError for bad or
+    non-finite numbers.
+
+    Keys: temp / moisture (sensitivity flags, see scoring.py), category
+    (name or list), biodegradable_only, max_cost, max_co2, max_density.
+    """
+    excluded = sorted({category
+                       for flag, categories in SENSITIVITY_EXCLUDED_CATEGORIES.items()
+                       if _checked(values.get(flag))
+                       for category in categories})
+
+    categories = values.get("category") or ()
+    if isinstance(categories, str):
+        categories = (categories,)
+
+    bounds = {}
+    for name in ("max_cost", "max_co2", "max_density"):
+        value = values.get(name)
+        bounds[name] = None if value in (None, "") else float(value)
+
+        # NaN compares false with everything, and inf is no bound at all
+        if bounds[name] is not None and not math.isfinite(bounds[name]):
+            raise ValueError(f"{name} must be a finite number")
 
-df["Cost_per_kg"] = pd.to_numeric(df["Cost_per_kg"], errors="coerce")
-df["CO2_Emission_kg"] = pd.to_numeric(df["CO2_Emission_kg"], errors="coerce")
-df["Tensile_Strength_MPa"] = pd.to_numeric(df["Tensile_Strength_MPa"], errors="coerce")
+    material_filter = MaterialFilter(
+        categories=tuple(sorted(str(category) for category in categories)),
+        excluded_categories=tuple(excluded),
+        biodegradable=True if _checked(values.get("biodegradable_only")) else None,
+        **bounds
+    )
+
+    return None if material_filter == MaterialFilter() else material_filter
+
+
+def rank_shipment(mode, weight, units, fragility, k, profile=None, constraints=None):
+    if mode == "ml":
+        return prediction_store.get().rank(weight, units, fragility, k=k)
+
+    return ranking_cache.rank(material_store.get(), weight, units, fragility, k=k,
+                              profile=profile, material_filter=constraints)
 
 # ==============================
 # HOME ROUTE
@@ -72,162 +266,589 @@ def home():
             weight = float(request.form.get("weight"))
             units = int(request.form.get("units"))
             fragility = request.form.get("fragility")
+            k = int(request.form.get("k") or TOP_K)
+            mode = request.form.get("mode") or "rules"
+            profile = profile_weights(request.form.get("profile"))
+            constraints = material_filter(request.form)
         except:
             return "Invalid form input", 400
 
+        if weight <= 0 or not 1 <= k <= MAX_TOP_K or mode not in RANKING_MODES:
+            return "Invalid form input", 400
+
+        if mode == "ml" and (profile is not None or constraints is not None):
+            return "Weight profiles and filters only apply to the sustainability score", 400
+
         form_data = request.form
 
-        max_cost = float(df["Cost_per_kg"].max())
-        max_co2 = float(df["CO2_Emission_kg"].max())
+        try:
+            results = rank_shipment(mode, weight, units, fragility, k, profile, constraints)
+        except ModelsUnavailable as exc:
+            return f"ML ranking unavailable: {exc}", 503
+
+        if results:
+            top5 = results
+            best = top5[0]
+
+            # Save ONLY core values to DB
+            save_recommendations([
+                recommendation_row(item, weight, units, fragility, best)
+            ])
 
-        fragility_factor = {"L": 1, "M": 1.5, "H": 2}
-        f_factor = fragility_factor.get(fragility, 1)
+    return render_template("index.html", top5=top5, best=best, form_data=form_data,
+                           profiles=profile_names(),
+                           categories=[str(c) for c in material_store.get().category_labels if c])
+
+# ==============================
+# BATCH RECOMMENDATION API
+# ==============================
 
-        results = []
+BATCH_MAX_SHIPMENTS = int(os.environ.get("BATCH_MAX_SHIPMENTS", 10000))
 
-        for _, row in df.iterrows():
 
-            if pd.isna(row["Tensile_Strength_MPa"]):
-                continue
+@app.route("/api/recommend/batch", methods=["POST"])
+def recommend_batch():
 
-            material_strength = float(row["Tensile_Strength_MPa"])
-            required_strength = weight * 5 * f_factor
+    payload = request.get_json(silent=True) or {}
+    shipments = payload.get("shipments")
 
-            strength_score = min(material_strength / required_strength, 1)
+    if not isinstance(shipments, list) or not shipments:
+        return jsonify({"error": "shipments must be a non-empty list"}), 400
 
-            eco_score = 1 - (float(row["CO2_Emission_kg"]) / max_co2)
-            cost_score = 1 - (float(row["Cost_per_kg"]) / max_cost)
-            biodeg_score = 1 if row["Biodegradable"] == "Yes" else 0.5
+    if len(shipments) > BATCH_MAX_SHIPMENTS:
+        return jsonify({"error": f"at most {BATCH_MAX_SHIPMENTS} shipments per call"}), 400
 
-            sustainability_score = float(round(
-                (eco_score * 0.3 +
-                 cost_score * 0.25 +
-                 biodeg_score * 0.2 +
-                 strength_score * 0.25) * 100, 2))
+    try:
+        k = int(payload.get("k", TOP_K))
+        mode = str(payload.get("mode", "rules"))
+        profile_name = payload.get("profile")
+        constraints = material_filter(payload.get("filters") or {})
+        items = [str(s.get("item", "")) for s in shipments]
+        weights = [float(s["weight"]) for s in shipments]
+        units = [int(s["units"]) for s in shipments]
+        fragilities = [str(s.get("fragility", "L")) for s in shipments]
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return jsonify({"error": "each shipment needs item, weight, units and fragility, "
+                                 "and filters numeric bounds"}), 400
 
-            total_cost = float(round(float(row["Cost_per_kg"]) * weight * units, 2))
-            total_co2 = float(round(float(row["CO2_Emission_kg"]) * weight * units, 2))
+    if not 1 <= k <= MAX_TOP_K or min(weights) <= 0:
+        return jsonify({"error": f"k must be between 1 and {MAX_TOP_K} and weight positive"}), 400
 
-            # ==============================
-            # WHY RECOMMENDED LOGIC
-            # ==============================
+    if mode not in RANKING_MODES:
+        return jsonify({"error": f"mode must be one of {', '.join(RANKING_MODES)}"}), 400
 
-            reasons = []
+    try:
+        profile = profile_weights(profile_name)
+    except LookupError:
+        return jsonify({"error": f"unknown weight profile {profile_name!r}"}), 400
 
-            if row["Biodegradable"] == "Yes":
-                reasons.append("Biodegradable and eco-friendly")
+    if mode == "ml" and (profile is not None or constraints is not None):
+        return jsonify({"error": "weight profiles and filters only apply to mode rules"}), 400
 
-            if eco_score > 0.7:
-                reasons.append("Very low carbon footprint")
+    if mode == "ml":
+        try:
+            ranking = prediction_store.get()
+        except ModelsUnavailable as exc:
+            return jsonify({"error": f"ML ranking unavailable: {exc}"}), 503
 
-            if cost_score > 0.7:
-                reasons.append("Cost efficient option")
+        rankings = [ranking.rank(weight, unit_count, fragility, k=k)
+                    for weight, unit_count, fragility in zip(weights, units, fragilities)]
+    else:
+        rankings = material_store.get().rank_batch(weights, units, fragilities, k=k,
+                                                   profile=profile, material_filter=constraints)
 
-            if strength_score > 0.8:
-                reasons.append("High structural strength")
+    rows = []
+    response = []
 
-            if sustainability_score > 85:
-                reasons.append("Excellent sustainability performance")
+    for item, weight, unit_count, fragility, ranking in zip(
+            items, weights, units, fragilities, rankings):
 
-            if not reasons:
-                reasons.append("Balanced cost, strength and environmental impact")
+        response.append({
+            "item": item,
+            "weight": weight,
+            "units": unit_count,
+            "fragility": fragility,
+            "recommendations": ranking
+        })
 
-            results.append({
-                "Material": str(row["Material_Name"]),
-                "Total_Cost": total_cost,
-                "Total_CO2": total_co2,
-                "Strength": material_strength,
-                "Score": sustainability_score,
-                "Reasons": ", ".join(reasons)
-            })
+        if ranking:
+            rows.append(recommendation_row(item, weight, unit_count, fragility, ranking[0]))
 
-        results = sorted(results, key=lambda x: x["Score"], reverse=True)
+    save_recommendations(rows)
 
-        if results:
-            top5 = results[:5]
-            best = top5[0]
+    return jsonify({"results": response})
 
-            # Save ONLY core values to DB
-            new_entry = Recommendation(
-                item=str(item),
-                weight=float(weight),
-                units=int(units),
-                fragility=str(fragility),
-                best_material=str(best["Material"]),
-                total_cost=float(best["Total_Cost"]),
-                total_co2=float(best["Total_CO2"]),
-                strength=float(best["Strength"]),
-                sustainability_score=float(best["Score"])
-            )
 
-            db.session.add(new_entry)
-            db.session.commit()
+@app.route("/api/pareto")
+def pareto():
+    """Materials no other material beats on cost, CO2 and strength at
+    once, among those strong enough for the shipment.
+
+    Query args: weight (kg), units (default 1), fragility (L/M/H, default
+    L). The front is precomputed per material snapshot; this only cuts it
+    at the required strength.
+    """
+
+    try:
+        weight = float(request.args["weight"])
+        units = int(request.args.get("units", 1))
+        fragility = request.args.get("fragility", "L")
+    except (KeyError, ValueError):
+        return jsonify({"error": "weight must be a number and units an integer"}), 400
+
+    if weight <= 0 or units <= 0 or fragility not in FRAGILITY_FACTOR:
+        return jsonify({"error": "weight and units must be positive, fragility L, M or H"}), 400
+
+    engine = material_store.get()
+
+    return jsonify({
+        "required_strength": weight * 5 * FRAGILITY_FACTOR[fragility],
+        "dataset_version": engine.version,
+        "results": engine.pareto(weight, units, fragility)
+    })
+
+
+@app.route("/api/weight_sweep")
+def weight_sweep():
+    """Where in a weight range the top-k ranking changes.
+
+    Query args: min_weight, max_weight (kg), fragility (L/M/H, default L)
+    and k. Returns the breakpoint weights and, for every interval between
+    them, its winner and top-k materials.
+    """
+
+    try:
+        min_weight = float(request.args["min_weight"])
+        max_weight = float(request.args["max_weight"])
+        fragility = request.args.get("fragility", "L")
+        k = int(request.args.get("k", TOP_K))
+    except (KeyError, ValueError):
+        return jsonify({"error": "min_weight and max_weight must be numbers"}), 400
+
+    if not 0 < min_weight < max_weight or fragility not in FRAGILITY_FACTOR:
+        return jsonify({"error": "need 0 < min_weight < max_weight and fragility L, M or H"}), 400
+
+    if not 1 <= k <= MAX_TOP_K:
+        return jsonify({"error": f"k must be between 1 and {MAX_TOP_K}"}), 400
+
+    engine = material_store.get()
+    breakpoints, intervals = engine.weight_sweep(fragility, min_weight, max_weight, k=k)
+
+    return jsonify({
+        "dataset_version": engine.version,
+        "breakpoints": breakpoints,
+        "intervals": [{
+            "from_weight": start,
+            "to_weight": end,
+            "winner": str(engine.names[order[0]]),
+            "ranking": [str(engine.names[i]) for i in order]
+        } for start, end, order in intervals]
+    })
 
-    return render_template("index.html", top5=top5, best=best, form_data=form_data)
+
+# ==============================
+# WEIGHT PROFILES API
+# ==============================
+
+def profile_json(name, weights, updated_at=None):
+    return {
+        "name": name,
+        **dict(zip(PROFILE_COMPONENTS, weights)),
+        "updated_at": updated_at.isoformat() if updated_at else None
+    }
+
+
+@app.route("/api/profiles")
+def list_profiles():
+    profiles = db.session.execute(select(WeightProfile).order_by(WeightProfile.name)).scalars()
+
+    return jsonify({"profiles": [profile_json(DEFAULT_PROFILE_NAME, DEFAULT_PROFILE)] + [
+        profile_json(profile.name, profile.weights(), profile.updated_at)
+        for profile in profiles
+    ]})
+
+
+@app.route("/api/profiles/<name>", methods=["PUT"])
+def save_profile(name):
+    """Create or replace a profile from {"eco", "cost", "biodeg",
+    "strength"}; the weights are scaled to sum to 1, which keeps scores on
+    the 0-100 scale."""
+
+    payload = request.get_json(silent=True) or {}
+
+    try:
+        weights = [float(payload[component]) for component in PROFILE_COMPONENTS]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": f"weights {', '.join(PROFILE_COMPONENTS)} are required"}), 400
+
+    if name == DEFAULT_PROFILE_NAME or len(name) > 100:
+        return jsonify({"error": f"profile name {name!r} is not allowed"}), 400
+
+    if min(weights) < 0 or sum(weights) <= 0:
+        return jsonify({"error": "weights must be non-negative and not all zero"}), 400
+
+    total = sum(weights)
+    weights = [w / total for w in weights]
+
+    profile = db.session.execute(
+        select(WeightProfile).where(WeightProfile.name == name)).scalar_one_or_none()
+
+    if profile is None:
+        profile = WeightProfile(name=name)
+        db.session.add(profile)
+
+    (profile.eco_weight, profile.cost_weight,
+     profile.biodeg_weight, profile.strength_weight) = weights
+    db.session.commit()
+    forget_profile_names()
+
+    return jsonify(profile_json(profile.name, profile.weights(), profile.updated_at))
+
+
+@app.route("/api/profiles/<name>", methods=["DELETE"])
+def delete_profile(name):
+    profile = db.session.execute(
+        select(WeightProfile).where(WeightProfile.name == name)).scalar_one_or_none()
+
+    if profile is None:
+        return jsonify({"error": f"unknown weight profile {name!r}"}), 404
+
+    db.session.delete(profile)
+    db.session.commit()
+    forget_profile_names()
+
+    return jsonify({"deleted": name})
+
+
+@app.route("/api/cache/stats")
+def cache_stats():
+    return jsonify(ranking_cache.stats())
+
+
+@app.route("/api/db/pool")
+def db_pool_stats():
+    return jsonify(pool_status())
+
+
+@app.route("/api/write_behind/stats")
+def write_behind_stats():
+    if write_behind is None:
+        return jsonify({"enabled": False})
+
+    return jsonify({"enabled": True, **write_behind.stats()})
+
+# ==============================
+# SIMILAR PAST SHIPMENTS API
+# ==============================
+
+# KD-tree over the cleaned packaging history; see similar_shipments.py
+shipment_index = ShipmentIndexStore.from_env()
+
+SIMILAR_TOP_K = int(os.environ.get("SIMILAR_SHIPMENTS_TOP_K", 5))
+SIMILAR_MAX_TOP_K = int(os.environ.get("SIMILAR_SHIPMENTS_MAX_TOP_K", 100))
+
+
+@app.route("/api/similar_shipments")
+def similar_shipments():
+    """Past orders most like a shipment, with the packaging they used.
+
+    Query args: weight (kg), length / width / height (cm), fragility
+    (1-10), shipping_mode, distance (km), moisture (0/1, default 0), k.
+    """
+
+    args = request.args
+
+    try:
+        shipment = {
+            "Weight_kg": float(args["weight"]),
+            "L_cm": float(args["length"]),
+            "W_cm": float(args["width"]),
+            "H_cm": float(args["height"]),
+            "Fragility": int(args["fragility"]),
+            "Moisture_Sens": args.get("moisture", "0").lower() in ("1", "true", "yes", "on"),
+            "Shipping_Mode": str(args["shipping_mode"]),
+            "Distance_km": float(args["distance"])
+        }
+        k = int(args.get("k", SIMILAR_TOP_K))
+    except (KeyError, ValueError):
+        return jsonify({"error": "weight, length, width, height, fragility, shipping_mode "
+                                 "and distance are required numbers"}), 400
+
+    if shipment["Weight_kg"] <= 0 or not 1 <= k <= SIMILAR_MAX_TOP_K:
+        return jsonify({"error": f"k must be between 1 and {SIMILAR_MAX_TOP_K} "
+                                 "and weight positive"}), 400
+
+    try:
+        index = shipment_index.get()
+    except HistoryUnavailable as exc:
+        return jsonify({"error": f"packaging history unavailable: {exc}"}), 503
+
+    return jsonify({
+        "shipment": shipment,
+        "history_version": index.version,
+        "results": index.query(shipment, k=k)
+    })
+
+# ==============================
+# RECOMMENDATION HISTORY API
+# ==============================
+
+HISTORY_PAGE_SIZE = int(os.environ.get("HISTORY_PAGE_SIZE", 100))
+HISTORY_MAX_PAGE_SIZE = int(os.environ.get("HISTORY_MAX_PAGE_SIZE", 1000))
+
+
+def in_range(statement, start, end):
+    condition = range_filter(Recommendation.created_at, start, end)
+    return statement if condition is None else statement.where(condition)
+
+
+@app.route("/api/recommendations")
+def recommendation_history():
+    """Newest-first history, paged with a keyset cursor.
+
+    Query args: start / end (ISO dates or datetimes), material, limit and
+    cursor (the next_cursor of the previous page). Each page is an index
+    range scan on created_at, however deep into the history it is.
+    """
+
+    try:
+        start, end = parse_date_range(request.args)
+        limit = int(request.args.get("limit", HISTORY_PAGE_SIZE))
+        cursor = request.args.get("cursor")
+        statement = select(Recommendation)
+
+        if cursor:
+            statement = statement.where(
+                before_cursor(Recommendation.created_at, Recommendation.id, cursor))
+    except ValueError:
+        return jsonify({"error": "invalid start, end, limit or cursor"}), 400
+
+    if not 1 <= limit <= HISTORY_MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {HISTORY_MAX_PAGE_SIZE}"}), 400
+
+    material = request.args.get("material")
+    if material:
+        statement = statement.where(Recommendation.best_material == material)
+
+    statement = in_range(statement, start, end).order_by(
+        Recommendation.created_at.desc(), Recommendation.id.desc()
+    ).limit(limit + 1)
+
+    rows = db.session.execute(statement).scalars().all()
+    page = rows[:limit]
+    next_cursor = None
+
+    if len(rows) > limit:
+        next_cursor = encode_cursor(page[-1].created_at, page[-1].id)
+
+    return jsonify({
+        "results": [{
+            "id": row.id,
+            "item": row.item,
+            "weight": row.weight,
+            "units": row.units,
+            "fragility": row.fragility,
+            "best_material": row.best_material,
+            "total_cost": row.total_cost,
+            "total_co2": row.total_co2,
+            "strength": row.strength,
+            "sustainability_score": row.sustainability_score,
+            "created_at": row.created_at.isoformat()
+        } for row in page],
+        "next_cursor": next_cursor
+    })
 
 # ==============================
 # EXPORT EXCEL
 # ==============================
 
-@app.route("/export_excel")
-def export_excel():
+REPORT_HEADERS = ["Item", "Material", "Cost", "CO2", "Strength (MPa)", "Score"]
+
+
+def report_statement(start=None, end=None, max_id=None):
+    # max_id pins a report to the rows of the version it is cached under
+    statement = in_range(select(
+        Recommendation.item,
+        Recommendation.best_material,
+        Recommendation.total_cost,
+        Recommendation.total_co2,
+        Recommendation.strength,
+        Recommendation.sustainability_score
+    ), start, end)
 
-    data = Recommendation.query.all()
+    if max_id is not None:
+        statement = statement.where(Recommendation.id <= max_id)
 
-    rows = [[
-        r.item,
-        r.best_material,
-        r.total_cost,
-        r.total_co2,
-        r.strength,
-        r.sustainability_score
-    ] for r in data]
+    return statement.order_by(Recommendation.id)
 
-    df_export = pd.DataFrame(rows, columns=[
-        "Item", "Material", "Cost", "CO2",
-        "Strength (MPa)", "Score"
-    ])
 
-    file_path = "sustainability_report.xlsx"
-    df_export.to_excel(file_path, index=False)
+@app.route("/export_excel")
+def export_excel():
+
+    try:
+        start, end = parse_date_range(request.args)
+    except ValueError:
+        return "Invalid date range", 400
 
-    return send_file(file_path, as_attachment=True)
+    rows = stream_result(db.session, report_statement(start, end))
+    output = write_excel(REPORT_HEADERS, rows)
+
+    return send_file(output, mimetype=XLSX_MIMETYPE, as_attachment=True,
+                     download_name="sustainability_report.xlsx")
 
 # ==============================
 # EXPORT PDF
 # ==============================
 
+# Seconds /export_pdf waits for a report before answering with a job id
+PDF_SYNC_WAIT = float(os.environ.get("PDF_SYNC_WAIT", 20))
+
+
+def render_report_pdf(path, start=None, end=None, max_id=None):
+    with app.app_context():
+        rows = stream_result(db.session, report_statement(start, end, max_id))
+        build_pdf(path, "Sustainability Report", REPORT_HEADERS, rows)
+
+
+pdf_reports = ReportJobs(
+    os.environ.get("REPORT_CACHE_DIR",
+                   os.path.join(tempfile.gettempdir(), "ecopack_reports")),
+    "sustainability_report",
+    render_report_pdf
+)
+
+
+def report_version(start=None, end=None):
+    # (job id, highest id in the range). A report is valid until rows in
+    # its range are added (or removed); it is rendered from the rows up to
+    # that id only, so rows arriving while it renders wait for the next one
+    count, max_id = db.session.execute(in_range(
+        select(func.count(Recommendation.id), func.max(Recommendation.id)), start, end)).one()
+    max_id = max_id or 0
+    version = f"{max_id}-{count}"
+
+    if start is None and end is None:
+        return version, max_id
+
+    return f"{range_key(start, end)}-{version}", max_id
+
+
+def report_job(job_id, status):
+    return {
+        "job_id": job_id,
+        "status": status,
+        "status_url": f"/api/reports/pdf/{job_id}",
+        "download_url": f"/api/reports/pdf/{job_id}/download"
+    }
+
+
+def send_report(job_id):
+    return send_file(pdf_reports.path(job_id), mimetype="application/pdf",
+                     as_attachment=True, download_name="sustainability_report.pdf")
+
+
 @app.route("/export_pdf")
 def export_pdf():
 
-    data = Recommendation.query.all()
+    try:
+        start, end = parse_date_range(request.args)
+    except ValueError:
+        return "Invalid date range", 400
+
+    job_id, max_id = report_version(start, end)
+    status = pdf_reports.wait(job_id, PDF_SYNC_WAIT, start, end, max_id)
+
+    if status == "done":
+        return send_report(job_id)
+
+    return jsonify(report_job(job_id, status)), 202
+
+
+@app.route("/api/reports/pdf", methods=["POST"])
+def start_pdf_report():
+
+    try:
+        start, end = parse_date_range(request.get_json(silent=True) or request.args)
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({"error": "invalid start or end"}), 400
+
+    job_id, max_id = report_version(start, end)
+    pdf_reports.submit(job_id, start, end, max_id)
+    status = pdf_reports.status(job_id)
+
+    return jsonify(report_job(job_id, status)), 200 if status == "done" else 202
+
+
+@app.route("/api/reports/pdf/<job_id>")
+def pdf_report_status(job_id):
+
+    status = pdf_reports.status(job_id)
+    code = 404 if status == "unknown" else 200
+
+    return jsonify(report_job(job_id, status)), code
+
+
+@app.route("/api/reports/pdf/<job_id>/download")
+def download_pdf_report(job_id):
+
+    status = pdf_reports.status(job_id)
+
+    if status != "done":
+        return jsonify(report_job(job_id, status)), 404 if status == "unknown" else 409
+
+    return send_report(job_id)
+
+# ==============================
+# CLI COMMANDS
+# ==============================
+
+@app.cli.command("rollups")
+@click.argument("action", type=click.Choice(["compact", "rebuild"]))
+def rollups_command(action):
+    """Fold new history into the dashboard rollups, or rebuild them."""
+
+    with db.engine.begin() as connection:
+        rollups.create_tables(connection)
+
+        if action == "rebuild":
+            folded = rollups.rebuild(connection)
+        else:
+            folded = rollups.compact(connection)
+
+    click.echo(f"✅ Folded {folded} recommendation rows into material_rollup")
+
+
+@app.cli.command("upgrade-history")
+def upgrade_history_command():
+    """Add created_at and its indexes to an existing recommendation table.
 
-    file_path = "sustainability_report.pdf"
-    doc = SimpleDocTemplate(file_path)
-    elements = []
+    Rows written before the upgrade get the upgrade time as created_at.
+    A created_at defaulting to the session time zone's CURRENT_TIMESTAMP
+    is switched to the UTC default.
+    """
 
-    styles = getSampleStyleSheet()
-    elements.append(Paragraph("Sustainability Report", styles["Title"]))
-    elements.append(Spacer(1, 20))
+    db.create_all()
 
-    table_data = [["Item", "Material", "Cost", "CO2", "Strength", "Score"]]
+    with db.engine.begin() as connection:
+        columns = {column["name"] for column in inspect(connection).get_columns("recommendation")}
 
-    for r in data:
-        table_data.append([
-            r.item,
-            r.best_material,
-            r.total_cost,
-            r.total_co2,
-            r.strength,
-            r.sustainability_score
-        ])
+        if "created_at" not in columns:
+            connection.execute(text(
+                "ALTER TABLE recommendation ADD COLUMN created_at TIMESTAMP"))
+            connection.execute(
+                text("UPDATE recommendation SET created_at = :now WHERE created_at IS NULL"),
+                {"now": utcnow()})
 
-    table = Table(table_data)
-    elements.append(table)
+        # SQLite cannot alter a column default, and its CURRENT_TIMESTAMP is UTC
+        if connection.dialect.name != "sqlite":
+            default = utc_timestamp().compile(dialect=connection.dialect)
+            connection.execute(text(
+                f"ALTER TABLE recommendation ALTER COLUMN created_at SET DEFAULT {default}"))
 
-    doc.build(elements)
+        for index in Recommendation.__table__.indexes:
+            index.create(connection, checkfirst=True)
 
-    return send_file(file_path, as_attachment=True)
+    click.echo("✅ recommendation.created_at and its indexes are in place")
 
 # ==============================
 # MAIN
@@ -0,0 +1,97 @@
+import argparse
+import filecmp
+import multiprocessing as mp
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from chunked_cleaning import clean_history
+from raw_data import RAW_SOURCES, _restore, read_raw
+
+# ==============================
+# CLEANING MEMORY: IN-MEMORY VS CHUNKED
+# ==============================
+#
+# Writes synthetic packaging histories of growing size (resampled from the
+# real one, with ~5% duplicate rows and a few gaps, boolean ones included)
+# and cleans each in a fresh process both ways, reporting wall time and
+# peak RSS. The chunked peak should stay roughly flat while the in-memory
+# one grows with rows. Both outputs must match byte for byte.
+#
+#   python benchmarks/chunked_cleaning.py --rows 250000 1000000 4000000
+
+
+def synthesize(path, rows, chunk=500_000):
+    base = read_raw("packaging_history")
+    rng = np.random.default_rng(7)
+
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        frame = base.sample(n, replace=True, random_state=int(rng.integers(1 << 31)))
+        frame["Order_ID"] = np.where(rng.random(n) < 0.05, frame["Order_ID"],
+                                     np.arange(start, start + n) + len(base))
+        frame = frame.astype({"Weight_kg": "float64", "Moisture_Sens": object})
+        frame.loc[rng.random(n) < 0.01, "Weight_kg"] = np.nan
+        frame.loc[rng.random(n) < 0.01, "Moisture_Sens"] = np.nan
+
+        frame.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+
+
+def in_memory(source, output):
+    spec = RAW_SOURCES["packaging_history"]
+    # Typed as read_raw would hand it to notebooks/02
+    frame = _restore(pd.read_csv(source, dtype=spec["dtypes"], parse_dates=spec["dates"]))
+
+    cleaned = frame.drop_duplicates()
+    cleaned.fillna(cleaned.median(numeric_only=True), inplace=True)
+    cleaned.to_csv(output, index=False)
+
+
+def chunked(source, output):
+    clean_history("packaging_history", output, source=source)
+
+
+def measure(target, source, output, queue):
+    started = time.perf_counter()
+    target(source, output)
+    queue.put((time.perf_counter() - started,
+               resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def run(target, source, output):
+    queue = mp.get_context("fork").Queue()
+    process = mp.get_context("fork").Process(target=measure, args=(target, source, output, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[250_000, 1_000_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "history.csv")
+
+        print(f"{'rows':>10}  {'in-memory':>22}  {'chunked':>22}")
+
+        for rows in args.rows:
+            synthesize(source, rows)
+
+            memory_time, memory_peak = run(in_memory, source, os.path.join(tmp, "a.csv"))
+            chunked_time, chunked_peak = run(chunked, source, os.path.join(tmp, "b.csv"))
+
+            assert filecmp.cmp(os.path.join(tmp, "a.csv"), os.path.join(tmp, "b.csv"),
+                               shallow=False), f"outputs differ at {rows} rows"
+
+            print(f"{rows:>10}  {memory_time:8.1f}s {memory_peak:9.0f} MB  "
+                  f"{chunked_time:8.1f}s {chunked_peak:9.0f} MB")
@@ -0,0 +1,122 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from dashboard import (calculate_co2_reduction, calculate_cost_savings,
+                       load_kpis, load_material_counts)
+
+# ==============================
+# DASHBOARD KPIs: SELECT * INTO PANDAS VS SQL AGGREGATES
+# ==============================
+#
+# Fills a throwaway SQLite recommendation table with synthetic rows and
+# times the old dashboard data path (whole table into a DataFrame) against
+# the aggregate queries, checking both give the same KPIs.
+#
+#   python benchmarks/dashboard_kpis.py --rows 1000000
+
+SCHEMA = """
+    CREATE TABLE recommendation (
+        id INTEGER PRIMARY KEY,
+        item VARCHAR(100),
+        weight FLOAT,
+        units INTEGER,
+        fragility VARCHAR(10),
+        best_material VARCHAR(200),
+        total_cost FLOAT,
+        total_co2 FLOAT,
+        strength FLOAT,
+        sustainability_score FLOAT
+    )
+"""
+
+
+def fill(engine, rows, chunk=100_000):
+    rng = np.random.default_rng(42)
+    materials = pd.read_csv(os.path.join(os.path.dirname(__file__), "..", "data", "final",
+                                         "ml_dataset.csv"))["Material_Name"].to_numpy()
+
+    with engine.begin() as connection:
+        connection.execute(text(SCHEMA))
+
+        for start in range(0, rows, chunk):
+            n = min(chunk, rows - start)
+            batch = pd.DataFrame({
+                "item": "item",
+                "weight": rng.uniform(0.1, 20, n).round(2),
+                "units": rng.integers(1, 1000, n),
+                "fragility": rng.choice(["L", "M", "H"], n),
+                "best_material": rng.choice(materials[:40], n),
+                "total_cost": rng.uniform(1, 5000, n).round(2),
+                "total_co2": rng.uniform(1, 8000, n).round(2),
+                "strength": rng.uniform(10, 80, n).round(2),
+                "sustainability_score": rng.uniform(40, 95, n).round(2)
+            })
+            batch.to_sql("recommendation", connection, if_exists="append", index=False)
+
+
+def legacy(engine):
+    df = pd.read_sql("SELECT * FROM recommendation", engine)
+
+    baseline, current = df["total_co2"].max(), df["total_co2"].mean()
+    co2 = round(((baseline - current) / baseline) * 100, 2)
+    baseline, current = df["total_cost"].max(), df["total_cost"].mean()
+    cost = round(((baseline - current) / baseline) * 100, 2)
+    counts = df["best_material"].value_counts().head(10)
+
+    return co2, cost, dict(counts), len(df)
+
+
+def aggregated(engine):
+    with engine.connect() as connection:
+        kpis = load_kpis(connection)
+        counts = load_material_counts(connection)
+
+    return (calculate_co2_reduction(kpis), calculate_cost_savings(kpis),
+            dict(counts), 1 + len(counts))
+
+
+def timed(fn, engine, repeat):
+    best = float("inf")
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(engine)
+        best = min(best, time.perf_counter() - started)
+
+    return best, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+
+        started = time.perf_counter()
+        fill(engine, args.rows)
+        print(f"\n📦 {args.rows} synthetic rows in {time.perf_counter() - started:.1f}s\n")
+
+        old_time, old = timed(legacy, engine, args.repeat)
+        new_time, new = timed(aggregated, engine, args.repeat)
+
+        print(f"{'path':<14}{'seconds':>10}{'rows read':>12}")
+        print(f"{'SELECT *':<14}{old_time:>10.3f}{old[3]:>12}")
+        print(f"{'aggregates':<14}{new_time:>10.3f}{new[3]:>12}")
+
+        print("\nCO2 reduction :", old[0], "vs", new[0])
+        print("Cost savings  :", old[1], "vs", new[1])
+        print("Top 10 match  :", sorted(old[2].values()) == sorted(new[2].values()))
+
+        engine.dispose()
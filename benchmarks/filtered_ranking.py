@@ -0,0 +1,142 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from material_store import DEFAULT_SOURCE
+from scoring import SENSITIVITY_EXCLUDED_CATEGORIES, MaterialFilter, ScoringEngine
+
+# ==============================
+# FILTERED RANKING: BITMAPS VS ROW SCAN
+# ==============================
+#
+# Times top-k requests with and without material constraints on the real
+# catalog and on larger synthetic ones (the real rows resampled with
+# jittered cost, CO2 and density), for a light and a heavy fragile
+# shipment. "bitmaps" is ScoringEngine.ranked on the filter's member set,
+# as RankingCache serves it once the filter has been seen; "member set" is
+# the one-off cost of resolving the filter against the bitmaps. "row scan"
+# tests every row against the constraints, then scores and sorts the rows
+# that pass. Both must return the same materials.
+#
+#   python benchmarks/filtered_ranking.py --rows 0 100000 1000000
+
+FILTERS = {
+    "none": None,
+    "temperature sensitive": MaterialFilter(
+        excluded_categories=SENSITIVITY_EXCLUDED_CATEGORIES["temp"]),
+    "biodegradable paper": MaterialFilter(categories=("Paper",), biodegradable=True),
+    "cheap, low CO2": "quantiles",
+    "wood under density cap": MaterialFilter(categories=("Wood",), max_density=700.0)
+}
+
+SHIPMENTS = ((5, "M"), (40, "H"))
+
+
+def synthetic_catalog(rows, rng):
+    base = pd.read_csv(DEFAULT_SOURCE)
+
+    if not rows:
+        return base
+
+    df = base.sample(rows, replace=True, random_state=int(rng.integers(1 << 31)))
+    df = df.reset_index(drop=True)
+
+    for column in ("Cost_per_kg", "CO2_Emission_kg", "Density_kg_m3"):
+        df[column] = (df[column] * rng.uniform(0.8, 1.2, rows)).round(3)
+
+    df["Material_Name"] = df["Material_Name"] + " #" + df.index.astype(str)
+    return df
+
+
+def row_scan(engine, df, material_filter, weight, fragility, k):
+    keep = np.ones(len(df), dtype=bool)
+
+    if material_filter is not None:
+        f = material_filter
+        if f.categories:
+            keep &= df["Category"].isin(f.categories).to_numpy()
+        if f.excluded_categories:
+            keep &= ~df["Category"].isin(f.excluded_categories).to_numpy()
+        if f.biodegradable is not None:
+            keep &= (df["Biodegradable"] == "Yes").to_numpy() == f.biodegradable
+        for column, bound in (("Cost_per_kg", f.max_cost), ("CO2_Emission_kg", f.max_co2),
+                              ("Density_kg_m3", f.max_density)):
+            if bound is not None:
+                keep &= (df[column] <= bound).to_numpy()
+
+    indices = np.flatnonzero(keep)
+    scores = engine.score(weight, fragility)[1][indices]
+
+    # Highest score first, lower catalog index on ties
+    return indices[np.lexsort((indices, -scores))[:k]].tolist()
+
+
+def time_requests(request, repeat, calls):
+    best = float("inf")
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(calls):
+            request()
+        best = min(best, (time.perf_counter() - started) / calls)
+
+    return best * 1e3
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[0, 100_000, 1_000_000],
+                        help="catalog sizes; 0 is the real catalog")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+
+    for rows in args.rows:
+        df = synthetic_catalog(rows, rng)
+        engine = ScoringEngine.from_dataframe(df)
+
+        print(f"\n📦 {len(engine)} materials, top {args.k}\n")
+        print(f"{'filter':<24} {'matching':>9}  {'member set':>10}  {'bitmaps':>21}  "
+              f"{'row scan':>21}")
+        print(f"{'':<24} {'':>9}  {'':>10}  {'5 kg M':>10} {'40 kg H':>10}  "
+              f"{'5 kg M':>10} {'40 kg H':>10}")
+
+        for label, material_filter in FILTERS.items():
+            if material_filter == "quantiles":
+                material_filter = MaterialFilter(max_cost=float(np.quantile(engine.cost, 0.2)),
+                                                 max_co2=float(np.quantile(engine.co2, 0.3)))
+
+            members = engine.member_set(material_filter)
+            matching = len(engine) if members is None else len(members.indices)
+
+            for weight, fragility in ((0.5, "L"), (5, "M"), (40, "H")):
+                expected = row_scan(engine, df, material_filter, weight, fragility, args.k)
+                got = engine.ranked(weight, fragility, args.k, members=members)[0].tolist()
+                assert got == expected, (label, weight, got, expected)
+
+            timings = []
+            build_ms = time_requests(lambda: engine.member_set(material_filter),
+                                     args.repeat, max(1, args.calls // 10))
+
+            for weight, fragility in SHIPMENTS:
+                timings.append(time_requests(
+                    lambda: engine.ranked(weight, fragility, args.k, members=members),
+                    args.repeat, args.calls))
+
+            for weight, fragility in SHIPMENTS:
+                timings.append(time_requests(
+                    lambda: row_scan(engine, df, material_filter, weight, fragility, args.k),
+                    args.repeat, max(1, args.calls // 10)))
+
+            print(f"{label:<24} {matching:>9}  {build_ms:7.3f} ms  " +
+                  "  ".join(" ".join(f"{ms:7.3f} ms" for ms in pair)
+                            for pair in (timings[:2], timings[2:])))
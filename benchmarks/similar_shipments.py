@@ -0,0 +1,89 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from similar_shipments import DEFAULT_HISTORY, RESULT_COLUMNS, ShipmentIndex
+
+# ==============================
+# SIMILAR SHIPMENTS: KD-TREE VS BRUTE FORCE
+# ==============================
+#
+# Builds the index over synthetic histories of growing size (the real one
+# resampled with jittered weights and distances) and times single-shipment
+# queries through the KD-tree against a full scan of the same standardized
+# points, checking both return the same neighbours.
+#
+#   python benchmarks/similar_shipments.py --rows 15000 1000000 4000000
+
+
+def synthesize(base, rows, rng):
+    frame = base.sample(rows, replace=True, random_state=int(rng.integers(1 << 31)))
+    frame = frame.reset_index(drop=True)
+
+    frame["Weight_kg"] = (frame["Weight_kg"] * rng.uniform(0.8, 1.2, rows)).round(2)
+    frame["Distance_km"] = (frame["Distance_km"] + rng.integers(-200, 200, rows)).clip(1)
+    frame["Order_ID"] = np.arange(1, rows + 1)
+
+    return frame
+
+
+def brute_force(index, point, k):
+    points = index.tree.data
+    distances = np.einsum("ij,ij->i", points - point, points - point)
+    nearest = np.argpartition(distances, k - 1)[:k]
+    return nearest[np.argsort(distances[nearest], kind="stable")]
+
+
+def time_queries(query, shipments, repeat):
+    best = float("inf")
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for shipment in shipments:
+            query(shipment)
+        best = min(best, (time.perf_counter() - started) / len(shipments))
+
+    return best * 1e3
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[15_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    base = pd.read_csv(DEFAULT_HISTORY, usecols=RESULT_COLUMNS)
+    rng = np.random.default_rng(7)
+
+    print(f"{'rows':>10}  {'build':>9}  {'kd-tree':>12}  {'brute force':>12}  {'speedup':>8}")
+
+    for rows in args.rows:
+        frame = synthesize(base, rows, rng)
+
+        started = time.perf_counter()
+        index = ShipmentIndex.build(frame)
+        build = time.perf_counter() - started
+
+        shipments = synthesize(base, args.queries, rng).to_dict("records")
+        points = [index.point(shipment) for shipment in shipments]
+
+        # Same neighbour sets, up to ties in distance
+        for point in points[:20]:
+            distances, tree_nearest = index.tree.query(point, k=args.k)
+            scan_nearest = brute_force(index, point, args.k)
+            scan_distances = np.linalg.norm(index.tree.data[scan_nearest] - point, axis=1)
+            assert np.allclose(np.sort(distances), np.sort(scan_distances))
+
+        tree_ms = time_queries(lambda point: index.tree.query(point, k=args.k), points, args.repeat)
+        scan_ms = time_queries(lambda point: brute_force(index, point, args.k), points, args.repeat)
+
+        print(f"{rows:>10}  {build:8.1f}s  {tree_ms:9.3f} ms  {scan_ms:9.3f} ms  "
+              f"{scan_ms / tree_ms:7.0f}x")
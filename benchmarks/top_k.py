@@ -0,0 +1,87 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from material_store import DEFAULT_SOURCE
+from scoring import ScoringEngine
+
+# ==============================
+# TOP-K: THRESHOLD WALK VS FULL SORT
+# ==============================
+#
+# Times ScoringEngine.top_k against scoring the whole catalog and sorting
+# it, on the real catalog and on synthetic ones (the real rows resampled
+# with jittered cost and CO2), for shipments from light to heavy. Both must
+# return the same materials in the same order.
+#
+#   python benchmarks/top_k.py --rows 0 100000 1000000
+
+SHIPMENTS = ((0.5, "L"), (5, "M"), (20, "H"), (40, "H"), (400, "H"))
+
+
+def synthetic_catalog(rows, rng):
+    base = pd.read_csv(DEFAULT_SOURCE)
+
+    if not rows:
+        return base
+
+    df = base.sample(rows, replace=True, random_state=int(rng.integers(1 << 31)))
+    df = df.reset_index(drop=True)
+
+    for column in ("Cost_per_kg", "CO2_Emission_kg"):
+        df[column] = (df[column] * rng.uniform(0.8, 1.2, rows)).round(3)
+
+    df["Material_Name"] = df["Material_Name"] + " #" + df.index.astype(str)
+    return df
+
+
+def full_sort(engine, weight, fragility, k):
+    scores = engine.score(weight, fragility)[1]
+    return np.argsort(-scores, kind="stable")[:k]
+
+
+def time_calls(call, repeat, calls):
+    best = float("inf")
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(calls):
+            call()
+        best = min(best, (time.perf_counter() - started) / calls)
+
+    return best * 1e3
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[0, 100_000, 1_000_000],
+                        help="catalog sizes; 0 is the real catalog")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+
+    for rows in args.rows:
+        engine = ScoringEngine.from_dataframe(synthetic_catalog(rows, rng))
+
+        print(f"\n📦 {len(engine)} materials, top {args.k}\n")
+        print(f"{'shipment':<10} {'walk':>10}  {'full sort':>10}")
+
+        for weight, fragility in SHIPMENTS:
+            walk = engine.top_k(weight, fragility, args.k)[0]
+            assert walk.tolist() == full_sort(engine, weight, fragility, args.k).tolist()
+
+            walk_ms = time_calls(lambda: engine.top_k(weight, fragility, args.k),
+                                 args.repeat, args.calls)
+            sort_ms = time_calls(lambda: full_sort(engine, weight, fragility, args.k),
+                                 args.repeat, max(1, args.calls // 5))
+
+            print(f"{f'{weight} kg {fragility}':<10} {walk_ms:7.3f} ms  {sort_ms:7.3f} ms")
@@ -0,0 +1,111 @@
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tree_models import DEFAULT_MODEL_DIR, CompiledForest, compile_pickle
+
+# ==============================
+# TREE INFERENCE: PICKLED MODEL VS COMPILED ARRAYS
+# ==============================
+#
+# For every models/*_model.pkl: compiles it into a scratch directory,
+# checks the compiled predictions against the original model, then times
+#
+#   cold start   fresh interpreter importing + loading the model
+#   load         loading into an already warm interpreter
+#   predict      per call, for several batch sizes
+#
+#   python benchmarks/tree_inference.py --repeat 200
+
+BATCH_SIZES = (1, 10, 100, 10_000)
+
+COLD_PICKLE = "import joblib; joblib.load({path!r})"
+COLD_COMPILED = ("import sys; sys.path.insert(0, {root!r}); "
+                 "from tree_models import CompiledForest; CompiledForest.load({path!r})")
+
+
+def cold_start(code, repeat=3):
+    best = float("inf")
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-W", "ignore", "-c", code], check=True)
+        best = min(best, time.perf_counter() - started)
+
+    return best
+
+
+def per_call(predict, X, repeat):
+    predict(X)
+    started = time.perf_counter()
+
+    for _ in range(repeat):
+        predict(X)
+
+    return (time.perf_counter() - started) / repeat
+
+
+def sample(model, rows, rng):
+    # Scaled features, as the notebooks feed the models
+    return rng.normal(size=(rows, model.n_features_in_)) * 1.5
+
+
+def bench(path, args, scratch):
+    import joblib
+
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    name = os.path.splitext(os.path.basename(path))[0]
+    target = compile_pickle(path, os.path.join(scratch, name))
+
+    started = time.perf_counter()
+    model = joblib.load(path)
+    pickle_load = time.perf_counter() - started
+
+    started = time.perf_counter()
+    compiled = CompiledForest.load(target)
+    compiled_load = time.perf_counter() - started
+
+    rng = np.random.default_rng(42)
+    X = sample(model, 10_000, rng)
+
+    if compiled.kind == "classifier":
+        error = np.abs(model.predict_proba(X) - compiled.predict_proba(X)).max()
+    else:
+        error = np.abs(model.predict(X) - compiled.predict(X)).max()
+
+    print(f"\n🌲 {name}: {compiled.kind}, {len(compiled.roots)} trees, "
+          f"{len(compiled.feature)} nodes, max |diff| {error:.2e}")
+    print(f"  cold start   pickle {cold_start(COLD_PICKLE.format(path=path)):8.3f}s   "
+          f"compiled {cold_start(COLD_COMPILED.format(root=root, path=target)):8.3f}s")
+    print(f"  load         pickle {pickle_load * 1000:8.2f}ms  "
+          f"compiled {compiled_load * 1000:8.2f}ms")
+
+    for rows in BATCH_SIZES:
+        X = sample(model, rows, rng)
+        repeat = max(1, args.repeat // max(1, rows // 100))
+
+        original = per_call(model.predict, X, repeat)
+        flattened = per_call(compiled.predict, X, repeat)
+
+        print(f"  predict {rows:>6} rows  pickle {original * 1000:8.3f}ms  "
+              f"compiled {flattened * 1000:8.3f}ms  ({original / flattened:5.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", nargs="*",
+                        default=sorted(glob.glob(os.path.join(DEFAULT_MODEL_DIR, "*_model.pkl"))))
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        for path in args.models:
+            bench(path, args, scratch)
@@ -0,0 +1,133 @@
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from material_store import DEFAULT_SOURCE, MaterialStore
+
+# ==============================
+# PER-WORKER MEMORY: PRIVATE VS SHARED MATERIAL TABLE
+# ==============================
+#
+# Forks N "workers" per mode, loads the catalog the way that mode does,
+# runs a few rankings so every page is touched, and reports how much memory
+# each worker added:
+#
+#   pandas   the old app: read_csv + to_numeric in every worker
+#   private  engine rebuilt from the snapshot columns in every worker
+#   shared   engine attached read-only to the memory-mapped snapshot
+#
+# Pss splits shared pages between the processes mapping them, so it is the
+# number to size containers by. Linux only (/proc/self/smaps_rollup).
+#
+#   python benchmarks/worker_memory.py --workers 4 --rows 200000
+
+MODES = ("pandas", "private", "shared")
+
+
+def memory_kb():
+    fields = {}
+
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    }
+
+
+def worker(mode, source, root, start, done, results):
+    before = memory_kb()
+
+    if mode == "pandas":
+        df = pd.read_csv(source)
+        for column in ("Cost_per_kg", "CO2_Emission_kg", "Tensile_Strength_MPa"):
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+        keep = [df]
+    else:
+        engine = MaterialStore(root, source, shared=(mode == "shared")).get()
+        for weight, fragility in ((0.5, "L"), (5, "M"), (50, "H")):
+            engine.score(weight, fragility)
+        for name in engine.ARRAYS:
+            values = getattr(engine, name)
+            if values.dtype.kind != "U":
+                values.sum()
+        keep = [engine]
+
+    # Measure only once every worker of this mode has loaded its copy, so
+    # Pss reflects the final sharing between them.
+    start.wait()
+    after = memory_kb()
+    results.put({key: after[key] - before[key] for key in after})
+    done.wait()
+
+    del keep
+
+
+def measure(mode, workers, source, root):
+    ctx = mp.get_context("fork")
+    start = ctx.Barrier(workers)
+    done = ctx.Barrier(workers)
+    results = ctx.Queue()
+
+    processes = [ctx.Process(target=worker, args=(mode, source, root, start, done, results))
+                 for _ in range(workers)]
+
+    for p in processes:
+        p.start()
+
+    samples = [results.get() for _ in processes]
+
+    for p in processes:
+        p.join()
+
+    return {key: sum(s[key] for s in samples) / len(samples) for key in samples[0]}
+
+
+def synthetic_catalog(rows, path):
+    base = pd.read_csv(DEFAULT_SOURCE)
+    repeats = -(-rows // len(base))
+
+    df = pd.concat([base] * repeats, ignore_index=True).iloc[:rows].copy()
+    df["Material_ID"] = np.arange(1, rows + 1)
+    df["Material_Name"] = df["Material_Name"] + " #" + df.index.astype(str)
+
+    df.to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=0,
+                        help="tile the real catalog up to this many materials")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = DEFAULT_SOURCE
+
+        if args.rows:
+            source = os.path.join(tmp, "catalog.csv")
+            synthetic_catalog(args.rows, source)
+
+        # The "master" builds the snapshot once, like gunicorn.conf.py does
+        root = os.path.join(tmp, "snapshots")
+        MaterialStore(root, source).compile()
+
+        rows = len(pd.read_csv(source, usecols=["Material_ID"]))
+        print(f"\n📦 {rows} materials, {args.workers} workers (added kB per worker)\n")
+        print(f"{'mode':<10}{'Rss':>12}{'Pss':>12}{'Private':>12}")
+
+        for mode in MODES:
+            m = measure(mode, args.workers, source, root)
+            print(f"{mode:<10}{m['rss']:>12.0f}{m['pss']:>12.0f}{m['private']:>12.0f}")
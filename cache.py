@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict
+
+from scoring import FRAGILITY_FACTOR
+
+# ==============================
+# LRU CACHE
+# ==============================
+
+class LRUCache:
+    """Bounded, thread-safe mapping that evicts the least recently used key."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+# ==============================
+# RANKING CACHE
+# ==============================
+
+class RankingCache(LRUCache):
+    """Top-k rankings keyed by the normalized shipment.
+
+    The ranking only depends on the catalog, the required strength, the
+    weights and the filter, so the key is (engine version, profile weights,
+    material filter, weight, fragility factor, k), with None for the
+    default weights and for no filter; units only rescale the totals,
+    which are recomputed from the cached indices on every hit. Editing a
+    profile changes its weights and so its keys. The member sets of
+    filters are kept alongside, so a filter is resolved against the
+    catalog once, not on every miss.
+
+    With the version in every key, a ranking still being computed on the
+    old engine during a hot reload can never be served for the new one;
+    entries of older versions are dropped when the engine changes.
+    """
+
+    def __init__(self, maxsize=1024):
+        super().__init__(maxsize)
+        self.version = None
+        self.member_sets = LRUCache(maxsize)
+
+    def _follow(self, engine):
+        with self._lock:
+            if engine.version == self.version:
+                return
+
+            self._data.clear()
+            self.version = engine.version
+
+        self.member_sets.clear()
+
+    def _keep(self, cache, engine, key, value):
+        # Results computed on an engine that was replaced meanwhile are
+        # not worth a slot; their keys could never be looked up again
+        with self._lock:
+            current = engine.version == self.version
+
+        if current:
+            cache.put(key, value)
+
+    def member_set(self, engine, material_filter):
+        self._follow(engine)
+
+        if material_filter is None:
+            return None
+
+        key = (engine.version, material_filter)
+        members = self.member_sets.get(key)
+
+        if members is None:
+            members = engine.member_set(material_filter)
+            for array in members:
+                array.setflags(write=False)
+            self._keep(self.member_sets, engine, key, members)
+
+        return members
+
+    def top_k(self, engine, weight, fragility, k, profile=None, material_filter=None):
+        self._follow(engine)
+
+        key = (engine.version, profile, material_filter, float(weight),
+               FRAGILITY_FACTOR.get(fragility, 1), int(k))
+        ranking = self.get(key)
+
+        if ranking is None:
+            ranking = engine.ranked(weight, fragility, k, profile,
+                                    self.member_set(engine, material_filter))
+            for array in ranking:
+                array.setflags(write=False)
+            self._keep(self, engine, key, ranking)
+
+        return ranking
+
+    def rank(self, engine, weight, units, fragility, k=5, profile=None, material_filter=None):
+        order, strength_score, scores = self.top_k(engine, weight, fragility, k, profile,
+                                                   material_filter)
+
+        return engine.build_results(order, strength_score, scores, weight, units)
@@ -0,0 +1,56 @@
+import io
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from cache import LRUCache
+
+# ==============================
+# CHART RENDERING
+# ==============================
+#
+# Charts are drawn on their own Figure with the Agg canvas, never through
+# the global pyplot state machine, so concurrent requests and threads
+# cannot draw on each other's axes, and the PNG is returned as bytes
+# instead of being written to a shared path.
+
+def render_material_trend(material_counts):
+    materials = [str(material) for material, _ in material_counts]
+    counts = [count for _, count in material_counts]
+
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+
+    axes.bar(range(len(counts)), counts)
+    axes.set_xticks(range(len(materials)))
+    axes.set_xticklabels(materials, rotation=90)
+    axes.set_title("Top 10 Material Usage Trends")
+    axes.set_xlabel("Material")
+    axes.set_ylabel("Usage Count")
+    figure.tight_layout()
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png")
+
+    return buffer.getvalue()
+
+
+class ChartService:
+    """Rendered PNGs cached by the version of the data they were drawn from."""
+
+    def __init__(self, maxsize=16):
+        self._cache = LRUCache(maxsize)
+
+    def material_trend(self, version, load_counts):
+        key = ("material_trend", version)
+        png = self._cache.get(key)
+
+        if png is None:
+            png = render_material_trend(load_counts())
+            self._cache.put(key, png)
+
+        return png
+
+    def stats(self):
+        return self._cache.stats()
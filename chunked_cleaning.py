@@ -0,0 +1,337 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from raw_data import RAW_DIR, RAW_SOURCES, build_sidecar
+
+# ==============================
+# CHUNKED CLEANING
+# ==============================
+#
+# Out-of-core version of notebooks/02 for histories too large to load:
+# drop exact duplicate rows, fill numeric gaps with the column median of
+# the de-duplicated rows, write CSV. Two passes over the input:
+#
+#   1. hash every row (64 bits) and keep the first occurrence of each hash;
+#      feed the kept rows into one quantile sketch per numeric column
+#   2. re-read, keep the same rows (one bit per row, recorded in pass 1),
+#      fill with the medians and append to the output
+#
+# Memory is one chunk plus 8 bytes per distinct row for the hash set, one
+# bit per input row and a fixed-size sketch per column. For the same input
+# the output matches the in-memory cleaning byte for byte, as long as the
+# column sketches stay exact (QuantileSketch.exact_limit values each) and
+# no two distinct rows share a 64-bit hash.
+
+CHUNK_ROWS = 100_000
+
+
+# ==============================
+# ROW-HASH SET
+# ==============================
+
+class RowHashSet:
+    """Set of 64-bit row hashes kept as a few sorted runs.
+
+    New hashes land in a fresh run; runs are merged whenever the previous
+    one is not more than twice as large, so there are O(log n) of them and
+    membership is a binary search in each.
+    """
+
+    def __init__(self):
+        self._runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self._runs)
+
+    def first_seen(self, hashes):
+        """Boolean mask of rows whose hash was not seen before (the first
+        of several equal hashes in ``hashes`` counts as new)."""
+        unique, first = np.unique(hashes, return_index=True)
+        new = np.ones(len(unique), dtype=bool)
+
+        for run in self._runs:
+            pos = np.minimum(np.searchsorted(run, unique), len(run) - 1)
+            new &= run[pos] != unique
+
+        keep = np.zeros(len(hashes), dtype=bool)
+        keep[first[new]] = True
+
+        self._push(unique[new])
+        return keep
+
+    def _push(self, run):
+        if not len(run):
+            return
+
+        self._runs.append(run)
+
+        while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+            newest = self._runs.pop()
+            self._runs[-1] = np.sort(np.concatenate([self._runs[-1], newest]))
+
+
+# ==============================
+# QUANTILE SKETCH
+# ==============================
+
+class QuantileSketch:
+    """Bounded-memory quantiles of a stream of floats (NaN ignored).
+
+    Values are kept exactly until there are more than ``exact_limit`` of
+    them, so small inputs get the same median as pandas. Past that it turns
+    into a KLL sketch: level h holds items of weight 2**h, and a full level
+    is sorted and every other item promoted, which keeps roughly ``k``
+    items per level and a rank error around 1/k.
+    """
+
+    def __init__(self, exact_limit=200_000, k=2048, seed=0):
+        self.exact_limit = exact_limit
+        self.k = k
+        self.count = 0
+
+        self._exact = []
+        self._exact_size = 0
+        self._levels = None
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def exact(self):
+        return self._levels is None
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+
+        if not len(values):
+            return
+
+        self.count += len(values)
+
+        if self._levels is None:
+            self._exact.append(values)
+            self._exact_size += len(values)
+
+            if self._exact_size <= self.exact_limit:
+                return
+
+            values = np.concatenate(self._exact)
+            self._exact = None
+            self._levels = [np.empty(0)]
+
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        self._compress()
+
+    def _capacity(self, level):
+        depth = len(self._levels) - 1 - level
+        return max(2, int(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        level = 0
+
+        while level < len(self._levels):
+            items = self._levels[level]
+
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+
+            if level + 1 == len(self._levels):
+                self._levels.append(np.empty(0))
+
+            items = np.sort(items)
+            # An odd item out stays behind at this level
+            rest, items = items[:len(items) % 2], items[len(items) % 2:]
+            promoted = items[self._rng.integers(2)::2]
+
+            self._levels[level] = rest
+            self._levels[level + 1] = np.concatenate([self._levels[level + 1], promoted])
+
+            # Capacities shrink as levels are added; recheck from the bottom
+            level = 0
+
+    def quantile(self, q):
+        if not self.count:
+            return np.nan
+
+        if self.exact:
+            return float(np.quantile(np.concatenate(self._exact), q))
+
+        values = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level)
+                                  for level, items in enumerate(self._levels)])
+
+        order = np.argsort(values, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        rank = q * cumulative[-1]
+
+        return float(values[order][min(np.searchsorted(cumulative, rank), len(order) - 1)])
+
+    def median(self):
+        return self.quantile(0.5)
+
+    def to_arrays(self):
+        # Exact values, or one array per KLL level; for np.savez
+        if self.exact:
+            values = np.concatenate(self._exact) if self._exact else np.empty(0)
+            return {"exact": values}
+
+        return {f"level{level}": items for level, items in enumerate(self._levels)}
+
+    @classmethod
+    def from_arrays(cls, arrays, count, **kwargs):
+        sketch = cls(**kwargs)
+        sketch.count = count
+
+        if "exact" in arrays:
+            sketch._exact = [np.asarray(arrays["exact"])]
+            sketch._exact_size = len(arrays["exact"])
+        else:
+            sketch._exact = None
+            sketch._levels = [np.asarray(arrays[f"level{level}"])
+                              for level in range(len(arrays))]
+
+        return sketch
+
+
+# ==============================
+# INPUT
+# ==============================
+
+def iter_chunks(name, source=None, chunk_rows=CHUNK_ROWS):
+    """DataFrames of ``chunk_rows`` rows, typed as declared in raw_data.
+
+    ``source`` may be the raw workbook (read through its parquet sidecar)
+    or a CSV export with the same columns.
+    """
+    spec = RAW_SOURCES[name]
+    source = source or os.path.join(RAW_DIR, spec["file"])
+
+    if source.endswith(".csv"):
+        yield from pd.read_csv(source, dtype=spec["dtypes"], parse_dates=spec["dates"],
+                               chunksize=chunk_rows)
+        return
+
+    sidecar = build_sidecar(name, source)
+
+    if sidecar.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(sidecar).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+        return
+
+    # Pickle sidecars (no pyarrow) cannot be read in pieces
+    frame = pd.read_pickle(sidecar)
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+# ==============================
+# CLEANING
+# ==============================
+
+def _output_dtypes(spec, has_gaps):
+    # What pd.read_excel would have inferred for the whole file
+    dtypes = {}
+
+    for column, dtype in spec["dtypes"].items():
+        if dtype == "Int64":
+            dtypes[column] = "float64" if has_gaps[column] else "int64"
+        elif dtype == "boolean":
+            dtypes[column] = "float64" if has_gaps[column] else "bool"
+
+    return dtypes
+
+
+def _numeric_columns(spec):
+    # Gappy booleans come out as float 1.0 / 0.0 and get median-filled too
+    return [column for column, dtype in spec["dtypes"].items()
+            if dtype in ("Int64", "float64", "boolean")]
+
+
+def clean_history(name, output, source=None, chunk_rows=CHUNK_ROWS, sketch_limit=200_000):
+    """Stream-clean a raw history into ``output`` (CSV); returns stats."""
+    spec = RAW_SOURCES[name]
+    numeric = _numeric_columns(spec)
+
+    seen = RowHashSet()
+    sketches = {column: QuantileSketch(exact_limit=sketch_limit) for column in numeric}
+    masks = []
+
+    rows_in = 0
+    missing_before = None
+    has_gaps = {column: False for column in spec["dtypes"]}
+
+    # Pass 1: which rows to keep, and the medians of the kept rows
+    for chunk in iter_chunks(name, source, chunk_rows):
+        rows_in += len(chunk)
+
+        missing = chunk.isna().sum()
+        missing_before = missing if missing_before is None else missing_before + missing
+
+        for column in has_gaps:
+            has_gaps[column] = has_gaps[column] or bool(missing[column])
+
+        keep = seen.first_seen(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+        masks.append(np.packbits(keep))
+
+        kept = chunk[keep]
+        for column in numeric:
+            sketches[column].update(kept[column].to_numpy(dtype=np.float64, na_value=np.nan))
+
+    medians = {column: sketch.median() for column, sketch in sketches.items()}
+    dtypes = _output_dtypes(spec, has_gaps)
+
+    # Pass 2: write the kept rows with the gaps filled
+    directory = os.path.dirname(os.path.abspath(output))
+    fd, partial = tempfile.mkstemp(prefix=".clean-", suffix=".csv", dir=directory)
+    os.close(fd)
+
+    rows_out = 0
+    missing_after = None
+
+    try:
+        for index, chunk in enumerate(iter_chunks(name, source, chunk_rows)):
+            keep = np.unpackbits(masks[index], count=len(chunk)).astype(bool)
+            kept = chunk[keep].astype(dtypes)
+            kept = kept.fillna({column: median for column, median in medians.items()
+                                if has_gaps[column] and not np.isnan(median)})
+
+            kept.to_csv(partial, mode="w" if index == 0 else "a", header=index == 0,
+                        index=False)
+
+            rows_out += len(kept)
+            missing = kept.isna().sum()
+            missing_after = missing if missing_after is None else missing_after + missing
+
+        os.replace(partial, output)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+    return {
+        "rows_in": rows_in,
+        "duplicates": rows_in - rows_out,
+        "rows_out": rows_out,
+        "missing_before": missing_before,
+        "missing_after": missing_after,
+        "medians": medians,
+        "exact_medians": all(sketch.exact for sketch in sketches.values())
+    }
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+    # python chunked_cleaning.py <output.csv> [source .xlsx/.csv]
+    stats = clean_history("packaging_history", sys.argv[1],
+                          sys.argv[2] if len(sys.argv) > 2 else None)
+
+    print(f"✅ {stats['rows_in']} rows in, {stats['duplicates']} duplicates dropped, "
+          f"{stats['rows_out']} rows written to {sys.argv[1]}")
@@ -0,0 +1,51 @@
+import tempfile
+
+import xlsxwriter
+
+# ==============================
+# STREAMING EXPORTS
+# ==============================
+
+# Rows fetched per round trip; with psycopg2 yield_per also switches the
+# query to a server-side cursor, so only one chunk is ever held in memory.
+EXPORT_CHUNK_SIZE = 5000
+
+# Excel's hard limit is 1,048,576 rows per sheet, header included
+EXCEL_MAX_ROWS = 1_048_576
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def stream_result(connection, statement, chunk_size=EXPORT_CHUNK_SIZE):
+    return connection.execute(statement.execution_options(yield_per=chunk_size))
+
+
+def write_excel(headers, rows, sheet_name="Sustainability Data"):
+    # constant_memory makes xlsxwriter flush every finished row to disk, and
+    # the workbook itself goes to an anonymous temp file private to this
+    # request, so peak memory does not depend on how many rows there are.
+    output = tempfile.TemporaryFile()
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+
+    sheet = None
+    sheet_count = 0
+    row_number = EXCEL_MAX_ROWS
+
+    for row in rows:
+        if row_number >= EXCEL_MAX_ROWS:
+            sheet_count += 1
+            name = sheet_name if sheet_count == 1 else f"{sheet_name} {sheet_count}"
+            sheet = workbook.add_worksheet(name[:31])
+            sheet.write_row(0, 0, headers)
+            row_number = 1
+
+        sheet.write_row(row_number, 0, row)
+        row_number += 1
+
+    if sheet is None:
+        workbook.add_worksheet(sheet_name[:31]).write_row(0, 0, headers)
+
+    workbook.close()
+    output.seek(0)
+
+    return output
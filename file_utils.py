@@ -0,0 +1,57 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+# ==============================
+# FILE HASHES AND SNAPSHOT PUBLISHING
+# ==============================
+#
+# Shared by the stores that compile derived files next to their source
+# (material snapshots, predictions, tree exports, the shipment index,
+# parquet sidecars, the notebook pipeline): a content hash to key outputs
+# on, the rename that makes a directory written under a private staging
+# name visible in one step, and the atomic rewrite of the pointer files
+# that name the published one.
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def publish_snapshot(staging, target, replace=False):
+    """Rename the ``staging`` directory to ``target``; True if it landed.
+
+    A half-written directory is never visible under ``target``. rename only
+    succeeds onto a missing path, so when another process published
+    ``target`` first its copy is kept and ``staging`` is removed. With
+    ``replace`` an existing (stale) ``target`` is removed first.
+    """
+    if replace:
+        shutil.rmtree(target, ignore_errors=True)
+
+    try:
+        os.rename(staging, target)
+    except OSError:
+        # Another process published the same target first
+        shutil.rmtree(staging, ignore_errors=True)
+        return False
+
+    return True
+
+
+def replace_file(path, text):
+    # Readers see either the old contents or the new, never a partial write
+    fd, partial = tempfile.mkstemp(prefix=f".{os.path.basename(path)}-",
+                                   dir=os.path.dirname(os.path.abspath(path)))
+
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+
+    os.replace(partial, path)
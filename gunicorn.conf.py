@@ -0,0 +1,47 @@
+import sys
+
+from material_store import MaterialStore
+from predictions import ModelsUnavailable, PredictionStore
+from similar_shipments import HistoryUnavailable, ShipmentIndexStore
+
+# ==============================
+# SHARED MATERIAL TABLE
+# ==============================
+#
+# The master compiles the material snapshot once before forking. Workers
+# then memory-map the same read-only files (MATERIAL_SHARED_TABLE=1, the
+# default), so the catalog lives once in the page cache instead of once
+# per worker. See benchmarks/worker_memory.py for the measurement.
+
+def on_starting(server):
+    store = MaterialStore.from_env()
+    version = store.compile()
+    server.log.info("Material snapshot %s ready in %s", version, store.root)
+
+    # Catalog predictions for the ML ranking mode, computed once per model
+    # version; without the trained models the mode reports unavailable.
+    try:
+        path = PredictionStore.from_env(store).compile(version)
+        server.log.info("ML predictions ready in %s", path)
+    except (ModelsUnavailable, ImportError) as exc:
+        server.log.warning("ML ranking mode disabled: %s", exc)
+
+    # KD-tree over the packaging history for /api/similar_shipments
+    try:
+        path = ShipmentIndexStore.from_env().compile()
+        server.log.info("Packaging history index ready in %s", path)
+    except (HistoryUnavailable, ImportError) as exc:
+        server.log.warning("Similar shipments lookup disabled: %s", exc)
+
+
+# ==============================
+# WRITE-BEHIND SHUTDOWN
+# ==============================
+
+def worker_exit(server, worker):
+    # Flush queued Recommendation rows before the worker goes away
+    app_module = sys.modules.get("app")
+    queue = getattr(app_module, "write_behind", None)
+
+    if queue is not None:
+        queue.stop()
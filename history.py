@@ -0,0 +1,134 @@
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import DateTime, and_, column, or_, table
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+# ==============================
+# RECOMMENDATION HISTORY
+# ==============================
+#
+# Lightweight Core view of the recommendation table for modules that must
+# not import app.py (dashboard, rollups), plus the date-range and keyset
+# cursor helpers shared by the history APIs, dashboard and exports.
+
+recommendation = table(
+    "recommendation",
+    column("id"),
+    column("item"),
+    column("weight"),
+    column("units"),
+    column("fragility"),
+    column("best_material"),
+    column("total_cost"),
+    column("total_co2"),
+    column("strength"),
+    column("sustainability_score"),
+    column("created_at")
+)
+
+
+def utcnow():
+    # created_at is stored as naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class utc_timestamp(FunctionElement):
+    """The database's current time as naive UTC, for created_at's server default.
+
+    CURRENT_TIMESTAMP is already UTC on SQLite but follows the session time
+    zone on PostgreSQL.
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utc_timestamp)
+def _utc_timestamp(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utc_timestamp, "postgresql")
+def _utc_timestamp_postgresql(element, compiler, **kw):
+    return "timezone('utc', now())"
+
+
+# ==============================
+# DATE RANGES
+# ==============================
+
+def _parse_bound(value, is_end):
+    value = value.strip()
+
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+        return moment
+
+    # A bare end date includes that whole day
+    if is_end:
+        day += timedelta(days=1)
+
+    return datetime.combine(day, time.min)
+
+
+def parse_date_range(args):
+    """(start, end) from ?start=&end= query args; start inclusive, end exclusive.
+
+    Either bound may be missing (None). Raises ValueError on bad input.
+    """
+    start = args.get("start")
+    end = args.get("end")
+
+    start = _parse_bound(start, False) if start else None
+    end = _parse_bound(end, True) if end else None
+
+    if start and end and start >= end:
+        raise ValueError("start must be before end")
+
+    return start, end
+
+
+def range_filter(created_at, start, end):
+    conditions = []
+
+    if start is not None:
+        conditions.append(created_at >= start)
+    if end is not None:
+        conditions.append(created_at < end)
+
+    return and_(*conditions) if conditions else None
+
+
+def range_key(start, end):
+    # Filesystem- and URL-safe tag for caches keyed by a date range
+    def tag(moment):
+        return moment.strftime("%Y%m%dT%H%M%S") if moment else "all"
+
+    return f"{tag(start)}_{tag(end)}"
+
+
+# ==============================
+# KEYSET CURSORS
+# ==============================
+
+def encode_cursor(created_at, row_id):
+    return f"{created_at.isoformat()}_{row_id}"
+
+
+def decode_cursor(cursor):
+    created_at, _, row_id = cursor.rpartition("_")
+    return datetime.fromisoformat(created_at), int(row_id)
+
+
+def before_cursor(created_at, row_id, cursor):
+    # Rows strictly after the cursor in (created_at DESC, id DESC) order
+    cursor_time, cursor_id = decode_cursor(cursor)
+
+    return or_(
+        created_at < cursor_time,
+        and_(created_at == cursor_time, row_id < cursor_id)
+    )
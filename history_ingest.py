@@ -0,0 +1,333 @@
+import json
+import os
+import pickle
+import sys
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: runs are not serialized
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from chunked_cleaning import (CHUNK_ROWS, QuantileSketch, RowHashSet, _numeric_columns,
+                              _output_dtypes, iter_chunks)
+from raw_data import RAW_SOURCES
+
+# ==============================
+# INCREMENTAL HISTORY INGESTION
+# ==============================
+#
+# Appends packaging orders past the last committed watermark to the
+# cleaned history instead of re-cleaning everything. The watermark is the
+# highest Order_ID ingested: order ids only grow, while order dates in the
+# history are not monotonic, so the latest Date is recorded for reference
+# but does not decide what is new. A duplicate of an already ingested
+# row has an id at or below the watermark, so only duplicates within the
+# new batch need removing.
+#
+# Everything derived from the history so far lives in one file, replaced
+# atomically on commit:
+#
+#   data/processed/packaging_history_state.npz
+#       meta      JSON: watermark, rows, committed size of the CSV, column
+#                 summaries (count / sum / min / max), medians
+#       <column>/<part>   the median sketch of every numeric column
+#
+# New gaps are filled with the medians of the whole history including the
+# new rows; earlier rows are never rewritten (rebuild with notebooks/02).
+# A run that dies mid-append is rolled back on the next one by truncating
+# the CSV to its committed size. Runs hold an exclusive lock on
+# <state>.lock from reading the watermark to committing the new one, so two
+# runs at once cannot append the same orders.
+#
+# The source is read once per run: the new rows are spilled to a temporary
+# file while the medians are computed, then filled from there. Rows at or
+# below the watermark are still parsed to be skipped, so a run costs a read
+# of the whole source; scheduled runs against a long history should pass a
+# CSV of recent orders rather than the full workbook.
+
+NAME = "packaging_history"
+WATERMARK_COLUMN = "Order_ID"
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+PROCESSED_DIR = os.path.join(BASE_DIR, "data", "processed")
+DEFAULT_OUTPUT = os.path.join(PROCESSED_DIR, "cleaned_packaging_history.csv")
+DEFAULT_STATE = os.path.join(PROCESSED_DIR, "packaging_history_state.npz")
+
+
+# ==============================
+# STATE
+# ==============================
+
+class HistoryState:
+
+    def __init__(self, watermark=None, max_date=None, rows=0, size=0, float_columns=(),
+                 columns=None, sketches=None):
+        self.watermark = watermark
+        self.max_date = max_date
+        self.rows = rows
+        self.size = size
+        self.float_columns = set(float_columns)
+        self.columns = columns or {}
+        self.sketches = sketches or {column: QuantileSketch()
+                                     for column in _numeric_columns(RAW_SOURCES[NAME])}
+
+    def medians(self):
+        return {column: sketch.median() for column, sketch in self.sketches.items()}
+
+    def summarize(self, frame):
+        # Running count / sum / min / max of the cleaned rows
+        for column in self.sketches:
+            values = frame[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            values = values[~np.isnan(values)]
+
+            if not len(values):
+                continue
+
+            summary = self.columns.setdefault(
+                column, {"count": 0, "sum": 0.0, "min": None, "max": None})
+            summary["count"] += int(len(values))
+            summary["sum"] += float(values.sum())
+            summary["min"] = min(float(values.min()), summary["min"] if summary["min"] is not None else np.inf)
+            summary["max"] = max(float(values.max()), summary["max"] if summary["max"] is not None else -np.inf)
+
+    def meta(self):
+        return {
+            "watermark_column": WATERMARK_COLUMN,
+            "watermark": self.watermark,
+            "max_date": self.max_date,
+            "rows": self.rows,
+            "size": self.size,
+            "float_columns": sorted(self.float_columns),
+            "columns": {
+                column: {**summary, "mean": summary["sum"] / summary["count"]}
+                for column, summary in self.columns.items()
+            },
+            "medians": self.medians(),
+            "counts": {column: sketch.count for column, sketch in self.sketches.items()}
+        }
+
+    def save(self, path):
+        arrays = {"meta": np.array(json.dumps(self.meta()))}
+
+        for column, sketch in self.sketches.items():
+            for part, values in sketch.to_arrays().items():
+                arrays[f"{column}/{part}"] = values
+
+        fd, partial = tempfile.mkstemp(prefix=".state-", suffix=".npz",
+                                       dir=os.path.dirname(os.path.abspath(path)))
+        os.close(fd)
+
+        try:
+            np.savez(partial, **arrays)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            parts = {}
+
+            for key in data.files:
+                if "/" in key:
+                    column, part = key.split("/", 1)
+                    parts.setdefault(column, {})[part] = data[key]
+
+        sketches = {column: QuantileSketch.from_arrays(parts.get(column, {"exact": np.empty(0)}),
+                                                       meta["counts"].get(column, 0))
+                    for column in _numeric_columns(RAW_SOURCES[NAME])}
+        columns = {column: {key: summary[key] for key in ("count", "sum", "min", "max")}
+                   for column, summary in meta["columns"].items()}
+
+        return cls(meta["watermark"], meta["max_date"], meta["rows"], meta["size"],
+                   meta["float_columns"], columns, sketches)
+
+
+def bootstrap(output, chunk_rows=CHUNK_ROWS):
+    """State for a cleaned history written by a full cleaning run."""
+    state = HistoryState()
+    spec = RAW_SOURCES[NAME]
+
+    if not os.path.exists(output):
+        return state
+
+    # Integer columns as text first: a full clean writes "5.0" instead of
+    # "5" for a column that had gaps, and "1.0" instead of "True" for a
+    # boolean one, and appends must keep to that.
+    integer_columns = [column for column, dtype in spec["dtypes"].items() if dtype == "Int64"]
+    boolean_columns = [column for column, dtype in spec["dtypes"].items() if dtype == "boolean"]
+
+    for chunk in pd.read_csv(output, dtype={column: str for column in integer_columns},
+                             parse_dates=spec["dates"], chunksize=chunk_rows):
+        for column in integer_columns:
+            if chunk[column].str.contains(".", regex=False).any():
+                state.float_columns.add(column)
+            chunk[column] = pd.to_numeric(chunk[column])
+
+        for column in boolean_columns:
+            if chunk[column].dtype == np.float64 and chunk[column].notna().any():
+                state.float_columns.add(column)
+
+        _advance(state, chunk)
+
+    state.size = os.path.getsize(output)
+    return state
+
+
+def _advance(state, cleaned, sketches=True):
+    if not len(cleaned):
+        return
+
+    if sketches:
+        for column, sketch in state.sketches.items():
+            sketch.update(cleaned[column].to_numpy(dtype=np.float64, na_value=np.nan))
+
+    state.summarize(cleaned)
+    state.rows += len(cleaned)
+
+    top = cleaned[WATERMARK_COLUMN].max()
+    if not pd.isna(top):
+        state.watermark = int(top) if state.watermark is None else max(state.watermark, int(top))
+
+    for column in RAW_SOURCES[NAME]["dates"]:
+        latest = pd.to_datetime(cleaned[column]).max()
+
+        if not pd.isna(latest):
+            latest = latest.isoformat()
+            state.max_date = latest if state.max_date is None else max(state.max_date, latest)
+
+
+# ==============================
+# INGEST
+# ==============================
+
+def _new_rows(chunk, watermark):
+    if watermark is None:
+        return chunk
+
+    # Orders without an id cannot be placed against the watermark
+    return chunk[(chunk[WATERMARK_COLUMN] > watermark).fillna(False).to_numpy(dtype=bool)]
+
+
+@contextmanager
+def _locked(state_path):
+    with open(state_path + ".lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def ingest(source=None, output=DEFAULT_OUTPUT, state_path=DEFAULT_STATE, chunk_rows=CHUNK_ROWS):
+    """Append rows of ``source`` past the watermark to ``output``.
+
+    ``source`` is the raw workbook (default) or a CSV of orders with the
+    same columns. Returns the number of rows appended.
+    """
+    with _locked(state_path):
+        return _ingest(source, output, state_path, chunk_rows)
+
+
+def _ingest(source, output, state_path, chunk_rows):
+    state = HistoryState.load(state_path) if os.path.exists(state_path) else bootstrap(output)
+    spec = RAW_SOURCES[NAME]
+
+    if os.path.exists(output) and os.path.getsize(output) > state.size:
+        # Leftovers of an append that was never committed
+        with open(output, "r+b") as f:
+            f.truncate(state.size)
+
+    with tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(state_path))) as spill:
+        # Pass 1: pick the new rows, dropping duplicates within the batch,
+        # fold them into the median sketches and set them aside
+        seen = RowHashSet()
+        has_gaps = {column: column in state.float_columns for column in spec["dtypes"]}
+        new_rows = 0
+        chunks = 0
+
+        for chunk in iter_chunks(NAME, source, chunk_rows):
+            chunk = _new_rows(chunk, state.watermark)
+            kept = chunk[seen.first_seen(pd.util.hash_pandas_object(chunk, index=False).to_numpy())]
+
+            if not len(kept):
+                continue
+
+            missing = kept.isna().any()
+            for column in has_gaps:
+                has_gaps[column] = has_gaps[column] or bool(missing[column])
+
+            for column, sketch in state.sketches.items():
+                sketch.update(kept[column].to_numpy(dtype=np.float64, na_value=np.nan))
+
+            pickle.dump(kept, spill, protocol=pickle.HIGHEST_PROTOCOL)
+            new_rows += len(kept)
+            chunks += 1
+
+        if not new_rows:
+            if not os.path.exists(state_path):
+                state.save(state_path)
+            return 0
+
+        medians = state.medians()
+        dtypes = _output_dtypes(spec, has_gaps)
+        header = not os.path.exists(output) or state.size == 0
+        spill.seek(0)
+
+        # Pass 2: fill and append the new rows; the state is only
+        # committed once they are all on disk
+        with open(output, "a", newline="") as f:
+            for _ in range(chunks):
+                kept = pickle.load(spill).astype(dtypes)
+                kept = kept.fillna({column: median for column, median in medians.items()
+                                    if has_gaps[column] and not np.isnan(median)})
+
+                kept.to_csv(f, header=header, index=False)
+                header = False
+
+                _advance(state, kept, sketches=False)
+
+            f.flush()
+            os.fsync(f.fileno())
+
+    state.float_columns |= {column for column, dtype in dtypes.items() if dtype == "float64"}
+    state.size = os.path.getsize(output)
+    state.save(state_path)
+
+    return new_rows
+
+
+def summary(state_path=DEFAULT_STATE):
+    return HistoryState.load(state_path).meta()
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+    # python history_ingest.py [orders.csv | workbook.xlsx ...]
+    for source in sys.argv[1:] or [None]:
+        appended = ingest(source)
+        print(f"✅ Appended {appended} new orders from {source or RAW_SOURCES[NAME]['file']}")
+
+    meta = summary()
+    print(f"   {meta['rows']} rows, {WATERMARK_COLUMN} watermark {meta['watermark']}, "
+          f"latest order date {meta['max_date']}")
+
+    # Publish the similar-shipments index of the grown history
+    from similar_shipments import HistoryUnavailable, ShipmentIndexStore
+
+    try:
+        print(f"🌲 History index: {ShipmentIndexStore.from_env().compile()}")
+    except (HistoryUnavailable, ImportError) as exc:
+        print(f"⚠️ History index not built: {exc}")
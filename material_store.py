@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from file_utils import file_hash, publish_snapshot, replace_file
+from scoring import ScoringEngine, material_columns
+
+# ==============================
+# SNAPSHOT LAYOUT
+# ==============================
+#
+#   <root>/CURRENT              name of the live snapshot, replaced atomically
+#   <root>/<version>/meta.json  format, row count, column list, source file hash
+#   <root>/<version>/<column>.npy
+#   <root>/<version>/engine/<array>.npy   prebuilt ScoringEngine arrays
+#
+# Snapshots are immutable once published. Readers memory-map the .npy files,
+# so loading one costs a few page faults instead of a CSV parse, and every
+# process that maps the same snapshot shares one copy in the page cache.
+# A CURRENT written by a release with another SNAPSHOT_FORMAT is recompiled
+# on the next get() instead of being loaded.
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+DEFAULT_SOURCE = os.path.join(BASE_DIR, "data", "final", "ml_dataset.csv")
+DEFAULT_ROOT = os.path.join(BASE_DIR, "data", "final", "snapshots")
+
+CURRENT_FILE = "CURRENT"
+META_FILE = "meta.json"
+ENGINE_DIR = "engine"
+
+# Bump when the engine arrays change shape or meaning, so that existing
+# snapshots of an unchanged CSV are rebuilt rather than reused.
+SNAPSHOT_FORMAT = 6
+
+
+def _column_file(name):
+    return f"{name}.npy"
+
+
+# ==============================
+# MATERIAL STORE
+# ==============================
+
+class MaterialStore:
+    """Compiled material snapshots with hot reload.
+
+    ``get()`` returns the engine for the live snapshot. It re-checks the
+    CURRENT pointer at most every ``check_interval`` seconds and swaps in a
+    new engine when it changes; requests that already hold the old engine
+    keep using it until they finish.
+    """
+
+    def __init__(self, root, source_csv, check_interval=2.0, shared=True):
+        self.root = root
+        self.source_csv = source_csv
+        self.check_interval = check_interval
+
+        # Shared: attach to the prebuilt engine arrays read-only, zero copy.
+        # Private: rebuild the engine from the columns in this process.
+        self.shared = shared
+
+        self._engine = None
+        self._pointer_mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, source_csv=None):
+        return cls(
+            os.environ.get("MATERIAL_SNAPSHOT_DIR", DEFAULT_ROOT),
+            source_csv or DEFAULT_SOURCE,
+            check_interval=float(os.environ.get("MATERIAL_RELOAD_INTERVAL", 2.0)),
+            shared=os.environ.get("MATERIAL_SHARED_TABLE", "1") == "1"
+        )
+
+    # ==============================
+    # COMPILE / PUBLISH
+    # ==============================
+
+    def compile(self, keep=3):
+        os.makedirs(self.root, exist_ok=True)
+
+        source_hash = file_hash(self.source_csv)
+        version = hashlib.sha256(
+            f"{source_hash}:{SNAPSHOT_FORMAT}".encode()).hexdigest()[:16]
+        target = os.path.join(self.root, version)
+
+        if not os.path.exists(os.path.join(target, META_FILE)):
+            columns = material_columns(pd.read_csv(self.source_csv))
+
+            # Write into a private directory and rename it into place, so a
+            # half-written snapshot is never visible under its final name.
+            staging = tempfile.mkdtemp(prefix=".staging-", dir=self.root)
+
+            for name, values in columns.items():
+                np.save(os.path.join(staging, _column_file(name)), values)
+
+            arrays, scalars = ScoringEngine.from_columns(columns).export()
+            os.makedirs(os.path.join(staging, ENGINE_DIR))
+
+            for name, values in arrays.items():
+                np.save(os.path.join(staging, ENGINE_DIR, _column_file(name)), values)
+
+            with open(os.path.join(staging, META_FILE), "w") as f:
+                json.dump({
+                    "version": version,
+                    "format": SNAPSHOT_FORMAT,
+                    "rows": len(next(iter(columns.values()), [])),
+                    "columns": list(columns),
+                    "engine": scalars,
+                    "source": os.path.basename(self.source_csv),
+                    "source_sha256": source_hash,
+                    "created_at": time.time()
+                }, f, indent=2)
+
+            publish_snapshot(staging, target)
+
+        self.publish(version)
+        self.prune(keep)
+
+        return version
+
+    def publish(self, version):
+        replace_file(os.path.join(self.root, CURRENT_FILE), version)
+
+    def prune(self, keep=3):
+        # Published snapshots that are no longer current can still be mapped
+        # by running workers; unlinking them is safe on POSIX, the pages stay
+        # alive until the last mapping goes away.
+        current = self.current_version()
+        snapshots = []
+
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith(".") or not os.path.isdir(path) or name == current:
+                continue
+            snapshots.append((os.path.getmtime(path), path))
+
+        for _, path in sorted(snapshots, reverse=True)[max(keep - 1, 0):]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    # ==============================
+    # LOAD
+    # ==============================
+
+    def current_version(self):
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load_meta(self, version):
+        with open(os.path.join(self.root, version, META_FILE)) as f:
+            return json.load(f)
+
+    def is_compatible(self, version):
+        # Snapshots from before the format was recorded count as stale
+        try:
+            return bool(version) and self.load_meta(version).get("format") == SNAPSHOT_FORMAT
+        except (OSError, ValueError):
+            return False
+
+    def load_columns(self, version):
+        path = os.path.join(self.root, version)
+
+        return {
+            name: np.load(os.path.join(path, _column_file(name)), mmap_mode="r")
+            for name in self.load_meta(version)["columns"]
+        }
+
+    def load(self, version):
+        if not self.is_compatible(version):
+            raise ValueError(f"snapshot {version} in {self.root} is not format {SNAPSHOT_FORMAT}")
+
+        if not self.shared:
+            return ScoringEngine.from_columns(self.load_columns(version), version=version)
+
+        path = os.path.join(self.root, version, ENGINE_DIR)
+        arrays = {
+            name: np.load(os.path.join(path, _column_file(name)), mmap_mode="r")
+            for name in ScoringEngine.ARRAYS
+        }
+
+        return ScoringEngine.from_arrays(arrays, self.load_meta(version)["engine"],
+                                         version=version)
+
+    def get(self):
+        now = time.monotonic()
+
+        if self._engine is not None and now - self._checked_at < self.check_interval:
+            return self._engine
+
+        with self._lock:
+            if self._engine is not None and now - self._checked_at < self.check_interval:
+                return self._engine
+
+            self._checked_at = now
+            pointer = os.path.join(self.root, CURRENT_FILE)
+
+            try:
+                mtime = os.stat(pointer).st_mtime_ns
+            except FileNotFoundError:
+                self.compile()
+                mtime = os.stat(pointer).st_mtime_ns
+
+            if self._engine is None or mtime != self._pointer_mtime:
+                version = self.current_version()
+
+                if not self.is_compatible(version):
+                    # CURRENT still names a snapshot of an older release
+                    version = self.compile()
+                    mtime = os.stat(pointer).st_mtime_ns
+
+                if self._engine is None or version != self._engine.version:
+                    # Build the new engine fully before the reference swap
+                    self._engine = self.load(version)
+
+                self._pointer_mtime = mtime
+
+            return self._engine
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+    store = MaterialStore.from_env(sys.argv[1] if len(sys.argv) > 1 else None)
+    version = store.compile()
+
+    print(f"✅ Published material snapshot {version} to {store.root}")
@@ -1,6 +1,4 @@
-from flask_sqlalchemy import SQLAlchemy
-
-db = SQLAlchemy()
+from database import db
 
 class PackagingHistory(db.Model):
     __tablename__ = "packaging_history"
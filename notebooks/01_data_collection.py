@@ -1,11 +1,16 @@
-import pandas as pd
 import os
+import sys
 
-RAW_PATH = "../data/raw"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RAW_PATH = os.path.join(BASE_DIR, "..", "data", "raw")
 os.makedirs(RAW_PATH, exist_ok=True)
 
-materials = pd.read_excel("../data/raw/materials_database_600.xlsx")
-packaging = pd.read_excel("../data/raw/real_packaging_history.xlsx")
+sys.path.insert(0, os.path.join(BASE_DIR, ".."))
+from raw_data import read_raw
+
+# Typed columnar copies of the workbooks; see raw_data.py
+materials = read_raw("materials")
+packaging = read_raw("packaging_history")
 
 print("✅ Dataset Loaded Successfully")
 print("Materials Shape:", materials.shape)
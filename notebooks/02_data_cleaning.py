@@ -1,15 +1,29 @@
-import pandas as pd
 import os
+import sys
 
-RAW_PATH = "../data/raw"
-PROCESSED_PATH = "../data/processed"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RAW_PATH = os.path.join(BASE_DIR, "..", "data", "raw")
+PROCESSED_PATH = os.path.join(BASE_DIR, "..", "data", "processed")
 os.makedirs(PROCESSED_PATH, exist_ok=True)
 
+sys.path.insert(0, os.path.join(BASE_DIR, ".."))
+from raw_data import read_raw
+from chunked_cleaning import clean_history
+from history_ingest import ingest, summary
+from similar_shipments import HistoryUnavailable, ShipmentIndexStore
+
+# "memory" loads the packaging history whole; "stream" cleans it in chunks
+# (see chunked_cleaning.py) for histories too large to load; "incremental"
+# only appends orders newer than the last run (see history_ingest.py)
+CLEANING_MODE = os.environ.get("CLEANING_MODE", "memory")
+INCREMENTAL = CLEANING_MODE == "incremental"
+STREAM = CLEANING_MODE == "stream" or INCREMENTAL
+
 # ===============================
 # LOAD DATASETS
 # ===============================
-materials = pd.read_excel(f"{RAW_PATH}/materials_database_600.xlsx")
-packaging = pd.read_excel(f"{RAW_PATH}/real_packaging_history.xlsx")
+materials = read_raw("materials")
+packaging = None if STREAM else read_raw("packaging_history")
 
 print("\n================ DATASET OVERVIEW ================\n")
 
@@ -19,25 +33,44 @@ print("\n================ DATASET OVERVIEW ================\n")
 print("📌 BEFORE CLEANING\n")
 
 print("Materials Dataset Shape:", materials.shape)
-print("Packaging Dataset Shape:", packaging.shape)
+if not STREAM:
+    print("Packaging Dataset Shape:", packaging.shape)
 
 print("\n🔍 Missing Values (Materials):")
 print(materials.isnull().sum())
 
-print("\n🔍 Missing Values (Packaging):")
-print(packaging.isnull().sum())
+if not STREAM:
+    print("\n🔍 Missing Values (Packaging):")
+    print(packaging.isnull().sum())
 
 print("\n🔁 Duplicate Rows (Materials):", materials.duplicated().sum())
-print("🔁 Duplicate Rows (Packaging):", packaging.duplicated().sum())
+if not STREAM:
+    print("🔁 Duplicate Rows (Packaging):", packaging.duplicated().sum())
 
 # ===============================
 # CLEANING PROCESS
 # ===============================
 materials_cleaned = materials.drop_duplicates()
-packaging_cleaned = packaging.drop_duplicates()
-
 materials_cleaned.fillna(materials_cleaned.median(numeric_only=True), inplace=True)
-packaging_cleaned.fillna(packaging_cleaned.median(numeric_only=True), inplace=True)
+
+if INCREMENTAL:
+    appended = ingest()
+    state = summary()
+
+    print("📥 New Orders Appended (Packaging):", appended)
+    print("Order_ID Watermark:", state["watermark"])
+elif STREAM:
+    # Written straight to the output file, chunk by chunk
+    stats = clean_history("packaging_history",
+                          f"{PROCESSED_PATH}/cleaned_packaging_history.csv")
+
+    print("Packaging Dataset Shape:", (stats["rows_in"], len(stats["missing_before"])))
+    print("\n🔍 Missing Values (Packaging):")
+    print(stats["missing_before"])
+    print("🔁 Duplicate Rows (Packaging):", stats["duplicates"])
+else:
+    packaging_cleaned = packaging.drop_duplicates()
+    packaging_cleaned.fillna(packaging_cleaned.median(numeric_only=True), inplace=True)
 
 # ===============================
 # AFTER CLEANING
@@ -45,13 +78,19 @@ packaging_cleaned.fillna(packaging_cleaned.median(numeric_only=True), inplace=Tr
 print("\n================ AFTER CLEANING ================\n")
 
 print("Materials Dataset Shape:", materials_cleaned.shape)
-print("Packaging Dataset Shape:", packaging_cleaned.shape)
+if INCREMENTAL:
+    print("Packaging Dataset Rows:", state["rows"])
+elif STREAM:
+    print("Packaging Dataset Shape:", (stats["rows_out"], len(stats["missing_after"])))
+else:
+    print("Packaging Dataset Shape:", packaging_cleaned.shape)
 
 print("\n🔍 Remaining Missing Values (Materials):")
 print(materials_cleaned.isnull().sum())
 
-print("\n🔍 Remaining Missing Values (Packaging):")
-print(packaging_cleaned.isnull().sum())
+if not INCREMENTAL:
+    print("\n🔍 Remaining Missing Values (Packaging):")
+    print(stats["missing_after"] if STREAM else packaging_cleaned.isnull().sum())
 
 # ===============================
 # SAVE CLEANED DATA
@@ -60,8 +99,19 @@ materials_cleaned.to_csv(
     f"{PROCESSED_PATH}/cleaned_materials.csv", index=False
 )
 
-packaging_cleaned.to_csv(
-    f"{PROCESSED_PATH}/cleaned_packaging_history.csv", index=False
-)
+if not STREAM:
+    packaging_cleaned.to_csv(
+        f"{PROCESSED_PATH}/cleaned_packaging_history.csv", index=False
+    )
+
+# ===============================
+# SIMILAR SHIPMENTS INDEX
+# ===============================
+# Built here, not on a request; running workers switch to it on their own
+try:
+    index_path = ShipmentIndexStore.from_env().compile()
+    print("\n🌲 Packaging History Index:", index_path)
+except (HistoryUnavailable, ImportError) as exc:
+    print("\n⚠️ Packaging history index not built:", exc)
 
 print("\n✅ Data Cleaning Completed Successfully")
@@ -1,9 +1,13 @@
+import os
 import pandas as pd
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROCESSED_PATH = os.path.join(BASE_DIR, "..", "data", "processed")
+
 # ===============================
 # LOAD CLEANED DATA
 # ===============================
-materials = pd.read_csv("../data/processed/cleaned_materials.csv")
+materials = pd.read_csv(f"{PROCESSED_PATH}/cleaned_materials.csv")
 
 print("\n================ DATA QUALITY CHECK (BEFORE) ================\n")
 
@@ -65,7 +69,7 @@ print((materials["Material_Suitability_Score"] < 0).sum())
 # SAVE ENGINEERED DATA
 # ===============================
 materials.to_csv(
-    "../data/processed/engineered_materials.csv",
+    f"{PROCESSED_PATH}/engineered_materials.csv",
     index=False
 )
 
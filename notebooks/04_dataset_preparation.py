@@ -6,8 +6,9 @@ from sklearn.preprocessing import StandardScaler, LabelEncoder
 # ===============================
 # PATH SETUP
 # ===============================
-PROCESSED_PATH = "../data/processed"
-FINAL_PATH = "../data/final"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROCESSED_PATH = os.path.join(BASE_DIR, "..", "data", "processed")
+FINAL_PATH = os.path.join(BASE_DIR, "..", "data", "final")
 os.makedirs(FINAL_PATH, exist_ok=True)
 
 # ===============================
@@ -11,10 +11,20 @@ from xgboost import XGBRegressor
 # ===============================
 # PATH SETUP
 # ===============================
-FINAL_PATH = "../data/final"
-MODEL_PATH = "../models"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FINAL_PATH = os.path.join(BASE_DIR, "..", "data", "final")
+MODEL_PATH = os.path.join(BASE_DIR, "..", "models")
 os.makedirs(MODEL_PATH, exist_ok=True)
 
+# "cost", "co2" or "all"; pipeline.py trains the two models in parallel
+MODEL_TARGET = os.environ.get("MODEL_TARGET", "all")
+
+if MODEL_TARGET not in ("all", "cost", "co2"):
+    raise ValueError(f"MODEL_TARGET must be all, cost or co2, not {MODEL_TARGET!r}")
+
+TRAIN_COST = MODEL_TARGET in ("all", "cost")
+TRAIN_CO2 = MODEL_TARGET in ("all", "co2")
+
 # ===============================
 # LOAD FINAL DATASET
 # ===============================
@@ -62,51 +72,58 @@ _, _, y_co2_train, y_co2_test = train_test_split(
 # ===============================
 # COST PREDICTION MODEL
 # ===============================
-cost_model = RandomForestRegressor(
-    n_estimators=150,
-    random_state=42
-)
+if TRAIN_COST:
+    cost_model = RandomForestRegressor(
+        n_estimators=150,
+        random_state=42
+    )
 
-cost_model.fit(X_train, y_cost_train)
-cost_pred = cost_model.predict(X_test)
+    cost_model.fit(X_train, y_cost_train)
+    cost_pred = cost_model.predict(X_test)
 
-rmse_cost = np.sqrt(mean_squared_error(y_cost_test, cost_pred))
-mae_cost = mean_absolute_error(y_cost_test, cost_pred)
-r2_cost = r2_score(y_cost_test, cost_pred)
+    rmse_cost = np.sqrt(mean_squared_error(y_cost_test, cost_pred))
+    mae_cost = mean_absolute_error(y_cost_test, cost_pred)
+    r2_cost = r2_score(y_cost_test, cost_pred)
 
-print("\n📊 COST PREDICTION MODEL PERFORMANCE")
-print("RMSE:", round(rmse_cost, 3))
-print("MAE :", round(mae_cost, 3))
-print("R²  :", round(r2_cost, 3))
+    print("\n📊 COST PREDICTION MODEL PERFORMANCE")
+    print("RMSE:", round(rmse_cost, 3))
+    print("MAE :", round(mae_cost, 3))
+    print("R²  :", round(r2_cost, 3))
 
 # ===============================
 # CO₂ IMPACT PREDICTION MODEL
 # ===============================
-co2_model = XGBRegressor(
-    n_estimators=150,
-    learning_rate=0.1,
-    max_depth=5,
-    random_state=42
-)
+if TRAIN_CO2:
+    co2_model = XGBRegressor(
+        n_estimators=150,
+        learning_rate=0.1,
+        max_depth=5,
+        random_state=42
+    )
 
-co2_model.fit(X_train, y_co2_train)
-co2_pred = co2_model.predict(X_test)
+    co2_model.fit(X_train, y_co2_train)
+    co2_pred = co2_model.predict(X_test)
 
-rmse_co2 = np.sqrt(mean_squared_error(y_co2_test, co2_pred))
-mae_co2 = mean_absolute_error(y_co2_test, co2_pred)
-r2_co2 = r2_score(y_co2_test, co2_pred)
+    rmse_co2 = np.sqrt(mean_squared_error(y_co2_test, co2_pred))
+    mae_co2 = mean_absolute_error(y_co2_test, co2_pred)
+    r2_co2 = r2_score(y_co2_test, co2_pred)
 
-print("\n📊 CO₂ IMPACT PREDICTION MODEL PERFORMANCE")
-print("RMSE:", round(rmse_co2, 3))
-print("MAE :", round(mae_co2, 3))
-print("R²  :", round(r2_co2, 3))
+    print("\n📊 CO₂ IMPACT PREDICTION MODEL PERFORMANCE")
+    print("RMSE:", round(rmse_co2, 3))
+    print("MAE :", round(mae_co2, 3))
+    print("R²  :", round(r2_co2, 3))
 
 # ===============================
 # SAVE MODELS
 # ===============================
-joblib.dump(cost_model, f"{MODEL_PATH}/cost_model.pkl")
-joblib.dump(co2_model, f"{MODEL_PATH}/co2_model.pkl")
-joblib.dump(scaler, f"{MODEL_PATH}/scaler.pkl")
-joblib.dump(encoder, f"{MODEL_PATH}/category_encoder.pkl")
+# The scaler and encoder are identical for both targets; the cost run
+# owns them so parallel runs never write the same file.
+if TRAIN_COST:
+    joblib.dump(cost_model, f"{MODEL_PATH}/cost_model.pkl")
+    joblib.dump(scaler, f"{MODEL_PATH}/scaler.pkl")
+    joblib.dump(encoder, f"{MODEL_PATH}/category_encoder.pkl")
+
+if TRAIN_CO2:
+    joblib.dump(co2_model, f"{MODEL_PATH}/co2_model.pkl")
 
 print("\n✅ Models Trained and Saved Successfully")
@@ -0,0 +1,267 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from file_utils import file_hash
+
+# ==============================
+# NOTEBOOK PIPELINE
+# ==============================
+#
+# Runs notebooks/01-05 as a graph of stages. Each stage declares the files
+# it reads and writes; a stage depends on whichever stage writes one of its
+# inputs. A stage is skipped when its script, inputs and environment hash
+# the same as on its last successful run and its outputs are still the
+# files it wrote. Independent stages (the cost and CO2 models) run in
+# parallel processes.
+#
+#   python pipeline.py                 # run what changed
+#   python pipeline.py --dry-run       # show what would run
+#   python pipeline.py --force train_co2_model
+#
+# notebooks/06 is interactive (it prompts for a shipment) and is not a
+# stage; the web app serves its ranking from predictions.py instead.
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+NOTEBOOKS = os.path.join(BASE_DIR, "notebooks")
+STATE_FILE = os.path.join(BASE_DIR, ".pipeline", "state.json")
+
+
+def _data(*parts):
+    return os.path.join("data", *parts)
+
+
+def _model(name):
+    return os.path.join("models", name)
+
+
+class Stage:
+
+    def __init__(self, name, script, inputs, outputs, env=None):
+        self.name = name
+        self.script = script
+        self.inputs = inputs
+        self.outputs = outputs
+        self.env = env or {}
+
+    def key(self):
+        digest = hashlib.sha256()
+        digest.update(file_hash(os.path.join(NOTEBOOKS, self.script)).encode())
+
+        for path in self.inputs:
+            digest.update(f"{path}:{file_hash(os.path.join(BASE_DIR, path))}".encode())
+
+        digest.update(json.dumps(self.env, sort_keys=True).encode())
+
+        return digest.hexdigest()
+
+    def output_hashes(self):
+        hashes = {}
+
+        for path in self.outputs:
+            full = os.path.join(BASE_DIR, path)
+            hashes[path] = file_hash(full) if os.path.exists(full) else None
+
+        return hashes
+
+
+# raw_data.py declares the workbook dtypes, so it is an input too
+RAW_INPUTS = [_data("raw", "materials_database_600.xlsx"),
+              _data("raw", "real_packaging_history.xlsx"),
+              "raw_data.py"]
+
+STAGES = [
+    Stage("data_collection", "01_data_collection.py",
+          inputs=RAW_INPUTS,
+          outputs=[]),
+    Stage("data_cleaning", "02_data_cleaning.py",
+          inputs=RAW_INPUTS + ["chunked_cleaning.py", "history_ingest.py",
+                               "similar_shipments.py"],
+          outputs=[_data("processed", "cleaned_materials.csv"),
+                   _data("processed", "cleaned_packaging_history.csv")],
+          env={"CLEANING_MODE": os.environ.get("CLEANING_MODE", "memory")}),
+    Stage("feature_engineering", "03_feature_engineering.py",
+          inputs=[_data("processed", "cleaned_materials.csv")],
+          outputs=[_data("processed", "engineered_materials.csv")]),
+    Stage("dataset_preparation", "04_dataset_preparation.py",
+          inputs=[_data("processed", "engineered_materials.csv")],
+          outputs=[_data("final", "ml_dataset.csv")]),
+    Stage("train_cost_model", "05_model_training.py",
+          inputs=[_data("final", "ml_dataset.csv")],
+          outputs=[_model("cost_model.pkl"), _model("scaler.pkl"),
+                   _model("category_encoder.pkl")],
+          env={"MODEL_TARGET": "cost"}),
+    Stage("train_co2_model", "05_model_training.py",
+          inputs=[_data("final", "ml_dataset.csv")],
+          outputs=[_model("co2_model.pkl")],
+          env={"MODEL_TARGET": "co2"})
+]
+
+
+# ==============================
+# STATE
+# ==============================
+
+def load_state():
+    try:
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".state-", dir=os.path.dirname(STATE_FILE))
+
+    with os.fdopen(fd, "w") as f:
+        json.dump(state, f, indent=2)
+
+    os.replace(tmp_path, STATE_FILE)
+
+
+def is_fresh(stage, record):
+    if not record:
+        return False
+
+    return (record.get("key") == stage.key()
+            and record.get("outputs") == stage.output_hashes())
+
+
+# ==============================
+# RUNNER
+# ==============================
+
+def dependencies(stages):
+    producers = {path: stage.name for stage in stages for path in stage.outputs}
+
+    return {
+        stage.name: {producers[path] for path in stage.inputs
+                     if path in producers and producers[path] != stage.name}
+        for stage in stages
+    }
+
+
+def run_stage(stage):
+    env = {**os.environ, **stage.env}
+    started = time.perf_counter()
+
+    result = subprocess.run([sys.executable, stage.script], cwd=NOTEBOOKS, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+    return result.returncode, result.stdout, time.perf_counter() - started
+
+
+def run(stages=STAGES, force=(), jobs=None, dry_run=False):
+    """Run stale stages, parallel where the graph allows.
+
+    Returns {stage name: (status, seconds)} with status "ran", "skipped",
+    "failed" or "blocked" (an upstream stage failed).
+    """
+    state = load_state()
+    depends = dependencies(stages)
+    by_name = {stage.name: stage for stage in stages}
+    force = set(force)
+
+    report = {}
+    ran = set()
+    pending = [stage.name for stage in stages]
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        while pending or running:
+            for name in list(pending):
+                upstream = depends[name]
+
+                if upstream & {n for n, (status, _) in report.items()
+                               if status in ("failed", "blocked")}:
+                    report[name] = ("blocked", 0.0)
+                    pending.remove(name)
+                    continue
+
+                if upstream - set(report):
+                    continue
+
+                pending.remove(name)
+                stage = by_name[name]
+
+                # Rerun when forced or when the script, inputs or outputs no
+                # longer match the last run; an upstream rerun that rewrote
+                # identical files does not cascade. A dry run cannot hash
+                # outputs it has not produced, so it assumes they change.
+                stale = (name in force or (dry_run and upstream & ran)
+                         or not is_fresh(stage, state.get(name)))
+
+                if not stale:
+                    report[name] = ("skipped", 0.0)
+                elif dry_run:
+                    report[name] = ("would run", 0.0)
+                    ran.add(name)
+                else:
+                    print(f"▶ {name}")
+                    running[executor.submit(run_stage, stage)] = name
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = running.pop(future)
+                stage = by_name[name]
+                code, output, seconds = future.result()
+
+                if code != 0:
+                    print(f"❌ {name} failed after {seconds:.1f}s\n{output}")
+                    report[name] = ("failed", seconds)
+                    continue
+
+                state[name] = {
+                    "key": stage.key(),
+                    "outputs": stage.output_hashes(),
+                    "seconds": round(seconds, 3),
+                    "finished_at": time.time()
+                }
+                save_state(state)
+
+                print(f"✅ {name} ({seconds:.1f}s)")
+                report[name] = ("ran", seconds)
+                ran.add(name)
+
+    return report
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--force", nargs="*", default=None, metavar="STAGE",
+                        help="rerun these stages (all when no names are given)")
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    names = [stage.name for stage in STAGES]
+    force = names if args.force == [] else args.force or []
+    unknown = set(force) - set(names)
+
+    if unknown:
+        sys.exit(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    report = run(force=force, jobs=args.jobs, dry_run=args.dry_run)
+
+    print("\n⏱  Stage timings")
+    for name in names:
+        status, seconds = report[name]
+        print(f"  {name:<22} {status:<10} {seconds:8.2f}s")
+
+    if any(status in ("failed", "blocked") for status, _ in report.values()):
+        sys.exit(1)
@@ -0,0 +1,260 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from file_utils import file_hash, publish_snapshot
+from material_store import MaterialStore
+from scoring import round2
+from tree_models import load_model
+
+# ==============================
+# PRECOMPUTED ML PREDICTIONS
+# ==============================
+#
+# The cost and CO2 models of notebooks/05 only see per-material features
+# (suitability score, tensile strength, category), so their predictions
+# never depend on the shipment. They are computed once per (snapshot,
+# model version) for the whole catalog and stored next to the material
+# arrays:
+#
+#   <snapshot>/predictions/<model version>/cost_per_kg.npy
+#   <snapshot>/predictions/<model version>/co2_per_kg.npy
+#   <snapshot>/predictions/<model version>/meta.json
+#
+# Serving a request is then a strength filter over a presorted order and
+# a multiply by the shipment weight; no model is loaded in the workers.
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+DEFAULT_MODEL_DIR = os.path.join(BASE_DIR, "models")
+
+MODEL_FILES = {
+    "cost": "cost_model.pkl",
+    "co2": "co2_model.pkl",
+    "scaler": "scaler.pkl",
+    "category_encoder": "category_encoder.pkl"
+}
+
+FEATURES = ["Material_Suitability_Score", "Tensile_Strength_MPa", "Category_Encoded"]
+
+PREDICTIONS_DIR = "predictions"
+META_FILE = "meta.json"
+
+# Minimum tensile strength per fragility level, as in notebooks/06
+MIN_STRENGTH = {"L": 30, "M": 50, "H": 70}
+
+# Final_Score weights, as in notebooks/06
+COST_WEIGHT = 0.5
+CO2_WEIGHT = 0.5
+
+
+class ModelsUnavailable(Exception):
+    pass
+
+
+def model_version(model_dir):
+    missing = [name for name in MODEL_FILES.values()
+               if not os.path.exists(os.path.join(model_dir, name))]
+
+    if missing:
+        raise ModelsUnavailable(f"missing {', '.join(missing)} in {model_dir}")
+
+    digest = hashlib.sha256()
+
+    for key in sorted(MODEL_FILES):
+        digest.update(f"{key}:{file_hash(os.path.join(model_dir, MODEL_FILES[key]))}".encode())
+
+    return digest.hexdigest()[:16]
+
+
+def predict_catalog(columns, model_dir):
+    # Model libraries are only needed here, never in the serving path
+    try:
+        import joblib
+    except ImportError as exc:
+        raise ModelsUnavailable(f"cannot load models: {exc}") from exc
+
+    # Forests go through their compiled export when one is current
+    models = {key: (load_model if key in ("cost", "co2") else joblib.load)(
+                  os.path.join(model_dir, name))
+              for key, name in MODEL_FILES.items()}
+
+    features = pd.DataFrame({
+        "Material_Suitability_Score": columns["Material_Suitability_Score"],
+        "Tensile_Strength_MPa": columns["Tensile_Strength_MPa"],
+        "Category_Encoded": models["category_encoder"].transform(columns["Category"])
+    })[FEATURES]
+
+    scaled = models["scaler"].transform(features)
+
+    return (np.asarray(models["cost"].predict(scaled), dtype=np.float64),
+            np.asarray(models["co2"].predict(scaled), dtype=np.float64))
+
+
+# ==============================
+# PREDICTED RANKING
+# ==============================
+
+class PredictedRanking:
+    """notebooks/06 ranking over precomputed per-kg predictions.
+
+    Final_Score = 0.5 / Total_Cost + 0.5 / Total_CO2, and both totals are
+    the per-kg prediction times the same shipment weight, so the order of
+    the catalog by Final_Score is fixed; it is sorted once here and a
+    request only drops the materials below its minimum strength.
+    """
+
+    def __init__(self, names, strength, cost_per_kg, co2_per_kg, version=None):
+        self.names = names
+        self.strength = strength
+        self.cost_per_kg = cost_per_kg
+        self.co2_per_kg = co2_per_kg
+        self.version = version
+
+        with np.errstate(divide="ignore"):
+            self.final_score = COST_WEIGHT / cost_per_kg + CO2_WEIGHT / co2_per_kg
+
+        self.order = np.argsort(-self.final_score, kind="stable")
+
+    def rank(self, weight, units, fragility, k=5):
+        total_weight = weight * units
+        min_strength = MIN_STRENGTH.get(fragility, MIN_STRENGTH["L"])
+
+        eligible = self.order[self.strength[self.order] >= min_strength]
+        indices = eligible[:k]
+
+        if not len(indices):
+            return []
+
+        total_cost = round2(self.cost_per_kg[indices] * total_weight)
+        total_co2 = round2(self.co2_per_kg[indices] * total_weight)
+
+        # Final_Score relative to the best eligible material, on the 0-100
+        # scale the results page uses for its score
+        scores = round2(self.final_score[indices] / self.final_score[eligible[0]] * 100)
+
+        return [{
+            "Material": str(self.names[i]),
+            "Total_Cost": float(total_cost[pos]),
+            "Total_CO2": float(total_co2[pos]),
+            "Strength": float(self.strength[i]),
+            "Score": float(scores[pos]),
+            "Reasons": "Lowest predicted cost and CO2 per kg for its strength"
+        } for pos, i in enumerate(indices)]
+
+
+# ==============================
+# PREDICTION STORE
+# ==============================
+
+class PredictionStore:
+    """Per-snapshot prediction arrays for one set of trained models.
+
+    ``get()`` follows the material store: when it publishes a new snapshot
+    the predictions for it are loaded, or computed once if no process has
+    done so yet.
+    """
+
+    def __init__(self, material_store, model_dir=DEFAULT_MODEL_DIR):
+        self.material_store = material_store
+        self.model_dir = model_dir
+
+        self._model_version = None
+        self._ranking = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, material_store):
+        return cls(material_store, os.environ.get("ML_MODEL_DIR", DEFAULT_MODEL_DIR))
+
+    @property
+    def model_version(self):
+        # Models only change on redeploy; hash them once per process
+        if self._model_version is None:
+            self._model_version = model_version(self.model_dir)
+        return self._model_version
+
+    def path(self, snapshot):
+        return os.path.join(self.material_store.root, snapshot, PREDICTIONS_DIR,
+                            self.model_version)
+
+    def compile(self, snapshot=None):
+        snapshot = snapshot or self.material_store.current_version() or self.material_store.compile()
+        target = self.path(snapshot)
+
+        if os.path.exists(os.path.join(target, META_FILE)):
+            return target
+
+        columns = self.material_store.load_columns(snapshot)
+        cost_per_kg, co2_per_kg = predict_catalog(columns, self.model_dir)
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=os.path.dirname(target))
+
+        np.save(os.path.join(staging, "cost_per_kg.npy"), cost_per_kg)
+        np.save(os.path.join(staging, "co2_per_kg.npy"), co2_per_kg)
+
+        with open(os.path.join(staging, META_FILE), "w") as f:
+            json.dump({
+                "snapshot": snapshot,
+                "model_version": self.model_version,
+                "models": MODEL_FILES,
+                "features": FEATURES,
+                "rows": len(cost_per_kg),
+                "created_at": time.time()
+            }, f, indent=2)
+
+        publish_snapshot(staging, target)
+
+        return target
+
+    def load(self, snapshot):
+        path = self.compile(snapshot)
+        columns = self.material_store.load_columns(snapshot)
+
+        return PredictedRanking(
+            columns["Material_Name"],
+            columns["Tensile_Strength_MPa"],
+            np.load(os.path.join(path, "cost_per_kg.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "co2_per_kg.npy"), mmap_mode="r"),
+            version=f"{snapshot}-{self.model_version}"
+        )
+
+    def get(self):
+        """Ranking for the live snapshot; raises ModelsUnavailable if the
+        trained models are not all present."""
+        snapshot = self.material_store.get().version
+        ranking = self._ranking
+
+        if ranking is not None and ranking.version.startswith(f"{snapshot}-"):
+            return ranking
+
+        with self._lock:
+            ranking = self._ranking
+
+            if ranking is None or not ranking.version.startswith(f"{snapshot}-"):
+                ranking = self._ranking = self.load(snapshot)
+
+            return ranking
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+    store = PredictionStore.from_env(
+        MaterialStore.from_env(sys.argv[1] if len(sys.argv) > 1 else None))
+
+    try:
+        path = store.compile()
+    except ModelsUnavailable as exc:
+        sys.exit(f"❌ Cannot compute predictions: {exc}")
+
+    print(f"✅ Stored catalog predictions in {path}")
@@ -0,0 +1,173 @@
+import glob
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+from file_utils import file_hash
+
+# ==============================
+# RAW WORKBOOK SIDECARS
+# ==============================
+#
+# Parsing the raw .xlsx files is the slowest part of notebooks/01-02. Each
+# workbook is parsed once, with the dtypes declared below, into a columnar
+# sidecar next to it:
+#
+#   data/raw/sidecars/<name>-<key>.parquet   (.pkl when pyarrow is missing)
+#
+# <key> hashes the workbook bytes, the declared dtypes and the format, so
+# editing the workbook or a dtype makes a new sidecar; older ones for the
+# same workbook are removed once the new one is written.
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+RAW_DIR = os.path.join(BASE_DIR, "data", "raw")
+SIDECAR_DIR = os.path.join(RAW_DIR, "sidecars")
+
+# Bump when the sidecar layout changes
+SIDECAR_FORMAT = 1
+
+# Integer and boolean columns are declared as nullable types so a missing
+# cell does not fail the read; read_raw() hands back the same numpy dtypes
+# pd.read_excel would have inferred.
+RAW_SOURCES = {
+    "materials": {
+        "file": "materials_database_600.xlsx",
+        "dtypes": {
+            "Material_ID": "Int64",
+            "Material_Name": "str",
+            "Category": "str",
+            "Density_kg_m3": "Int64",
+            "Tensile_Strength_MPa": "float64",
+            "CO2_Emission_kg": "float64",
+            "Cost_per_kg": "float64",
+            "Biodegradable": "str"
+        },
+        "dates": []
+    },
+    "packaging_history": {
+        "file": "real_packaging_history.xlsx",
+        "dtypes": {
+            "Order_ID": "Int64",
+            "Item_Name": "str",
+            "Category": "str",
+            "Weight_kg": "float64",
+            "Volumetric_Weight_kg": "float64",
+            "L_cm": "Int64",
+            "W_cm": "Int64",
+            "H_cm": "Int64",
+            "Fragility": "Int64",
+            "Moisture_Sens": "boolean",
+            "Shipping_Mode": "str",
+            "Distance_km": "Int64",
+            "Packaging_Used": "str",
+            "Cost_USD": "float64",
+            "CO2_Emission_kg": "float64"
+        },
+        "dates": ["Date"]
+    }
+}
+
+
+def _sidecar_format():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "pkl"
+    return "parquet"
+
+
+def sidecar_key(name, source=None):
+    spec = RAW_SOURCES[name]
+    source = source or os.path.join(RAW_DIR, spec["file"])
+
+    digest = hashlib.sha256()
+    digest.update(file_hash(source).encode())
+    digest.update(json.dumps([spec["dtypes"], spec["dates"]], sort_keys=True).encode())
+    digest.update(f"{SIDECAR_FORMAT}:{_sidecar_format()}".encode())
+
+    return digest.hexdigest()[:16]
+
+
+def sidecar_path(name, source=None):
+    return os.path.join(SIDECAR_DIR, f"{name}-{sidecar_key(name, source)}.{_sidecar_format()}")
+
+
+def _parse(name, source):
+    spec = RAW_SOURCES[name]
+    frame = pd.read_excel(source, dtype=spec["dtypes"])
+
+    for column in spec["dates"]:
+        frame[column] = pd.to_datetime(frame[column])
+
+    return frame
+
+
+def _restore(frame):
+    # Nullable columns back to what read_excel infers: int64 / bool without
+    # gaps, float64 with them
+    for column, dtype in frame.dtypes.items():
+        if isinstance(dtype, pd.Int64Dtype):
+            has_gaps = frame[column].isna().any()
+            frame[column] = frame[column].astype("float64" if has_gaps else "int64")
+        elif isinstance(dtype, pd.BooleanDtype):
+            has_gaps = frame[column].isna().any()
+            frame[column] = frame[column].astype("float64" if has_gaps else "bool")
+
+    return frame
+
+
+def build_sidecar(name, source=None):
+    spec = RAW_SOURCES[name]
+    source = source or os.path.join(RAW_DIR, spec["file"])
+    target = sidecar_path(name, source)
+
+    if os.path.exists(target):
+        return target
+
+    frame = _parse(name, source)
+    os.makedirs(SIDECAR_DIR, exist_ok=True)
+
+    fd, partial = tempfile.mkstemp(prefix=f".{name}-", dir=SIDECAR_DIR)
+    os.close(fd)
+
+    try:
+        if target.endswith(".parquet"):
+            frame.to_parquet(partial, index=False)
+        else:
+            frame.to_pickle(partial)
+        os.replace(partial, target)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+    for stale in glob.glob(os.path.join(SIDECAR_DIR, f"{name}-*.*")):
+        if stale != target:
+            os.remove(stale)
+
+    return target
+
+
+def read_raw(name, source=None):
+    """DataFrame for a raw workbook in RAW_SOURCES, read from its sidecar
+    (built first if the workbook or its dtypes changed)."""
+    path = build_sidecar(name, source)
+
+    if path.endswith(".parquet"):
+        frame = pd.read_parquet(path)
+    else:
+        frame = pd.read_pickle(path)
+
+    return _restore(frame)
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or RAW_SOURCES:
+        print(f"✅ {name} -> {build_sidecar(name)}")
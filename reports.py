@@ -0,0 +1,216 @@
+import glob
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+
+log = logging.getLogger(__name__)
+
+# Padding SimpleDocTemplate's frame keeps inside the margins (6 pt a side),
+# plus a point of slack so a table measured to fit is not split
+FRAME_PADDING = 13
+
+TABLE_STYLE = [
+    ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.black)
+]
+
+
+# ==============================
+# PAGE-CHUNKED PDF BUILDER
+# ==============================
+
+class FlowableStream(list):
+    """A flowable list that refills itself from an iterator.
+
+    ``doc.build()`` consumes its list from the front, so handing it one of
+    these keeps only a few pages of flowables (and their rows) alive at a
+    time instead of the whole report.
+    """
+
+    def __init__(self, iterator, lookahead=4):
+        super().__init__()
+        self._iterator = iterator
+        self._lookahead = lookahead
+
+    def _fill(self):
+        while self._iterator is not None and super().__len__() < self._lookahead:
+            try:
+                self.append(next(self._iterator))
+            except StopIteration:
+                self._iterator = None
+
+    def __len__(self):
+        self._fill()
+        return super().__len__()
+
+    def __getitem__(self, index):
+        self._fill()
+        return super().__getitem__(index)
+
+
+def rows_per_page(headers, row, width, height):
+    # How many rows shaped like ``row`` fit under the header row in
+    # ``height`` points. Cells are single-line text, so rows are all as
+    # tall as the first.
+    header_height = Table([headers], style=TABLE_STYLE).wrap(width, height)[1]
+    row_height = Table([headers, row], style=TABLE_STYLE).wrap(width, height)[1] - header_height
+
+    return max(int((height - header_height) // row_height), 1)
+
+
+def table_pages(headers, rows, width, page_height, first_height):
+    # One table per page, each starting with the header row and sized to
+    # fill its page, so the next one starts a page of its own; the first
+    # gets the room left under the title. A chunk that still overflows is
+    # split by ReportLab with the header repeated.
+    rows = iter(rows)
+    first = next(rows, None)
+
+    if first is None:
+        yield Table([headers], style=TABLE_STYLE, repeatRows=1)
+        return
+
+    first = list(first)
+    chunk = [first]
+    size = rows_per_page(headers, first, width, first_height)
+
+    for row in rows:
+        if len(chunk) == size:
+            yield Table([headers] + chunk, style=TABLE_STYLE, repeatRows=1)
+            chunk = []
+            size = rows_per_page(headers, first, width, page_height)
+
+        chunk.append(list(row))
+
+    yield Table([headers] + chunk, style=TABLE_STYLE, repeatRows=1)
+
+
+def build_pdf(output, title, headers, rows, intro=()):
+    styles = getSampleStyleSheet()
+    doc = SimpleDocTemplate(output)
+    page_height = doc.height - FRAME_PADDING
+
+    heading = [Paragraph(title, styles["Title"])]
+    heading += [Paragraph(line, styles["Normal"]) for line in intro]
+    heading.append(Spacer(1, 20))
+
+    used = sum(flowable.wrap(doc.width, page_height)[1] + flowable.getSpaceBefore()
+               + flowable.getSpaceAfter() for flowable in heading)
+
+    def flowables():
+        yield from heading
+        yield from table_pages(headers, rows, doc.width, page_height, page_height - used)
+
+    doc.build(FlowableStream(flowables()))
+
+
+# ==============================
+# BACKGROUND REPORT JOBS
+# ==============================
+
+class ReportJobs:
+    """Background report generation with an on-disk cache.
+
+    A job id is the data version the report was built for (for example
+    "<max id>-<row count>"), so a finished report stays valid until new
+    rows arrive, and every worker process sharing ``directory`` can serve
+    it. ``render(path, *args)`` must write the complete report to ``path``;
+    ``args`` are passed through from ``submit()`` and must be fully
+    determined by the job id.
+    """
+
+    def __init__(self, directory, prefix, render, max_workers=1, keep=3):
+        self.directory = directory
+        self.prefix = prefix
+        self.render = render
+        self.keep = keep
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix=f"{prefix}-report")
+        self._futures = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, job_id):
+        return os.path.join(self.directory, f"{self.prefix}-{job_id}.pdf")
+
+    def status(self, job_id):
+        if os.path.exists(self.path(job_id)):
+            return "done"
+
+        with self._lock:
+            if job_id in self._errors:
+                return "failed"
+
+            future = self._futures.get(job_id)
+            if future is not None and not future.done():
+                return "running"
+
+        # Possibly being rendered by another worker process
+        if glob.glob(self.path(job_id) + ".*.part"):
+            return "running"
+
+        return "unknown"
+
+    def submit(self, job_id, *args):
+        with self._lock:
+            future = self._futures.get(job_id)
+
+            if os.path.exists(self.path(job_id)) or (future is not None and not future.done()):
+                return future
+
+            self._errors.pop(job_id, None)
+            self._futures = {key: f for key, f in self._futures.items() if not f.done()}
+
+            future = self._executor.submit(self._run, job_id, *args)
+            self._futures[job_id] = future
+
+            return future
+
+    def wait(self, job_id, timeout, *args):
+        future = self.submit(job_id, *args)
+
+        if future is not None and timeout:
+            try:
+                future.exception(timeout=timeout)
+            except FutureTimeout:
+                pass
+
+        return self.status(job_id)
+
+    def _run(self, job_id, *args):
+        final = self.path(job_id)
+        fd, partial = tempfile.mkstemp(prefix=os.path.basename(final) + ".",
+                                       suffix=".part", dir=self.directory)
+        os.close(fd)
+
+        try:
+            self.render(partial, *args)
+            os.replace(partial, final)
+        except Exception as exc:
+            log.exception("Rendering report %s failed", job_id)
+            with self._lock:
+                self._errors[job_id] = str(exc)
+            if os.path.exists(partial):
+                os.remove(partial)
+            return
+
+        self.prune()
+
+    def prune(self):
+        reports = sorted(glob.glob(os.path.join(self.directory, f"{self.prefix}-*.pdf")),
+                         key=os.path.getmtime, reverse=True)
+
+        for path in reports[self.keep:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,257 @@
+import os
+from datetime import timedelta
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, func, inspect, select
+from sqlalchemy.exc import IntegrityError
+
+from history import recommendation, utcnow
+
+# ==============================
+# ROLLUP TABLES
+# ==============================
+#
+# material_rollup holds one row per best_material with the running count,
+# sums and min/max of the recommendation history. Each measure also keeps
+# its own count of non-NULL values, the denominator of its average, so a
+# row without a cost does not drag the average cost down. rollup_watermark records
+# the highest recommendation id already folded in, so compact() only reads
+# rows inserted since the previous run and the dashboard reads O(materials)
+# rows instead of scanning the history.
+#
+# compact() only folds rows older than SAFETY_HORIZON. Ids are handed out
+# before commit, so a row with a lower id can become visible after a higher
+# one; waiting out the horizon gives it time to commit before the watermark
+# passes it. The horizon must stay well above the longest gap between a
+# row's created_at and its commit, write-behind flush delay included. The
+# all-time dashboard figures lag new recommendations by the same amount.
+
+metadata = MetaData()
+
+material_rollup = Table(
+    "material_rollup", metadata,
+    Column("best_material", String(200), primary_key=True),
+    Column("usage_count", Integer, nullable=False),
+    Column("cost_count", Integer, nullable=False),
+    Column("co2_count", Integer, nullable=False),
+    Column("score_count", Integer, nullable=False),
+    Column("sum_cost", Float, nullable=False),
+    Column("sum_co2", Float, nullable=False),
+    Column("sum_score", Float, nullable=False),
+    Column("min_cost", Float),
+    Column("max_cost", Float),
+    Column("min_co2", Float),
+    Column("max_co2", Float)
+)
+
+rollup_watermark = Table(
+    "rollup_watermark", metadata,
+    Column("name", String(50), primary_key=True),
+    Column("last_id", Integer, nullable=False)
+)
+
+WATERMARK = "material_rollup"
+
+SAFETY_HORIZON = timedelta(seconds=float(os.environ.get("ROLLUP_SAFETY_HORIZON", 60)))
+
+# Rows without a best material are counted under this key
+NO_MATERIAL = ""
+
+
+class ConcurrentCompaction(Exception):
+    pass
+
+
+def create_tables(connection):
+    # A material_rollup from before a column was added cannot be patched up
+    # in place: drop it and the watermark so the next compact() folds the
+    # whole history again
+    if inspect(connection).has_table(material_rollup.name):
+        columns = {column["name"] for column in inspect(connection).get_columns(material_rollup.name)}
+
+        if not set(material_rollup.c.keys()) <= columns:
+            material_rollup.drop(connection)
+            if inspect(connection).has_table(rollup_watermark.name):
+                connection.execute(
+                    rollup_watermark.delete().where(rollup_watermark.c.name == WATERMARK)
+                )
+
+    metadata.create_all(connection, checkfirst=True)
+
+
+# ==============================
+# INCREMENTAL COMPACTION
+# ==============================
+
+def _delta(low, high):
+    material = func.coalesce(recommendation.c.best_material, NO_MATERIAL)
+
+    return select(
+        material.label("best_material"),
+        func.count().label("usage_count"),
+        func.count(recommendation.c.total_cost).label("cost_count"),
+        func.count(recommendation.c.total_co2).label("co2_count"),
+        func.count(recommendation.c.sustainability_score).label("score_count"),
+        func.coalesce(func.sum(recommendation.c.total_cost), 0).label("sum_cost"),
+        func.coalesce(func.sum(recommendation.c.total_co2), 0).label("sum_co2"),
+        func.coalesce(func.sum(recommendation.c.sustainability_score), 0).label("sum_score"),
+        func.min(recommendation.c.total_cost).label("min_cost"),
+        func.max(recommendation.c.total_cost).label("max_cost"),
+        func.min(recommendation.c.total_co2).label("min_co2"),
+        func.max(recommendation.c.total_co2).label("max_co2")
+    ).where(
+        recommendation.c.id > low,
+        recommendation.c.id <= high
+    ).group_by(material)
+
+
+def _merge_bound(pick, current, new):
+    if current is None:
+        return new
+    if new is None:
+        return current
+    return pick(current, new)
+
+
+def _fold(connection, deltas):
+    materials = [row["best_material"] for row in deltas]
+    existing = {
+        row["best_material"]: row
+        for row in connection.execute(
+            select(material_rollup).where(material_rollup.c.best_material.in_(materials))
+        ).mappings()
+    }
+
+    for row in deltas:
+        old = existing.get(row["best_material"])
+
+        if old is None:
+            connection.execute(material_rollup.insert().values(**row))
+            continue
+
+        connection.execute(
+            material_rollup.update()
+            .where(material_rollup.c.best_material == row["best_material"])
+            .values(
+                usage_count=old["usage_count"] + row["usage_count"],
+                cost_count=old["cost_count"] + row["cost_count"],
+                co2_count=old["co2_count"] + row["co2_count"],
+                score_count=old["score_count"] + row["score_count"],
+                sum_cost=old["sum_cost"] + row["sum_cost"],
+                sum_co2=old["sum_co2"] + row["sum_co2"],
+                sum_score=old["sum_score"] + row["sum_score"],
+                min_cost=_merge_bound(min, old["min_cost"], row["min_cost"]),
+                max_cost=_merge_bound(max, old["max_cost"], row["max_cost"]),
+                min_co2=_merge_bound(min, old["min_co2"], row["min_co2"]),
+                max_co2=_merge_bound(max, old["max_co2"], row["max_co2"])
+            )
+        )
+
+
+def compact(connection, horizon=SAFETY_HORIZON):
+    """Fold recommendation rows above the watermark into the rollups.
+
+    Must run inside a transaction (``engine.begin()``). Only rows created
+    more than ``horizon`` ago are folded in. The watermark is advanced with
+    a compare-and-set, so if two processes compact at once the loser raises
+    ConcurrentCompaction and its transaction rolls back instead of counting
+    the same rows twice; the same goes for two first runs both creating the
+    watermark. Returns the rows folded in.
+
+    A row that commits more than ``horizon`` after its created_at can still
+    be missed; run rebuild() to repair counts after a backfill or such a
+    delay.
+    """
+    low = connection.execute(
+        select(rollup_watermark.c.last_id).where(rollup_watermark.c.name == WATERMARK)
+    ).scalar()
+
+    if low is None:
+        try:
+            connection.execute(rollup_watermark.insert().values(name=WATERMARK, last_id=0))
+        except IntegrityError as exc:
+            raise ConcurrentCompaction("watermark created by another compaction") from exc
+        low = 0
+
+    high = connection.execute(
+        select(func.max(recommendation.c.id)).where(
+            recommendation.c.id > low,
+            recommendation.c.created_at < utcnow() - horizon
+        )
+    ).scalar() or 0
+
+    if high <= low:
+        return 0
+
+    deltas = [dict(row) for row in connection.execute(_delta(low, high)).mappings()]
+    _fold(connection, deltas)
+
+    advanced = connection.execute(
+        rollup_watermark.update()
+        .where(rollup_watermark.c.name == WATERMARK, rollup_watermark.c.last_id == low)
+        .values(last_id=high)
+    ).rowcount
+
+    if advanced != 1:
+        raise ConcurrentCompaction(f"watermark moved past {low} during compaction")
+
+    return sum(row["usage_count"] for row in deltas)
+
+
+def rebuild(connection, horizon=SAFETY_HORIZON):
+    # Full backfill: drop every rollup row and fold the whole history again
+    create_tables(connection)
+
+    connection.execute(material_rollup.delete())
+    connection.execute(rollup_watermark.delete().where(rollup_watermark.c.name == WATERMARK))
+
+    return compact(connection, horizon)
+
+
+# ==============================
+# READS
+# ==============================
+
+def data_version(connection):
+    # Highest recommendation id folded in; changes whenever the rollups do
+    return connection.execute(
+        select(rollup_watermark.c.last_id).where(rollup_watermark.c.name == WATERMARK)
+    ).scalar() or 0
+
+
+def load_kpis(connection):
+    totals = connection.execute(select(
+        func.coalesce(func.sum(material_rollup.c.usage_count), 0).label("records"),
+        func.sum(material_rollup.c.cost_count).label("cost_count"),
+        func.sum(material_rollup.c.co2_count).label("co2_count"),
+        func.sum(material_rollup.c.score_count).label("score_count"),
+        func.max(material_rollup.c.max_co2).label("max_co2"),
+        func.sum(material_rollup.c.sum_co2).label("sum_co2"),
+        func.max(material_rollup.c.max_cost).label("max_cost"),
+        func.sum(material_rollup.c.sum_cost).label("sum_cost"),
+        func.sum(material_rollup.c.sum_score).label("sum_score")
+    )).mappings().one()
+
+    def average(measure):
+        # Same as AVG(): NULLs count in neither the sum nor the denominator
+        count = totals[f"{measure}_count"]
+        return totals[f"sum_{measure}"] / count if count else None
+
+    return {
+        "records": totals["records"],
+        "max_co2": totals["max_co2"],
+        "avg_co2": average("co2"),
+        "max_cost": totals["max_cost"],
+        "avg_cost": average("cost"),
+        "avg_score": average("score")
+    }
+
+
+def load_material_counts(connection, limit=10):
+    rows = connection.execute(
+        select(material_rollup.c.best_material, material_rollup.c.usage_count)
+        .where(material_rollup.c.best_material != NO_MATERIAL)
+        .order_by(material_rollup.c.usage_count.desc(), material_rollup.c.best_material)
+        .limit(limit)
+    )
+
+    return [(material, count) for material, count in rows]
@@ -0,0 +1,806 @@
+import bisect
+import uuid
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# ==============================
+# SCORING CONSTANTS
+# ==============================
+
+FRAGILITY_FACTOR = {"L": 1, "M": 1.5, "H": 2}
+
+# Columns that are always read as numbers, whatever pandas inferred
+NUMERIC_COLUMNS = ("Tensile_Strength_MPa", "CO2_Emission_kg", "Cost_per_kg")
+
+# Upper bound on shipments x materials cells scored at once in a batch
+BATCH_CELLS = 4_000_000
+
+# Smallest block of candidates scored per step of the top-k walk
+MIN_TOPK_BLOCK = 64
+
+# Catalogs (or filter members) up to this size are scored whole; the top-k
+# walk's per-block overhead only pays off past it
+TOPK_SCAN_LIMIT = 10_000
+
+# The walk over unsaturated materials gives up for a plain scan after
+# passing 1 / TOPK_WALK_FRACTION of them
+TOPK_WALK_FRACTION = 8
+
+# Rounded scores of two materials can only compare differently from their
+# exact scores when those are closer than 0.01 (a little slack for floats)
+ROUNDING_BAND = 0.0101
+
+# Log-spaced cells a weight sweep is split into to prune candidates
+SWEEP_CELLS = 256
+
+# Quantile buckets of the cost / CO2 / density bitmaps
+FILTER_BUCKETS = 16
+
+# Material categories left out for the form's sensitivity checkboxes:
+# metal and glass conduct heat, paper takes up moisture
+SENSITIVITY_EXCLUDED_CATEGORIES = {
+    "temp": ("Metal", "Glass"),
+    "moisture": ("Paper",)
+}
+
+# Constraints on the materials considered; None / () means no constraint
+MaterialFilter = namedtuple(
+    "MaterialFilter",
+    ("categories", "excluded_categories", "biodegradable", "max_cost", "max_co2",
+     "max_density"),
+    defaults=((), (), None, None, None, None))
+
+# The materials a filter allows: catalog mask, indices in catalog order, and
+# in static-score and strength order (the lists the top-k walk visits)
+MemberSet = namedtuple("MemberSet", ("mask", "indices", "static_order", "strength_order"))
+
+ECO_WEIGHT = 0.3
+COST_WEIGHT = 0.25
+BIODEG_WEIGHT = 0.2
+STRENGTH_WEIGHT = 0.25
+
+# Weight profiles are (eco, cost, biodeg, strength) weights; the first three
+# apply to the columns of ScoringEngine.components
+PROFILE_COMPONENTS = ("eco", "cost", "biodeg", "strength")
+DEFAULT_PROFILE = (ECO_WEIGHT, COST_WEIGHT, BIODEG_WEIGHT, STRENGTH_WEIGHT)
+
+
+def round2(values):
+    # np.round works on values * 100, which can land on the wrong side of a
+    # half-way point; re-round those few entries with Python's round() so the
+    # result is identical to the scalar code it replaced.
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, 2)
+
+    scaled = values * 100
+    tolerance = 1e-9 * np.maximum(np.abs(scaled), 1)
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < tolerance
+    for i in np.flatnonzero(near_half):
+        rounded.flat[i] = round(float(values.flat[i]), 2)
+
+    return rounded
+
+
+def top_k(scores, k):
+    # Row-wise indices of the k best scores, ordered like a stable descending
+    # sort: higher score first, lower catalog index first on ties.
+    scores = np.atleast_2d(scores)
+    rows, n = scores.shape
+    k = min(k, n)
+
+    if k == 0:
+        return np.empty((rows, 0), dtype=np.intp)
+
+    if k == n:
+        return np.argsort(-scores, axis=1, kind="stable")
+
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    values = np.take_along_axis(scores, candidates, axis=1)
+    order = np.lexsort((candidates, -values), axis=1)
+    result = np.take_along_axis(candidates, order, axis=1)
+
+    # argpartition picks arbitrarily among scores tied with the k-th one;
+    # redo those (rare) rows with a full stable sort.
+    kth = values.min(axis=1)
+    tied = (scores >= kth[:, None]).sum(axis=1) > k
+    for row in np.flatnonzero(tied):
+        result[row] = np.argsort(-scores[row], kind="stable")[:k]
+
+    return result
+
+
+def pareto_front(cost, co2, strength):
+    """Indices of the materials no other one beats on cost, CO2 and
+    strength at once, strongest first.
+
+    Sorted by strength (descending), every material can only be dominated
+    by one already visited, so one sweep keeps the (cost, CO2) staircase of
+    the visited materials and checks each new one against it by binary
+    search: O(n log n) comparisons. Rows with a NaN are left out.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    co2 = np.asarray(co2, dtype=np.float64)
+    strength = np.asarray(strength, dtype=np.float64)
+
+    valid = np.flatnonzero(~(np.isnan(cost) | np.isnan(co2) | np.isnan(strength)))
+    if not len(valid):
+        return np.empty(0, dtype=np.intp)
+
+    # Identical materials cannot dominate each other; sweep distinct points
+    points, inverse = np.unique(
+        np.column_stack([-strength[valid], cost[valid], co2[valid]]), axis=0,
+        return_inverse=True)
+
+    stair_cost = []
+    stair_co2 = []
+    on_front = np.zeros(len(points), dtype=bool)
+
+    # np.unique sorted the points by (-strength, cost, CO2)
+    for i, (_, c, e) in enumerate(points):
+        pos = bisect.bisect_right(stair_cost, c)
+
+        if pos and stair_co2[pos - 1] <= e:
+            continue
+
+        on_front[i] = True
+
+        # Replace the steps the new point covers
+        start = end = bisect.bisect_left(stair_cost, c)
+        while end < len(stair_cost) and stair_co2[end] >= e:
+            end += 1
+
+        stair_cost[start:end] = [c]
+        stair_co2[start:end] = [e]
+
+    front = valid[on_front[inverse.ravel()]]
+    order = np.lexsort((front, co2[front], cost[front], -strength[front]))
+
+    return front[order]
+
+
+def material_columns(df):
+    # Typed column arrays for a material table: numeric columns coerced to
+    # float64 (bad values become NaN), everything else as fixed-width text.
+    columns = {}
+
+    for name in df.columns:
+        if name in NUMERIC_COLUMNS or pd.api.types.is_numeric_dtype(df[name]):
+            columns[name] = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64)
+        else:
+            columns[name] = df[name].fillna("").astype(str).to_numpy(dtype=str)
+
+    return columns
+
+
+# ==============================
+# SCORING ENGINE
+# ==============================
+
+class ScoringEngine:
+    """Material catalog held as contiguous NumPy columns.
+
+    Everything that does not depend on the shipment (eco, cost and
+    biodegradability scores) is computed once here; a request only adds the
+    strength term and rounds.
+    """
+
+    # Everything a built engine consists of; see export() / from_arrays()
+    ARRAYS = ("names", "strength", "co2", "cost", "biodegradable",
+              "eco_score", "cost_score", "biodeg_score", "static_score",
+              "strength_order", "static_order", "pareto_order",
+              "components", "category", "density", "category_labels", "filter_bitmaps",
+              "cost_edges", "co2_edges", "density_edges",
+              "cost_bucket_rows", "co2_bucket_rows", "density_bucket_rows",
+              "cost_bucket_starts", "co2_bucket_starts", "density_bucket_starts")
+    SCALARS = ("max_cost", "max_co2", "max_strength")
+
+    def __init__(self, names, strength, co2, cost, biodegradable, category=None,
+                 density=None, version=None):
+        # Identifies this copy of the catalog for caches built on top of it
+        self.version = version or uuid.uuid4().hex
+
+        strength = np.ascontiguousarray(strength, dtype=np.float64)
+        co2 = np.ascontiguousarray(co2, dtype=np.float64)
+        cost = np.ascontiguousarray(cost, dtype=np.float64)
+
+        self.max_cost = float(np.nanmax(cost))
+        self.max_co2 = float(np.nanmax(co2))
+
+        # Rows without a tensile strength were skipped by the original loop
+        keep = ~np.isnan(strength)
+
+        self.names = np.asarray(names)[keep]
+        self.strength = strength[keep]
+        self.co2 = co2[keep]
+        self.cost = cost[keep]
+        self.biodegradable = np.asarray(biodegradable, dtype=bool)[keep]
+        self.category = (np.full(len(keep), "") if category is None
+                         else np.asarray(category, dtype=str))[keep]
+        self.density = (np.full(len(keep), np.nan) if density is None
+                        else np.asarray(density, dtype=np.float64))[keep]
+
+        self.eco_score = 1 - (self.co2 / self.max_co2)
+        self.cost_score = 1 - (self.cost / self.max_cost)
+        self.biodeg_score = np.where(self.biodegradable, 1.0, 0.5)
+
+        # Materials x (eco, cost, biodeg) for scoring with other weights
+        self.components = np.column_stack((self.eco_score, self.cost_score, self.biodeg_score))
+
+        # Partial sum of the weighted terms, in the same order as the formula
+        self.static_score = (self.eco_score * ECO_WEIGHT +
+                             self.cost_score * COST_WEIGHT +
+                             self.biodeg_score * BIODEG_WEIGHT)
+
+        self.build_index()
+
+    def build_index(self):
+        # Strongest first (catalog order on ties): the materials whose
+        # strength term saturates at 1 for a shipment are a prefix.
+        self.strength_order = np.argsort(-self.strength, kind="stable")
+        self.max_strength = float(self.strength[self.strength_order[0]]) if len(self) else 0.0
+
+        # Candidates are visited best static score first (catalog order on ties)
+        self.static_order = np.argsort(-self.static_score, kind="stable")
+
+        # Cost / CO2 / strength trade-off front, strongest first
+        self.pareto_order = pareto_front(self.cost, self.co2, self.strength)
+
+        self.build_filters()
+
+    def build_filters(self):
+        # One packed bitmap per attribute value, rows in this order:
+        #   biodegradable | category == label, per label |
+        #   cost <= edge, co2 <= edge, density <= edge, per bucket edge
+        # plus, per range attribute, the rows of each bucket (catalog order
+        # within it, NaN last) so a bound is checked against one bucket only.
+        self.category_labels = np.unique(self.category)
+
+        rows = [self.biodegradable]
+        rows += [self.category == label for label in self.category_labels]
+
+        for name in ("cost", "co2", "density"):
+            values = getattr(self, name)
+            edges = np.empty(0)
+
+            if (~np.isnan(values)).any():
+                edges = np.unique(np.nanquantile(
+                    values, np.linspace(0, 1, FILTER_BUCKETS + 1)[1:]))
+
+            setattr(self, f"{name}_edges", edges)
+            rows += [values <= edge for edge in edges]
+
+            buckets = np.searchsorted(edges, values)
+            bucket_rows = np.argsort(buckets, kind="stable").astype(np.int32)
+            setattr(self, f"{name}_bucket_rows", bucket_rows)
+            setattr(self, f"{name}_bucket_starts", np.searchsorted(
+                buckets[bucket_rows], np.arange(len(edges) + 1)))
+
+        self.filter_bitmaps = np.packbits(
+            np.array(rows, dtype=bool).reshape(len(rows), len(self)), axis=1)
+
+    def export(self):
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        scalars = {name: getattr(self, name) for name in self.SCALARS}
+
+        return arrays, scalars
+
+    @classmethod
+    def from_arrays(cls, arrays, scalars, version=None):
+        # Reassemble an exported engine without recomputing or copying, e.g.
+        # on top of read-only memory maps shared by several processes.
+        engine = cls.__new__(cls)
+        engine.version = version or uuid.uuid4().hex
+
+        for name in cls.ARRAYS:
+            setattr(engine, name, arrays[name])
+
+        for name in cls.SCALARS:
+            setattr(engine, name, float(scalars[name]))
+
+        return engine
+
+    @classmethod
+    def from_columns(cls, columns, version=None):
+        return cls(
+            names=columns["Material_Name"],
+            strength=columns["Tensile_Strength_MPa"],
+            co2=columns["CO2_Emission_kg"],
+            cost=columns["Cost_per_kg"],
+            biodegradable=np.asarray(columns["Biodegradable"]) == "Yes",
+            category=columns.get("Category"),
+            density=columns.get("Density_kg_m3"),
+            version=version
+        )
+
+    @classmethod
+    def from_dataframe(cls, df, version=None):
+        return cls.from_columns(material_columns(df), version=version)
+
+    @classmethod
+    def from_csv(cls, path, version=None):
+        return cls.from_dataframe(pd.read_csv(path), version=version)
+
+    def __len__(self):
+        return len(self.names)
+
+    # ==============================
+    # VECTORIZED SCORING
+    # ==============================
+
+    def strength_score(self, weight, fragility):
+        f_factor = FRAGILITY_FACTOR.get(fragility, 1)
+        required_strength = weight * 5 * f_factor
+
+        return np.minimum(self.strength / required_strength, 1)
+
+    def score(self, weight, fragility):
+        strength_score = self.strength_score(weight, fragility)
+
+        return strength_score, round2(
+            (self.static_score + strength_score * STRENGTH_WEIGHT) * 100)
+
+    def top_k(self, weight, fragility, k=5, members=None):
+        # Materials strong enough for the shipment all get the full strength
+        # term, so their best k are the first ones in static-score order (or,
+        # when few saturate, simply the strongest few scored directly). Every
+        # other material scores at most its static part plus the term of the
+        # largest strength below the requirement: a threshold walk over the
+        # static order and the unsaturated strength order, a block at a time
+        # from each, ends once that bound for the next unvisited materials
+        # drops below the current k-th score. The materials at the top of
+        # the ranking can sit halfway down both orders, where the bound ends
+        # nothing early, so past TOPK_WALK_FRACTION of the list the walk
+        # falls back to scoring everything. With a MemberSet, both orders
+        # hold its members only.
+        static_order = self.static_order if members is None else members.static_order
+        strength_order = self.strength_order if members is None else members.strength_order
+        n = len(static_order)
+        k = min(k, n)
+
+        if k <= 0:
+            empty = np.empty(0)
+            return np.empty(0, dtype=np.intp), empty, empty
+
+        def scan():
+            indices = np.arange(n) if members is None else members.indices
+            return self.top_k_subset(indices, weight, fragility, k)
+
+        if n <= TOPK_SCAN_LIMIT:
+            return scan()
+
+        required_strength = weight * 5 * FRAGILITY_FACTOR.get(fragility, 1)
+        strength = self.strength
+        best = (np.empty(0, dtype=np.intp), np.empty(0), np.empty(0))
+
+        def consider(idx):
+            nonlocal best
+            idx = idx[~np.isin(idx, best[0])]
+
+            strength_score = np.minimum(strength[idx] / required_strength, 1)
+            scores = round2((self.static_score[idx] + strength_score * STRENGTH_WEIGHT) * 100)
+
+            if len(idx) > k:
+                # Drop everything below the block's k-th score, keeping ties
+                kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+                sel = scores >= kth
+                idx, strength_score, scores = idx[sel], strength_score[sel], scores[sel]
+
+            merged = [np.concatenate(pair) for pair in zip(best, (idx, strength_score, scores))]
+            keep = np.lexsort((merged[0], -merged[2]))[:k]
+            best = tuple(values[keep] for values in merged)
+
+        def beaten(bound):
+            return len(best[0]) == k and round2(bound * 100) < best[2][-1]
+
+        saturated = bisect.bisect_right(range(n), -required_strength,
+                                        key=lambda i: -strength[strength_order[i]])
+
+        if saturated * saturated <= 4 * k * n:
+            consider(strength_order[:saturated])
+        else:
+            pos, block = 0, max(MIN_TOPK_BLOCK, 2 * k * n // saturated)
+
+            while pos < n:
+                idx = static_order[pos:pos + block]
+                consider(idx[strength[idx] >= required_strength])
+                pos += block
+                block *= 2
+
+                if pos < n and beaten(self.static_score[static_order[pos]] + STRENGTH_WEIGHT):
+                    break
+
+        unsaturated = strength_order[saturated:]
+        pos, block = 0, max(MIN_TOPK_BLOCK, 2 * k)
+
+        while pos < len(unsaturated):
+            if pos * TOPK_WALK_FRACTION >= len(unsaturated):
+                return scan()
+
+            idx = np.sort(np.concatenate((static_order[pos:pos + block],
+                                          unsaturated[pos:pos + block])))
+            consider(idx[np.append(True, idx[1:] != idx[:-1])])
+            pos += block
+            block *= 2
+
+            if pos < len(unsaturated) and beaten(
+                    self.static_score[static_order[pos]] +
+                    strength[unsaturated[pos]] / required_strength * STRENGTH_WEIGHT):
+                break
+
+        return best
+
+    def ranked(self, weight, fragility, k=5, profile=None, members=None):
+        """(indices, strength scores, scores) of the top k, for the default
+        weights or a profile, among a MemberSet (see member_set())."""
+        if members is None:
+            if profile is None:
+                return self.top_k(weight, fragility, k)
+            return self.top_k_profile(weight, fragility, profile, k)
+
+        if profile is None:
+            return self.top_k(weight, fragility, k, members=members)
+
+        return self.top_k_subset(members.indices, weight, fragility, k, profile)
+
+    def rank(self, weight, units, fragility, k=5, profile=None, material_filter=None):
+        order, strength_score, scores = self.ranked(weight, fragility, k, profile,
+                                                    self.member_set(material_filter))
+
+        return self.build_results(order, strength_score, scores, weight, units)
+
+    # ==============================
+    # WEIGHT PROFILES
+    # ==============================
+
+    def static_scores(self, profile, indices=None):
+        # Shipment-independent part of the score: one matrix-vector product
+        components = self.components if indices is None else self.components[indices]
+        return components @ np.asarray(profile[:3], dtype=np.float64)
+
+    def top_k_profile(self, weight, fragility, profile, k=5):
+        # Scores the whole catalog with (eco, cost, biodeg, strength) weights;
+        # the default weights go through top_k() instead, whose sums are
+        # ordered exactly like the original formula.
+        required_strength = weight * 5 * FRAGILITY_FACTOR.get(fragility, 1)
+        strength_score = np.minimum(self.strength / required_strength, 1)
+        scores = round2((self.static_scores(profile) + strength_score * profile[3]) * 100)
+
+        order = top_k(scores, k)[0]
+
+        return order, strength_score[order], scores[order]
+
+    # ==============================
+    # FILTERS
+    # ==============================
+
+    def _bitmap_row(self, name, bucket):
+        offset = 1 + len(self.category_labels)
+
+        for attribute in ("cost", "co2", "density"):
+            if attribute == name:
+                return self.filter_bitmaps[offset + bucket]
+            offset += len(getattr(self, f"{attribute}_edges"))
+
+    def _at_most(self, name, bound):
+        # Whole buckets up to the last edge <= bound come from the bitmaps;
+        # only the rows of the next bucket are compared with the bound.
+        edges = getattr(self, f"{name}_edges")
+        below = int(np.searchsorted(edges, bound, side="right"))
+
+        if below:
+            bits = self._bitmap_row(name, below - 1).copy()
+        else:
+            bits = np.zeros(self.filter_bitmaps.shape[1], dtype=np.uint8)
+
+        if below < len(edges) and not (below and edges[below - 1] == bound):
+            starts = getattr(self, f"{name}_bucket_starts")
+            rows = getattr(self, f"{name}_bucket_rows")[starts[below]:starts[below + 1]]
+            rows = rows[getattr(self, name)[rows] <= bound]
+
+            # Bit (7 - row % 8) of byte row // 8, as np.packbits lays them out
+            np.bitwise_or.at(bits, rows >> 3, (0x80 >> (rows & 7)).astype(np.uint8))
+
+        return bits
+
+    def members(self, material_filter):
+        """Boolean mask of the materials a MaterialFilter allows, combined
+        from the precomputed bitmaps; None for no filter."""
+        if material_filter is None:
+            return None
+
+        bitmaps = self.filter_bitmaps
+        category_row = {str(label): 1 + i for i, label in enumerate(self.category_labels)}
+        bits = np.full(bitmaps.shape[1], 0xFF, dtype=np.uint8)
+
+        if material_filter.categories:
+            any_category = np.zeros(bitmaps.shape[1], dtype=np.uint8)
+            for label in material_filter.categories:
+                if label in category_row:
+                    any_category |= bitmaps[category_row[label]]
+            bits &= any_category
+
+        for label in material_filter.excluded_categories:
+            if label in category_row:
+                bits &= ~bitmaps[category_row[label]]
+
+        if material_filter.biodegradable is not None:
+            bits &= bitmaps[0] if material_filter.biodegradable else ~bitmaps[0]
+
+        for name, bound in (("cost", material_filter.max_cost),
+                            ("co2", material_filter.max_co2),
+                            ("density", material_filter.max_density)):
+            if bound is not None:
+                bits &= self._at_most(name, bound)
+
+        return np.unpackbits(bits, count=len(self)).view(bool)
+
+    def member_set(self, material_filter):
+        """MemberSet for a MaterialFilter, None for no filter. Building one
+        is linear in the catalog; RankingCache keeps them per filter."""
+        mask = self.members(material_filter)
+
+        if mask is None:
+            return None
+
+        return MemberSet(mask, np.flatnonzero(mask), self.static_order[mask[self.static_order]],
+                         self.strength_order[mask[self.strength_order]])
+
+    def top_k_subset(self, indices, weight, fragility, k=5, profile=None):
+        # Scores only the given materials, with the same arithmetic as the
+        # unfiltered paths; indices are ascending, so ties keep catalog order
+        required_strength = weight * 5 * FRAGILITY_FACTOR.get(fragility, 1)
+        strength_score = np.minimum(self.strength[indices] / required_strength, 1)
+
+        if profile is None:
+            static_score, strength_weight = self.static_score[indices], STRENGTH_WEIGHT
+        else:
+            static_score, strength_weight = self.static_scores(profile, indices), profile[3]
+
+        scores = round2((static_score + strength_score * strength_weight) * 100)
+
+        if len(scores) > k:
+            # Everything tied with the k-th score stays in, as in top_k()
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            sel = np.flatnonzero(scores >= kth)
+            order = sel[np.lexsort((sel, -scores[sel]))[:k]]
+        else:
+            order = np.lexsort((np.arange(len(scores)), -scores))
+
+        return indices[order], strength_score[order], scores[order]
+
+    def pareto(self, weight, units, fragility):
+        # Dominance among the strong enough materials is the same as in the
+        # whole catalog (whatever dominates one is at least as strong), so
+        # the shipment's front is a prefix of the precomputed one.
+        required_strength = weight * 5 * FRAGILITY_FACTOR.get(fragility, 1)
+        front = self.pareto_order
+
+        count = int(np.searchsorted(-self.strength[front], -required_strength, side="right"))
+        indices = front[:count]
+
+        total_cost = round2(self.cost[indices] * weight * units)
+        total_co2 = round2(self.co2[indices] * weight * units)
+
+        return [{
+            "Material": str(self.names[i]),
+            "Cost_per_kg": float(self.cost[i]),
+            "CO2_per_kg": float(self.co2[i]),
+            "Strength": float(self.strength[i]),
+            "Biodegradable": bool(self.biodegradable[i]),
+            "Total_Cost": float(total_cost[pos]),
+            "Total_CO2": float(total_co2[pos])
+        } for pos, i in enumerate(indices)]
+
+    # ==============================
+    # WEIGHT SWEEP
+    # ==============================
+
+    def weight_sweep(self, fragility, min_weight, max_weight, k=5):
+        """Top-k rankings over a range of shipment weights.
+
+        Returns (breakpoints, intervals): the weights where the ranking
+        changes, and (start, end, indices) for each interval between them.
+
+        With x = 1 / weight, 100 * score is S + 25 * min(a * x, 1): linear
+        up to a knee, then flat. Rounded to 0.01 it only changes where it
+        crosses some m + 0.005, at a weight solved for directly, and two
+        materials can only swap places where their exact scores are within
+        0.01 of each other. Those crossings, for pairs of materials that can
+        both reach the top k, are the only candidates; the ranking is then
+        evaluated once between each consecutive two.
+        """
+        n = len(self)
+        k = min(k, n)
+        required = 5 * FRAGILITY_FACTOR.get(fragility, 1)
+        a = self.strength / required
+        slope = STRENGTH_WEIGHT * 100
+
+        def rounded(weights):
+            strength_score = np.minimum(self.strength[None, :] / (weights[:, None] * required), 1)
+            return round2((self.static_score[None, :] + strength_score * STRENGTH_WEIGHT) * 100)
+
+        # Cells of the range in which a material can only make the top k if
+        # its score at the light end reaches the k-th best at the heavy end
+        cells = np.geomspace(min_weight, max_weight, SWEEP_CELLS + 1)
+        scores = rounded(cells)
+        kth = np.partition(scores, n - k, axis=1)[:, n - k]
+        members = [np.flatnonzero(scores[c] >= kth[c + 1]) for c in range(SWEEP_CELLS)]
+
+        pairs = [np.triu_indices(len(m), 1) for m in members]
+        i = np.concatenate([m[p] for m, (p, _) in zip(members, pairs)])
+        j = np.concatenate([m[q] for m, (_, q) in zip(members, pairs)])
+        cell = np.repeat(np.arange(SWEEP_CELLS), [len(p) for p, _ in pairs])
+
+        x_low, x_high = 1 / cells[cell + 1], 1 / cells[cell]
+        base = self.static_score * 100
+
+        with np.errstate(divide="ignore"):
+            knee = 1 / a
+
+        # Pieces of every pair on which both scores are linear in x
+        bounds = np.sort(np.column_stack([x_low, np.clip(knee[i], x_low, x_high),
+                                          np.clip(knee[j], x_low, x_high), x_high]), axis=1)
+
+        owners, lows, highs = [], [], []
+
+        for piece in range(3):
+            p0, p1 = bounds[:, piece], bounds[:, piece + 1]
+            middle = (p0 + p1) / 2
+
+            # g(x) = c0 + c1 * x, score i minus score j on this piece
+            linear_i, linear_j = middle < knee[i], middle < knee[j]
+            c0 = (base[i] + np.where(linear_i, 0, slope)) - (base[j] + np.where(linear_j, 0, slope))
+            c1 = np.where(linear_i, slope * a[i], 0) - np.where(linear_j, slope * a[j], 0)
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                e0 = (-ROUNDING_BAND - c0) / c1
+                e1 = (ROUNDING_BAND - c0) / c1
+
+            flat = c1 == 0
+            b0 = np.where(flat, p0, np.maximum(np.minimum(e0, e1), p0))
+            b1 = np.where(flat, p1, np.minimum(np.maximum(e0, e1), p1))
+            near = (b0 < b1) & ~(flat & (np.abs(c0) >= ROUNDING_BAND))
+
+            # Score range of either material while the two are that close
+            for member, linear in ((i, linear_i), (j, linear_j)):
+                sel = near & linear
+                owners.append(member[sel])
+                lows.append(base[member[sel]] + slope * a[member[sel]] * b0[sel])
+                highs.append(base[member[sel]] + slope * a[member[sel]] * b1[sel])
+
+        owner = np.concatenate(owners)
+        first = np.ceil(np.concatenate(lows) * 100 - 0.5).astype(np.int64)
+        counts = np.maximum(
+            np.floor(np.concatenate(highs) * 100 - 0.5).astype(np.int64) - first + 1, 0)
+
+        rows = np.repeat(np.arange(len(owner)), counts)
+        steps = first[rows] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        owner = owner[rows]
+
+        with np.errstate(divide="ignore"):
+            candidates = slope * a[owner] / ((steps + 0.5) / 100 - base[owner])
+
+        edges = np.unique(np.concatenate((cells, candidates[
+            (candidates > min_weight) & (candidates < max_weight)])))
+
+        # Rank at the midpoint of every interval among its cell's members
+        midpoints = (edges[:-1] + edges[1:]) / 2
+        in_cell = np.clip(np.searchsorted(cells, midpoints, side="right") - 1, 0, SWEEP_CELLS - 1)
+        orders = np.empty((len(midpoints), k), dtype=np.intp)
+
+        for c in np.unique(in_cell):
+            rows = np.flatnonzero(in_cell == c)
+            strength_score = np.minimum(
+                self.strength[members[c]][None, :] / (midpoints[rows][:, None] * required), 1)
+            scores = round2((self.static_score[members[c]][None, :]
+                             + strength_score * STRENGTH_WEIGHT) * 100)
+            orders[rows] = members[c][top_k(scores, k)]
+
+        changed = np.flatnonzero((orders[1:] != orders[:-1]).any(axis=1)) + 1
+
+        starts = np.concatenate(([0], changed))
+        ends = np.concatenate((changed, [len(orders)]))
+
+        breakpoints = [float(edges[i]) for i in changed]
+        intervals = [(float(edges[i]), float(edges[j]), orders[i])
+                     for i, j in zip(starts, ends)]
+
+        return breakpoints, intervals
+
+    # ==============================
+    # BATCH SCORING
+    # ==============================
+
+    def score_matrix(self, weights, fragilities, profile=None, indices=None):
+        # Scores of every shipment against every material, or against the
+        # materials at ``indices`` only
+        weights = np.asarray(weights, dtype=np.float64)
+        f_factors = np.array([FRAGILITY_FACTOR.get(f, 1) for f in fragilities],
+                             dtype=np.float64)
+        required_strength = weights * 5 * f_factors
+
+        strength = self.strength if indices is None else self.strength[indices]
+        strength_score = np.minimum(strength[None, :] / required_strength[:, None], 1)
+
+        if profile is None:
+            static_score = self.static_score if indices is None else self.static_score[indices]
+            strength_weight = STRENGTH_WEIGHT
+        else:
+            static_score, strength_weight = self.static_scores(profile, indices), profile[3]
+
+        return strength_score, round2(
+            (static_score[None, :] + strength_score * strength_weight) * 100)
+
+    def rank_batch(self, weights, units, fragilities, k=5, profile=None, material_filter=None):
+        # Shipments are scored as a shipments x materials matrix, a block of
+        # rows at a time so that memory stays bounded for large catalogs.
+        # A filter narrows the matrix to its members' columns.
+        members = self.member_set(material_filter)
+        subset = None if members is None else members.indices
+
+        block = max(1, BATCH_CELLS // max(len(self) if subset is None else len(subset), 1))
+        results = []
+
+        for start in range(0, len(weights), block):
+            stop = start + block
+            strength_score, scores = self.score_matrix(weights[start:stop],
+                                                       fragilities[start:stop], profile, subset)
+            order = top_k(scores, k)
+
+            for row, columns in enumerate(order):
+                results.append(self.build_results(
+                    columns if subset is None else subset[columns],
+                    strength_score[row, columns],
+                    scores[row, columns],
+                    weights[start + row],
+                    units[start + row]
+                ))
+
+        return results
+
+    # ==============================
+    # RESULT ROWS
+    # ==============================
+
+    def build_results(self, indices, strength_scores, scores, weight, units):
+        total_cost = round2(self.cost[indices] * weight * units)
+        total_co2 = round2(self.co2[indices] * weight * units)
+
+        results = []
+
+        for pos, i in enumerate(indices):
+            results.append({
+                "Material": str(self.names[i]),
+                "Total_Cost": float(total_cost[pos]),
+                "Total_CO2": float(total_co2[pos]),
+                "Strength": float(self.strength[i]),
+                "Score": float(scores[pos]),
+                "Reasons": self.reasons(i, strength_scores[pos], scores[pos])
+            })
+
+        return results
+
+    def reasons(self, i, strength_score, sustainability_score):
+        reasons = []
+
+        if self.biodegradable[i]:
+            reasons.append("Biodegradable and eco-friendly")
+
+        if self.eco_score[i] > 0.7:
+            reasons.append("Very low carbon footprint")
+
+        if self.cost_score[i] > 0.7:
+            reasons.append("Cost efficient option")
+
+        if strength_score > 0.8:
+            reasons.append("High structural strength")
+
+        if sustainability_score > 85:
+            reasons.append("Excellent sustainability performance")
+
+        if not reasons:
+            reasons.append("Balanced cost, strength and environmental impact")
+
+        return ", ".join(reasons)
@@ -0,0 +1,345 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from file_utils import file_hash, publish_snapshot, replace_file
+
+# ==============================
+# SIMILAR PAST SHIPMENTS
+# ==============================
+#
+# "What did we ship before": the k past orders in the cleaned packaging
+# history closest to a new shipment, with the packaging they used and what
+# it cost. Shipments are compared on
+#
+#   log weight, L/W/H, fragility (1-10), moisture sensitivity,
+#   shipping mode (one-hot), distance
+#
+# each standardized by its mean and spread in the history, so a unit of
+# distance means as much along every axis. A KD-tree over those points is
+# built once per version of the history file and stored with the columns
+# the answers need:
+#
+#   data/processed/history_index/<key>/tree.pkl      scipy cKDTree
+#   data/processed/history_index/<key>/<column>.npy  (codes for text)
+#   data/processed/history_index/<key>/meta.json     scaling, labels
+#   data/processed/history_index/CURRENT             key of the live index
+#
+# <key> hashes the history file and INDEX_FORMAT. Reading the history and
+# building the tree takes as long as the history is large, so it is never
+# done on a request: the gunicorn master (gunicorn.conf.py), the ingest
+# and cleaning steps and ``python similar_shipments.py`` build the index
+# and publish it through CURRENT, and workers pick it up from there while
+# serving the previous one meanwhile. See benchmarks/similar_shipments.py
+# for query times against a brute-force scan.
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+DEFAULT_HISTORY = os.path.join(BASE_DIR, "data", "processed", "cleaned_packaging_history.csv")
+DEFAULT_ROOT = os.path.join(BASE_DIR, "data", "processed", "history_index")
+
+# Bump when the features or stored columns change
+INDEX_FORMAT = 1
+
+CURRENT_FILE = "CURRENT"
+META_FILE = "meta.json"
+TREE_FILE = "tree.pkl"
+
+NUMERIC_FEATURES = ["Weight_kg", "L_cm", "W_cm", "H_cm", "Fragility", "Moisture_Sens",
+                    "Distance_km"]
+
+# Heavily skewed; compared on a log scale
+LOG_FEATURES = ("Weight_kg",)
+_LOG_POSITIONS = [NUMERIC_FEATURES.index(column) for column in LOG_FEATURES]
+
+MODE_FEATURE = "Shipping_Mode"
+
+# Returned for every neighbour
+RESULT_COLUMNS = ["Order_ID", "Date", "Item_Name", "Category", "Weight_kg", "L_cm", "W_cm",
+                  "H_cm", "Fragility", "Moisture_Sens", "Shipping_Mode", "Distance_km",
+                  "Packaging_Used", "Cost_USD", "CO2_Emission_kg"]
+
+TEXT_COLUMNS = ("Date", "Item_Name", "Category", "Shipping_Mode", "Packaging_Used")
+
+
+class HistoryUnavailable(Exception):
+    pass
+
+
+def index_key(history_path):
+    return hashlib.sha256(
+        f"{file_hash(history_path)}:{INDEX_FORMAT}".encode()).hexdigest()[:16]
+
+
+def _raw_features(frame):
+    features = frame[NUMERIC_FEATURES].astype(np.float64)
+
+    for column in LOG_FEATURES:
+        features[column] = np.log1p(features[column])
+
+    return features.to_numpy()
+
+
+# ==============================
+# INDEX
+# ==============================
+
+class ShipmentIndex:
+    """KD-tree over the standardized features of past orders."""
+
+    def __init__(self, tree, columns, labels, mean, scale, modes, version=None):
+        self.tree = tree
+        self.columns = columns
+        self.labels = labels
+        self.mean = mean
+        self.scale = scale
+        self.modes = modes
+        self.version = version
+
+    def __len__(self):
+        return self.tree.n
+
+    @classmethod
+    def build(cls, frame, version=None):
+        from scipy.spatial import cKDTree
+
+        frame = frame.dropna(subset=NUMERIC_FEATURES + [MODE_FEATURE]).reset_index(drop=True)
+
+        if not len(frame):
+            raise HistoryUnavailable("no complete orders in the packaging history")
+
+        raw = _raw_features(frame)
+        mean = raw.mean(axis=0)
+        scale = raw.std(axis=0)
+        scale[scale == 0] = 1.0
+
+        modes = sorted(frame[MODE_FEATURE].astype(str).unique())
+        one_hot = (frame[MODE_FEATURE].astype(str).to_numpy()[:, None]
+                   == np.array(modes)[None, :]).astype(np.float64)
+
+        points = np.hstack([(raw - mean) / scale, one_hot])
+
+        columns = {}
+        labels = {}
+
+        for column in RESULT_COLUMNS:
+            if column in TEXT_COLUMNS:
+                codes, uniques = pd.factorize(frame[column].astype(str))
+                columns[column] = codes.astype(np.int32)
+                labels[column] = [str(value) for value in uniques]
+            else:
+                columns[column] = frame[column].to_numpy()
+
+        return cls(cKDTree(points), columns, labels, mean, scale, modes, version=version)
+
+    def point(self, shipment):
+        """Feature vector for a shipment dict keyed like the history columns."""
+        raw = np.array([float(shipment[column]) for column in NUMERIC_FEATURES])
+        raw[_LOG_POSITIONS] = np.log1p(raw[_LOG_POSITIONS])
+
+        one_hot = np.array([shipment[MODE_FEATURE] == mode for mode in self.modes],
+                           dtype=np.float64)
+
+        return np.concatenate([(raw - self.mean) / self.scale, one_hot])
+
+    def query(self, shipment, k=5):
+        k = min(k, len(self))
+        distances, indices = self.tree.query(self.point(shipment), k=k)
+        distances, indices = np.atleast_1d(distances), np.atleast_1d(indices)
+
+        results = []
+
+        for distance, i in zip(distances, indices):
+            row = {}
+
+            for column in RESULT_COLUMNS:
+                value = self.columns[column][i]
+
+                if column in TEXT_COLUMNS:
+                    row[column] = self.labels[column][value]
+                elif column == "Moisture_Sens":
+                    row[column] = bool(value)
+                else:
+                    row[column] = value.item()
+
+            row["Distance"] = round(float(distance), 4)
+            results.append(row)
+
+        return results
+
+    def save(self, path):
+        with open(os.path.join(path, TREE_FILE), "wb") as f:
+            pickle.dump(self.tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        for column, values in self.columns.items():
+            np.save(os.path.join(path, f"{column}.npy"), values)
+
+        with open(os.path.join(path, META_FILE), "w") as f:
+            json.dump({
+                "version": self.version,
+                "format": INDEX_FORMAT,
+                "rows": len(self),
+                "features": NUMERIC_FEATURES + [f"{MODE_FEATURE}={mode}" for mode in self.modes],
+                "mean": self.mean.tolist(),
+                "scale": self.scale.tolist(),
+                "modes": self.modes,
+                "labels": self.labels,
+                "created_at": time.time()
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+
+        with open(os.path.join(path, TREE_FILE), "rb") as f:
+            tree = pickle.load(f)
+
+        columns = {column: np.load(os.path.join(path, f"{column}.npy"), mmap_mode="r")
+                   for column in RESULT_COLUMNS}
+
+        return cls(tree, columns, meta["labels"], np.array(meta["mean"]),
+                   np.array(meta["scale"]), meta["modes"], version=meta["version"])
+
+
+# ==============================
+# INDEX STORE
+# ==============================
+
+class ShipmentIndexStore:
+    """The published index of the packaging history.
+
+    ``compile()`` builds the index of the current history file and
+    publishes it. ``get()`` only ever loads a published index: it re-checks
+    the CURRENT pointer at most every ``check_interval`` seconds and swaps
+    in the new index once one is published, serving the previous one until
+    then.
+    """
+
+    def __init__(self, history_path=DEFAULT_HISTORY, root=DEFAULT_ROOT, check_interval=30.0):
+        self.history_path = history_path
+        self.root = root
+        self.check_interval = check_interval
+
+        self._index = None
+        self._pointer_mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            os.environ.get("HISTORY_CSV", DEFAULT_HISTORY),
+            os.environ.get("HISTORY_INDEX_DIR", DEFAULT_ROOT),
+            check_interval=float(os.environ.get("HISTORY_INDEX_RELOAD_INTERVAL", 30.0))
+        )
+
+    def compile(self, keep=2):
+        if not os.path.exists(self.history_path):
+            raise HistoryUnavailable(f"no packaging history at {self.history_path}")
+
+        key = index_key(self.history_path)
+        target = os.path.join(self.root, key)
+
+        if not os.path.exists(os.path.join(target, META_FILE)):
+            frame = pd.read_csv(self.history_path, usecols=RESULT_COLUMNS)
+            index = ShipmentIndex.build(frame, version=key)
+
+            os.makedirs(self.root, exist_ok=True)
+            staging = tempfile.mkdtemp(prefix=".staging-", dir=self.root)
+            index.save(staging)
+
+            publish_snapshot(staging, target)
+
+        replace_file(os.path.join(self.root, CURRENT_FILE), key)
+        self.prune(keep)
+
+        return target
+
+    def prune(self, keep=2):
+        # Only indexes older than the published one go, newest kept first;
+        # workers still mapping one keep their pages until they switch over
+        current = self.current_version()
+        if current is None:
+            return
+
+        published = os.path.getmtime(os.path.join(self.root, current))
+        older = []
+
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith(".") or not os.path.isdir(path) or name == current:
+                continue
+            if os.path.getmtime(path) < published:
+                older.append((os.path.getmtime(path), path))
+
+        for _, path in sorted(older, reverse=True)[max(keep - 1, 0):]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def current_version(self):
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def get(self):
+        """The published index; raises HistoryUnavailable when none has
+        been built yet."""
+        now = time.monotonic()
+        index = self._index
+
+        if index is not None and now - self._checked_at < self.check_interval:
+            return index
+
+        with self._lock:
+            if self._index is not None and now - self._checked_at < self.check_interval:
+                return self._index
+
+            self._checked_at = now
+
+            try:
+                mtime = os.stat(os.path.join(self.root, CURRENT_FILE)).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+
+            if mtime is None and self._index is None:
+                raise HistoryUnavailable(
+                    f"no history index published in {self.root}; "
+                    "build it with python similar_shipments.py")
+
+            if mtime is not None and mtime != self._pointer_mtime:
+                version = self.current_version()
+
+                if self._index is None or version != self._index.version:
+                    self._index = ShipmentIndex.load(os.path.join(self.root, version))
+
+                self._pointer_mtime = mtime
+
+            return self._index
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+    store = ShipmentIndexStore.from_env()
+
+    if len(sys.argv) > 1:
+        store.history_path = sys.argv[1]
+
+    try:
+        path = store.compile()
+    except HistoryUnavailable as exc:
+        sys.exit(f"❌ Cannot build the history index: {exc}")
+
+    print(f"✅ Indexed {ShipmentIndex.load(path).tree.n} past orders in {path}")
@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# app.py reads its configuration from the environment at import time: point
+# the database, snapshots and report files at a scratch directory first
+SCRATCH = tempfile.mkdtemp(prefix="ecopack-tests-")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH, 'app.db')}"
+os.environ["MATERIAL_SNAPSHOT_DIR"] = os.path.join(SCRATCH, "snapshots")
+os.environ["HISTORY_INDEX_DIR"] = os.path.join(SCRATCH, "history_index")
+os.environ["REPORT_CACHE_DIR"] = os.path.join(SCRATCH, "reports")
+os.environ.pop("WRITE_BEHIND", None)
+
+
+@pytest.fixture
+def app_module():
+    """app.py bound to an empty SQLite database."""
+    import app as app_module
+
+    with app_module.app.app_context():
+        app_module.db.drop_all()
+        app_module.db.create_all()
+
+    app_module.ranking_cache.clear()
+    app_module.forget_profile_names()
+
+    return app_module
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,93 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from cache import LRUCache, RankingCache
+from material_store import DEFAULT_SOURCE
+from scoring import MaterialFilter, ScoringEngine
+
+# ==============================
+# RANKING CACHE
+# ==============================
+
+
+@pytest.fixture(scope="module")
+def engines():
+    df = pd.read_csv(DEFAULT_SOURCE)
+
+    # Same materials in another order: every cached index means something
+    # else in the reloaded catalog
+    old = ScoringEngine.from_dataframe(df, version="v1")
+    new = ScoringEngine.from_dataframe(df.iloc[::-1].reset_index(drop=True), version="v2")
+
+    return old, new
+
+
+def names(engine, ranking):
+    return [str(engine.names[i]) for i in ranking[0]]
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["hits"] == 3
+
+
+def test_hit_reuses_ranking_and_rescales_totals(engines):
+    engine, _ = engines
+    cache = RankingCache()
+
+    first = cache.rank(engine, 5, 1, "M")
+    again = cache.rank(engine, 5, 4, "M")
+
+    assert first == engine.rank(5, 1, "M")
+    assert again == engine.rank(5, 4, "M")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_reload_drops_old_rankings(engines):
+    old, new = engines
+    cache = RankingCache()
+    material_filter = MaterialFilter(categories=("Paper",))
+
+    cache.top_k(old, 5, "M", 5)
+    cache.top_k(old, 5, "M", 5, material_filter=material_filter)
+
+    assert names(new, cache.top_k(new, 5, "M", 5)) == names(new, new.ranked(5, "M"))
+    assert (names(new, cache.top_k(new, 5, "M", 5, material_filter=material_filter))
+            == names(new, new.ranked(5, "M", members=new.member_set(material_filter))))
+    assert len(cache) == 2
+
+
+@pytest.mark.parametrize("material_filter", [None, MaterialFilter(categories=("Paper",))])
+def test_fill_in_flight_during_reload(engines, monkeypatch, material_filter):
+    old, new = engines
+    cache = RankingCache()
+    ranked = old.ranked
+
+    def reload_meanwhile(*args):
+        # While this request still scores on the old engine, the catalog
+        # is reloaded and another request fills the same shipment
+        cache.top_k(new, 5, "M", 5, material_filter=material_filter)
+        return ranked(*args)
+
+    monkeypatch.setattr(old, "ranked", reload_meanwhile)
+    in_flight = cache.top_k(old, 5, "M", 5, material_filter=material_filter)
+
+    served = cache.top_k(new, 5, "M", 5, material_filter=material_filter)
+
+    assert names(old, in_flight) == names(old, ranked(5, "M", members=old.member_set(material_filter)))
+    assert names(new, served) == names(new, new.ranked(5, "M", members=new.member_set(material_filter)))
+
+    # The old engine's result was not kept
+    assert all(key[0] == new.version for key in cache._data)
@@ -0,0 +1,128 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import raw_data
+from chunked_cleaning import QuantileSketch, RowHashSet, clean_history
+from raw_data import RAW_SOURCES, read_raw
+
+# ==============================
+# CHUNKED CLEANING VS IN-MEMORY
+# ==============================
+#
+# The in-memory path is notebooks/02's: drop_duplicates, then fill gaps
+# with the medians of the deduplicated frame. Streaming in small chunks
+# must write the same CSV, byte for byte.
+
+NAME = "packaging_history"
+
+
+@pytest.fixture(autouse=True)
+def sidecar_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(raw_data, "SIDECAR_DIR", str(tmp_path / "sidecars"))
+
+
+def in_memory(frame, output):
+    cleaned = frame.drop_duplicates()
+    cleaned = cleaned.fillna(cleaned.median(numeric_only=True))
+    cleaned.to_csv(output, index=False)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_workbook_cleans_like_the_notebook(tmp_path):
+    pytest.importorskip("openpyxl")
+
+    in_memory(read_raw(NAME), tmp_path / "memory.csv")
+    stats = clean_history(NAME, str(tmp_path / "chunked.csv"), chunk_rows=3_000)
+
+    assert read(tmp_path / "chunked.csv") == read(tmp_path / "memory.csv")
+    assert stats["exact_medians"]
+
+
+def test_duplicates_and_gaps_across_chunks(tmp_path):
+    pytest.importorskip("openpyxl")
+
+    rng = np.random.default_rng(0)
+    frame = read_raw(NAME).iloc[:400].reset_index(drop=True)
+
+    # Repeats of earlier rows land in later chunks, and gaps in integer,
+    # boolean and float columns
+    frame = pd.concat([frame, frame.iloc[rng.integers(0, 400, 60)]], ignore_index=True)
+    for column in ("Weight_kg", "L_cm", "Moisture_Sens", "Shipping_Mode"):
+        frame[column] = frame[column].astype(object).mask(rng.random(len(frame)) < 0.05)
+
+    source = tmp_path / "orders.csv"
+    frame.to_csv(source, index=False)
+
+    # What read_raw would return for this data as a workbook
+    restored = raw_data._restore(pd.read_csv(source, dtype=RAW_SOURCES[NAME]["dtypes"],
+                                             parse_dates=RAW_SOURCES[NAME]["dates"]))
+    in_memory(restored, tmp_path / "memory.csv")
+
+    stats = clean_history(NAME, str(tmp_path / "chunked.csv"), str(source), chunk_rows=37)
+
+    assert read(tmp_path / "chunked.csv") == read(tmp_path / "memory.csv")
+    assert stats["rows_out"] == len(restored.drop_duplicates())
+    assert stats["duplicates"] == len(frame) - stats["rows_out"] > 0
+
+
+# ==============================
+# ROW-HASH SET AND QUANTILE SKETCH
+# ==============================
+
+def test_row_hash_set_matches_a_python_set():
+    rng = np.random.default_rng(1)
+    hash_set, seen = RowHashSet(), set()
+
+    for _ in range(50):
+        hashes = rng.integers(0, 5_000, rng.integers(1, 300)).astype(np.uint64)
+        expected = []
+
+        for value in hashes.tolist():
+            expected.append(value not in seen)
+            seen.add(value)
+
+        assert hash_set.first_seen(hashes).tolist() == expected
+
+    assert len(hash_set) == len(seen)
+
+
+def test_sketch_is_exact_below_its_limit():
+    rng = np.random.default_rng(2)
+    values = rng.normal(size=5_000)
+    values[::10] = np.nan
+
+    sketch = QuantileSketch(exact_limit=10_000)
+    for chunk in np.array_split(values, 7):
+        sketch.update(chunk)
+
+    assert sketch.exact
+    assert sketch.median() == pd.Series(values).median()
+
+
+def test_sketch_rank_error_past_its_limit():
+    rng = np.random.default_rng(3)
+    values = rng.lognormal(size=200_000)
+
+    sketch = QuantileSketch(exact_limit=1_000, k=512)
+    for chunk in np.array_split(values, 40):
+        sketch.update(chunk)
+
+    assert not sketch.exact
+    ordered = np.sort(values)
+
+    for q in (0.1, 0.5, 0.9):
+        rank = np.searchsorted(ordered, sketch.quantile(q)) / len(values)
+        assert abs(rank - q) < 0.02
+
+    restored = QuantileSketch.from_arrays(sketch.to_arrays(), sketch.count, k=512)
+    assert restored.median() == sketch.median()
@@ -0,0 +1,71 @@
+import os
+import sys
+from datetime import datetime
+from io import BytesIO
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import exports
+from exports import write_excel
+
+openpyxl = pytest.importorskip("openpyxl")
+
+# ==============================
+# STREAMING EXCEL EXPORTS
+# ==============================
+
+HEADERS = ["Item", "Cost"]
+
+
+def sheets(output):
+    workbook = openpyxl.load_workbook(output, read_only=True)
+    return {sheet.title: [list(row) for row in sheet.iter_rows(values_only=True)]
+            for sheet in workbook.worksheets}
+
+
+def test_rows_are_written_in_order():
+    rows = ((f"item {number}", number * 1.5) for number in range(50))
+
+    assert sheets(write_excel(HEADERS, rows)) == {
+        "Sustainability Data": [HEADERS] + [[f"item {number}", number * 1.5] for number in range(50)]
+    }
+
+
+def test_rows_past_the_sheet_limit_continue_on_a_new_sheet(monkeypatch):
+    monkeypatch.setattr(exports, "EXCEL_MAX_ROWS", 4)
+
+    result = sheets(write_excel(HEADERS, [(f"item {number}", number) for number in range(7)]))
+
+    assert list(result) == ["Sustainability Data", "Sustainability Data 2", "Sustainability Data 3"]
+    assert [len(rows) for rows in result.values()] == [4, 4, 2]
+    assert all(rows[0] == HEADERS for rows in result.values())
+    assert [row[1] for rows in result.values() for row in rows[1:]] == list(range(7))
+
+
+def test_empty_export_has_the_header_row():
+    assert sheets(write_excel(HEADERS, [])) == {"Sustainability Data": [HEADERS]}
+
+
+BEST = {"Material": "Cardboard", "Total_Cost": 4.0, "Total_CO2": 1.0, "Strength": 3.0, "Score": 80.0}
+
+
+def test_export_route_streams_the_date_range(app_module, client):
+    rows = [app_module.recommendation_row(f"item {day}", 1.0, 1, "Low", BEST)
+            for day in range(1, 6)]
+    for day, row in enumerate(rows, start=1):
+        row["created_at"] = datetime(2024, 5, day, 9)
+
+    with app_module.app.app_context():
+        app_module.save_recommendations(rows)
+        app_module.db.session.commit()
+
+    response = client.get("/export_excel", query_string={"start": "2024-05-02", "end": "2024-05-04"})
+
+    assert response.status_code == 200
+    assert response.mimetype == exports.XLSX_MIMETYPE
+
+    result = sheets(BytesIO(response.data))
+
+    assert [row[0] for row in result["Sustainability Data"]] == ["Item", "item 2", "item 3", "item 4"]
@@ -0,0 +1,94 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from history import utcnow
+
+# ==============================
+# CREATED_AT DEFAULT
+# ==============================
+
+
+def test_postgres_default_is_utc(app_module):
+    ddl = str(CreateTable(app_module.Recommendation.__table__).compile(dialect=postgresql.dialect()))
+
+    assert "DEFAULT timezone('utc', now())" in ddl
+
+
+def test_rows_inserted_without_created_at_get_utc(app_module):
+    with app_module.app.app_context():
+        app_module.db.session.execute(text("INSERT INTO recommendation (item) VALUES ('raw')"))
+        created_at = app_module.db.session.execute(
+            text("SELECT created_at FROM recommendation")).scalar()
+
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+
+    assert abs(created_at - utcnow()) < timedelta(minutes=1)
+
+
+# ==============================
+# KEYSET CURSORS
+# ==============================
+
+T0 = datetime(2024, 5, 1, 12, 0)
+
+
+def add(app_module, times):
+    with app_module.app.app_context():
+        app_module.db.session.execute(app_module.Recommendation.__table__.insert(), [
+            {"item": f"item {number}", "best_material": "Cardboard" if number % 2 else "Foam",
+             "created_at": moment}
+            for number, moment in enumerate(times)
+        ])
+        app_module.db.session.commit()
+
+
+def pages(client, **args):
+    ids, cursor = [], None
+
+    while True:
+        query = dict(args, **({"cursor": cursor} if cursor else {}))
+        body = client.get("/api/recommendations", query_string=query).get_json()
+
+        assert len(body["results"]) <= args["limit"]
+        ids.append([row["id"] for row in body["results"]])
+        cursor = body["next_cursor"]
+
+        if cursor is None:
+            return ids
+
+
+def test_pages_cover_equal_timestamps_without_gaps_or_repeats(app_module, client):
+    # Runs of rows sharing a created_at, straddling page boundaries
+    add(app_module, [T0] * 5 + [T0 + timedelta(seconds=1)] * 4 + [T0 - timedelta(days=1)] * 3)
+
+    result = pages(client, limit=4)
+    flat = [row_id for page in result for row_id in page]
+
+    # Newest first, ties broken by id descending
+    assert flat == [9, 8, 7, 6, 5, 4, 3, 2, 1, 12, 11, 10]
+    assert [len(page) for page in result] == [4, 4, 4]
+
+
+def test_cursor_keeps_range_and_material_filters(app_module, client):
+    add(app_module, [T0 + timedelta(minutes=number // 3) for number in range(12)])
+
+    result = pages(client, limit=2, material="Cardboard",
+                   start="2024-05-01T12:01:00", end="2024-05-01T12:04:00")
+    flat = [row_id for page in result for row_id in page]
+
+    # Cardboard rows are the odd numbers, ids one higher; minutes 1..3
+    assert flat == [12, 10, 8, 6, 4]
+
+
+def test_bad_cursor_is_rejected(client):
+    response = client.get("/api/recommendations", query_string={"cursor": "yesterday_x"})
+
+    assert response.status_code == 400
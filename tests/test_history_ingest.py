@@ -0,0 +1,140 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import history_ingest
+from chunked_cleaning import clean_history
+from history_ingest import NAME, ingest, summary
+
+# ==============================
+# INCREMENTAL HISTORY INGESTION
+# ==============================
+
+
+def orders(rows, seed=0, first_id=1):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "Order_ID": np.arange(first_id, first_id + rows),
+        "Date": pd.date_range("2024-01-01", periods=rows, freq="h").astype(str),
+        "Item_Name": rng.choice(["Mug", "Lamp", "Book"], rows),
+        "Category": rng.choice(["Home", "Media"], rows),
+        "Weight_kg": rng.lognormal(0, 1, rows).round(3),
+        "Volumetric_Weight_kg": rng.lognormal(0, 1, rows).round(3),
+        "L_cm": rng.integers(5, 120, rows),
+        "W_cm": rng.integers(5, 80, rows),
+        "H_cm": rng.integers(2, 60, rows),
+        "Fragility": rng.integers(1, 11, rows),
+        "Moisture_Sens": rng.random(rows) < 0.3,
+        "Shipping_Mode": rng.choice(["Air", "Road", "Sea"], rows),
+        "Distance_km": rng.integers(10, 5000, rows),
+        "Packaging_Used": rng.choice(["Box", "Bubble Wrap", "Crate"], rows),
+        "Cost_USD": rng.uniform(1, 50, rows).round(2),
+        "CO2_Emission_kg": rng.uniform(0.1, 9, rows).round(3)
+    })
+
+    # A few gaps for the medians to fill
+    frame.loc[frame.index[::7], "Weight_kg"] = np.nan
+    return frame
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return {
+        "source": str(tmp_path / "orders.csv"),
+        "output": str(tmp_path / "cleaned.csv"),
+        "state_path": str(tmp_path / "state.npz")
+    }
+
+
+def run(paths, frame, chunk_rows=40):
+    frame.to_csv(paths["source"], index=False)
+    return ingest(paths["source"], paths["output"], paths["state_path"], chunk_rows=chunk_rows)
+
+
+def test_first_run_matches_a_full_clean(paths, tmp_path):
+    frame = orders(200)
+
+    assert run(paths, frame) == 200
+
+    clean_history(NAME, str(tmp_path / "full.csv"), paths["source"], chunk_rows=40)
+    pd.testing.assert_frame_equal(pd.read_csv(paths["output"]),
+                                  pd.read_csv(tmp_path / "full.csv"))
+
+
+def test_appends_only_the_delta(paths):
+    first = orders(200)
+    run(paths, first)
+
+    new = orders(30, seed=1, first_id=201)
+    # A repeated new order, and an old order shipped again in the export
+    grown = pd.concat([first, new, new.iloc[[3]], first.iloc[[10]]], ignore_index=True)
+
+    assert run(paths, grown) == 30
+
+    cleaned = pd.read_csv(paths["output"])
+    assert cleaned["Order_ID"].tolist() == list(range(1, 231))
+    assert cleaned["Weight_kg"].notna().all()
+    assert summary(paths["state_path"])["watermark"] == 230
+
+    # Nothing new: nothing appended
+    size = os.path.getsize(paths["output"])
+    assert run(paths, grown) == 0
+    assert os.path.getsize(paths["output"]) == size
+
+
+def test_source_is_read_once(paths, monkeypatch):
+    reads = []
+    iter_chunks = history_ingest.iter_chunks
+
+    def counted(*args, **kwargs):
+        reads.append(args)
+        return iter_chunks(*args, **kwargs)
+
+    monkeypatch.setattr(history_ingest, "iter_chunks", counted)
+
+    assert run(paths, orders(120)) == 120
+    assert len(reads) == 1
+
+
+def test_uncommitted_append_is_rolled_back(paths):
+    first = orders(50)
+    run(paths, first)
+    committed = os.path.getsize(paths["output"])
+
+    with open(paths["output"], "a") as f:
+        f.write("999,half a row")
+
+    assert run(paths, first) == 0
+    assert os.path.getsize(paths["output"]) == committed
+
+
+@pytest.mark.skipif(history_ingest.fcntl is None, reason="needs fcntl")
+def test_runs_are_serialized(paths):
+    frame = orders(60)
+    frame.to_csv(paths["source"], index=False)
+    results = []
+
+    # Another run holding the lock
+    with open(paths["state_path"] + ".lock", "a") as lock:
+        history_ingest.fcntl.flock(lock, history_ingest.fcntl.LOCK_EX)
+
+        worker = threading.Thread(target=lambda: results.append(
+            ingest(paths["source"], paths["output"], paths["state_path"])))
+        worker.start()
+        worker.join(0.5)
+
+        assert worker.is_alive()
+        assert not os.path.exists(paths["output"])
+
+        history_ingest.fcntl.flock(lock, history_ingest.fcntl.LOCK_UN)
+
+    worker.join(10)
+
+    assert results == [60]
+    assert ingest(paths["source"], paths["output"], paths["state_path"]) == 0
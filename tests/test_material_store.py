@@ -0,0 +1,127 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from material_store import CURRENT_FILE, DEFAULT_SOURCE, MaterialStore
+from scoring import ScoringEngine
+
+# ==============================
+# SNAPSHOT COMPILE AND HOT RELOAD
+# ==============================
+
+CATALOG = pd.read_csv(DEFAULT_SOURCE)
+
+
+@pytest.fixture
+def store(tmp_path):
+    source = tmp_path / "materials.csv"
+    CATALOG.iloc[:40].to_csv(source, index=False)
+
+    return MaterialStore(str(tmp_path / "snapshots"), str(source), check_interval=0)
+
+
+def write_catalog(store, rows):
+    CATALOG.iloc[:rows].to_csv(store.source_csv, index=False)
+
+
+def snapshots(store):
+    return sorted(name for name in os.listdir(store.root)
+                  if not name.startswith(".") and name != CURRENT_FILE)
+
+
+def results(engine):
+    return [row["Material"] for row in engine.rank(3.0, 2, "M", k=10)]
+
+
+def test_snapshot_ranks_like_the_csv(store):
+    engine = store.get()
+
+    assert len(engine) == 40
+    assert engine.version == store.current_version()
+    assert results(engine) == results(ScoringEngine.from_csv(store.source_csv))
+
+
+def test_compile_is_keyed_on_the_csv_contents(store):
+    first = store.compile()
+
+    assert store.compile() == first
+    assert snapshots(store) == [first]
+
+    write_catalog(store, 30)
+    assert store.compile() != first
+
+
+def test_get_swaps_in_a_new_snapshot(store):
+    old = store.get()
+    assert store.get() is old
+
+    write_catalog(store, 25)
+    store.compile()
+    new = store.get()
+
+    assert len(new) == 25
+    assert new.version != old.version
+
+    # Requests holding the old engine keep a working one
+    assert len(results(old)) == 10
+
+
+def test_prune_keeps_the_current_and_newest_snapshots(store):
+    versions = []
+
+    for rows in (10, 20, 30, 40):
+        write_catalog(store, rows)
+        versions.append(store.compile(keep=2))
+        os.utime(os.path.join(store.root, versions[-1]), (rows, rows))
+
+    assert snapshots(store) == sorted(versions[-2:])
+
+    # An older snapshot published again stays, being current
+    store.publish(versions[-2])
+    store.prune(keep=1)
+
+    assert snapshots(store) == [versions[-2]]
+    assert store.get().version == versions[-2]
+
+
+# ==============================
+# SHARED ENGINE ARRAYS
+# ==============================
+
+def test_shared_engine_matches_a_private_one(store):
+    version = store.compile()
+    shared = store.load(version)
+    private = MaterialStore(store.root, store.source_csv, shared=False).load(version)
+
+    for weight, fragility in [(0.5, "L"), (3.0, "M"), (40, "H")]:
+        assert shared.rank(weight, 1, fragility, k=10) == private.rank(weight, 1, fragility, k=10)
+
+    # Workers map the snapshot's arrays instead of copying them
+    assert not shared.cost.flags.writeable
+
+
+def test_snapshot_of_another_format_is_recompiled(store):
+    # CURRENT left naming a snapshot written by an older release
+    version = store.compile()
+    os.rename(os.path.join(store.root, version), os.path.join(store.root, "older"))
+    meta_path = os.path.join(store.root, "older", "meta.json")
+
+    with open(meta_path) as f:
+        stale = f.read().replace('"format": ', '"format": -')
+    with open(meta_path, "w") as f:
+        f.write(stale)
+
+    store.publish("older")
+
+    assert not store.is_compatible("older")
+    with pytest.raises(ValueError):
+        store.load("older")
+
+    engine = store.get()
+
+    assert engine.version == version == store.current_version()
+    assert results(engine) == results(ScoringEngine.from_csv(store.source_csv))
@@ -0,0 +1,145 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pipeline
+from pipeline import Stage
+
+# ==============================
+# NOTEBOOK PIPELINE
+# ==============================
+#
+# A diamond of stand-in notebooks: source feeds left and right, both feed
+# merge. Each script copies its inputs to its output and appends its name
+# to runs.log.
+
+SCRIPT = """
+import os
+import sys
+
+with open("../runs.log", "a") as log:
+    log.write("{name}\\n")
+
+if os.environ.get("FAIL") == "{name}":
+    sys.exit("failing on purpose")
+
+text = "".join(open(os.path.join("..", path)).read() for path in {inputs!r})
+with open(os.path.join("..", {output!r}), "w") as f:
+    f.write(text)
+"""
+
+
+def stage(root, name, inputs, output):
+    with open(root / "notebooks" / f"{name}.py", "w") as f:
+        f.write(SCRIPT.format(name=name, inputs=inputs, output=output))
+
+    return Stage(name, f"{name}.py", inputs=inputs, outputs=[output])
+
+
+@pytest.fixture
+def stages(tmp_path, monkeypatch):
+    (tmp_path / "notebooks").mkdir()
+    (tmp_path / "raw.txt").write_text("raw data")
+
+    monkeypatch.setattr(pipeline, "BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline, "NOTEBOOKS", str(tmp_path / "notebooks"))
+    monkeypatch.setattr(pipeline, "STATE_FILE", str(tmp_path / ".pipeline" / "state.json"))
+
+    return [
+        stage(tmp_path, "source", ["raw.txt"], "source.txt"),
+        stage(tmp_path, "left", ["source.txt"], "left.txt"),
+        stage(tmp_path, "right", ["source.txt"], "right.txt"),
+        stage(tmp_path, "merge", ["left.txt", "right.txt"], "merge.txt")
+    ]
+
+
+def run(stages, **kwargs):
+    root = pipeline.BASE_DIR
+    log = os.path.join(root, "runs.log")
+
+    if os.path.exists(log):
+        os.remove(log)
+
+    report = pipeline.run(stages, **kwargs)
+    statuses = {name: status for name, (status, _) in report.items()}
+
+    if not os.path.exists(log):
+        return statuses, []
+
+    with open(log) as f:
+        return statuses, sorted(f.read().split())
+
+
+def everything(status):
+    return {name: status for name in ("source", "left", "right", "merge")}
+
+
+def test_rerun_skips_every_stage(stages):
+    assert run(stages) == (everything("ran"), ["left", "merge", "right", "source"])
+    assert run(stages) == (everything("skipped"), [])
+
+    with open(os.path.join(pipeline.BASE_DIR, "merge.txt")) as f:
+        assert f.read() == "raw dataraw data"
+
+
+def test_changed_input_reruns_its_dependents(stages, tmp_path):
+    run(stages)
+
+    (tmp_path / "raw.txt").write_text("new data")
+    assert run(stages) == (everything("ran"), ["left", "merge", "right", "source"])
+
+    # Rewritten with the same contents: nothing to do
+    (tmp_path / "raw.txt").write_text("new data")
+    assert run(stages)[0] == everything("skipped")
+
+
+def test_identical_upstream_output_does_not_cascade(stages, tmp_path):
+    run(stages)
+
+    # source runs again (its script changed) but writes the same file
+    with open(tmp_path / "notebooks" / "source.py", "a") as f:
+        f.write("# reformatted\n")
+
+    statuses, ran = run(stages)
+
+    assert ran == ["source"]
+    assert statuses == {**everything("skipped"), "source": "ran"}
+
+
+def test_missing_output_and_force_rerun_the_stage(stages, tmp_path):
+    run(stages)
+
+    (tmp_path / "left.txt").unlink()
+    assert run(stages)[1] == ["left"]
+
+    assert run(stages, force=["right"])[1] == ["right"]
+
+
+def test_failure_blocks_downstream_until_fixed(stages, tmp_path, monkeypatch):
+    run(stages)
+    (tmp_path / "raw.txt").write_text("new data")
+    monkeypatch.setenv("FAIL", "left")
+
+    statuses, _ = run(stages)
+    assert statuses == {"source": "ran", "left": "failed", "right": "ran", "merge": "blocked"}
+
+    # Only the failed stage and what it blocked are left to run
+    monkeypatch.delenv("FAIL")
+    statuses, ran = run(stages)
+
+    assert ran == ["left", "merge"]
+    assert statuses == {"source": "skipped", "left": "ran", "right": "skipped", "merge": "ran"}
+
+
+def test_dry_run_runs_nothing(stages, tmp_path):
+    run(stages)
+    (tmp_path / "raw.txt").write_text("new data")
+
+    statuses, ran = run(stages, dry_run=True)
+
+    assert ran == []
+    assert statuses == everything("would run")
+    assert run(stages)[1] == ["left", "merge", "right", "source"]
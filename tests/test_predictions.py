@@ -0,0 +1,131 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import predictions
+from material_store import DEFAULT_SOURCE, MaterialStore
+from predictions import (COST_WEIGHT, CO2_WEIGHT, FEATURES, MIN_STRENGTH, MODEL_FILES,
+                         ModelsUnavailable, PredictionStore)
+
+joblib = pytest.importorskip("joblib")
+ensemble = pytest.importorskip("sklearn.ensemble")
+preprocessing = pytest.importorskip("sklearn.preprocessing")
+
+# ==============================
+# PRECOMPUTED CATALOG PREDICTIONS
+# ==============================
+#
+# Small forests trained the way notebooks/05 trains its models, on the
+# per-kg cost and CO2 of the catalog, stand in for models/ (which does
+# not ship cost_model.pkl).
+
+CATALOG = pd.read_csv(DEFAULT_SOURCE)
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    directory = tmp_path / "models"
+    directory.mkdir()
+
+    encoder = preprocessing.LabelEncoder().fit(CATALOG["Category"])
+    features = CATALOG.assign(Category_Encoded=encoder.transform(CATALOG["Category"]))[FEATURES]
+    scaler = preprocessing.StandardScaler().fit(features)
+    scaled = scaler.transform(features)
+
+    models = {
+        "cost": ensemble.RandomForestRegressor(n_estimators=5, random_state=0).fit(
+            scaled, CATALOG["Cost_per_kg"]),
+        "co2": ensemble.RandomForestRegressor(n_estimators=5, random_state=1).fit(
+            scaled, CATALOG["CO2_Emission_kg"]),
+        "scaler": scaler,
+        "category_encoder": encoder
+    }
+
+    for key, name in MODEL_FILES.items():
+        joblib.dump(models[key], directory / name)
+
+    return str(directory)
+
+
+@pytest.fixture
+def material_store(tmp_path):
+    source = tmp_path / "materials.csv"
+    CATALOG.iloc[:120].to_csv(source, index=False)
+
+    return MaterialStore(str(tmp_path / "snapshots"), str(source), check_interval=0)
+
+
+def notebook_ranking(frame, cost_per_kg, co2_per_kg, weight, units, fragility, k=5):
+    # notebooks/06: strength filter, totals, Final_Score, best first
+    frame = frame.assign(Total_Cost=cost_per_kg * weight * units,
+                         Total_CO2=co2_per_kg * weight * units)
+    frame = frame[frame["Tensile_Strength_MPa"] >= MIN_STRENGTH.get(fragility, MIN_STRENGTH["L"])]
+    frame = frame.assign(Final_Score=COST_WEIGHT / frame["Total_Cost"]
+                         + CO2_WEIGHT / frame["Total_CO2"])
+
+    return frame.sort_values("Final_Score", ascending=False, kind="stable").head(k)
+
+
+def test_missing_model_is_reported(material_store, model_dir):
+    os.remove(os.path.join(model_dir, MODEL_FILES["cost"]))
+
+    with pytest.raises(ModelsUnavailable, match=MODEL_FILES["cost"]):
+        PredictionStore(material_store, model_dir).get()
+
+
+def test_predictions_are_the_models_outputs(material_store, model_dir):
+    ranking = PredictionStore(material_store, model_dir).get()
+
+    frame = pd.read_csv(material_store.source_csv)
+    encoder = joblib.load(os.path.join(model_dir, MODEL_FILES["category_encoder"]))
+    scaler = joblib.load(os.path.join(model_dir, MODEL_FILES["scaler"]))
+    scaled = scaler.transform(
+        frame.assign(Category_Encoded=encoder.transform(frame["Category"]))[FEATURES])
+
+    for key, predicted in (("cost", ranking.cost_per_kg), ("co2", ranking.co2_per_kg)):
+        model = joblib.load(os.path.join(model_dir, MODEL_FILES[key]))
+        np.testing.assert_allclose(predicted, model.predict(scaled), rtol=1e-12)
+
+
+@pytest.mark.parametrize("fragility", ["L", "M", "H", "?"])
+def test_ranking_matches_the_notebook(material_store, model_dir, fragility):
+    ranking = PredictionStore(material_store, model_dir).get()
+    frame = pd.read_csv(material_store.source_csv)
+
+    expected = notebook_ranking(frame, np.asarray(ranking.cost_per_kg),
+                                np.asarray(ranking.co2_per_kg), 2.5, 4, fragility)
+    results = ranking.rank(2.5, 4, fragility)
+
+    assert [row["Material"] for row in results] == expected["Material_Name"].tolist()
+    assert [row["Total_Cost"] for row in results] == pytest.approx(
+        expected["Total_Cost"].round(2).tolist())
+    assert [row["Total_CO2"] for row in results] == pytest.approx(
+        expected["Total_CO2"].round(2).tolist())
+    assert results[0]["Score"] == 100
+
+
+def test_predictions_are_computed_once_per_snapshot(material_store, model_dir, monkeypatch):
+    first = PredictionStore(material_store, model_dir).get()
+
+    # Another worker finds them on disk
+    def predict_catalog(*args):
+        raise AssertionError("predictions recomputed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(predictions, "predict_catalog", predict_catalog)
+        again = PredictionStore(material_store, model_dir).get()
+
+    assert again.version == first.version
+
+    # A new snapshot gets predictions of its own
+    CATALOG.iloc[:60].to_csv(material_store.source_csv, index=False)
+    material_store.compile()
+    store = PredictionStore(material_store, model_dir)
+
+    assert len(store.get().cost_per_kg) == 60
+    assert store.get().version != first.version
@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import event
+
+# ==============================
+# WEIGHT PROFILES ON THE HOME PAGE
+# ==============================
+
+
+@pytest.fixture
+def profile_queries(app_module):
+    # Statements that touch weight_profile, recorded as they are sent
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if "weight_profile" in statement:
+            statements.append(statement)
+
+    with app_module.app.app_context():
+        engine = app_module.db.engine
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_home_reads_profile_names_once(client, profile_queries):
+    for _ in range(3):
+        assert client.get("/").status_code == 200
+
+    assert len(profile_queries) == 1
+
+
+def test_saving_and_deleting_refresh_the_list(app_module, client):
+    weights = {"eco": 0.5, "cost": 0.2, "biodeg": 0.2, "strength": 0.1}
+
+    assert b"green first" not in client.get("/").data
+
+    assert client.put("/api/profiles/green first", json=weights).status_code == 200
+    assert b"green first" in client.get("/").data
+
+    assert client.delete("/api/profiles/green first").status_code == 200
+    assert b"green first" not in client.get("/").data
+
+
+def test_home_without_profile_table(app_module, client):
+    with app_module.app.app_context():
+        app_module.WeightProfile.__table__.drop(app_module.db.engine)
+
+    response = client.get("/")
+
+    assert response.status_code == 200
+    assert app_module.profile_names() == []
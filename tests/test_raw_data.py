@@ -0,0 +1,112 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import raw_data
+from raw_data import RAW_DIR, RAW_SOURCES, build_sidecar, read_raw
+
+pytest.importorskip("openpyxl")
+
+# ==============================
+# RAW WORKBOOK SIDECARS
+# ==============================
+#
+# read_raw() must hand the notebooks exactly the frame pd.read_excel gave
+# them before the sidecars existed.
+
+GAPPY = {
+    "file": "gappy.xlsx",
+    "dtypes": {"ID": "Int64", "Count": "Int64", "Flag": "boolean", "Full_Flag": "boolean",
+               "Name": "str", "Price": "float64"},
+    "dates": ["Date"]
+}
+
+
+@pytest.fixture(autouse=True)
+def sidecar_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(raw_data, "SIDECAR_DIR", str(tmp_path / "sidecars"))
+    return tmp_path / "sidecars"
+
+
+@pytest.fixture
+def gappy(tmp_path, monkeypatch):
+    monkeypatch.setitem(RAW_SOURCES, "gappy", GAPPY)
+    path = str(tmp_path / GAPPY["file"])
+
+    pd.DataFrame({
+        "ID": [1, 2, 3, 4],
+        "Count": [5, None, 7, 8],
+        "Flag": [True, None, False, True],
+        "Full_Flag": [True, False, False, True],
+        "Name": ["a", "b", None, "d"],
+        "Price": [1.5, 2.0, None, 4.25],
+        "Date": pd.to_datetime(["2024-01-01", "2024-02-01", "2024-03-01", "2024-04-01"])
+    }).to_excel(path, index=False)
+
+    return path
+
+
+def expected(name, source):
+    frame = pd.read_excel(source)
+
+    for column in RAW_SOURCES[name]["dates"]:
+        frame[column] = pd.to_datetime(frame[column])
+
+    return frame
+
+
+@pytest.mark.parametrize("name", sorted(RAW_SOURCES))
+def test_shipped_workbooks_read_like_read_excel(name):
+    source = os.path.join(RAW_DIR, RAW_SOURCES[name]["file"])
+
+    pd.testing.assert_frame_equal(read_raw(name), expected(name, source))
+
+
+@pytest.mark.parametrize("sidecar_format", ["parquet", "pkl"])
+def test_gaps_come_back_as_read_excel_dtypes(gappy, monkeypatch, sidecar_format):
+    if sidecar_format == "parquet":
+        pytest.importorskip("pyarrow")
+    monkeypatch.setattr(raw_data, "_sidecar_format", lambda: sidecar_format)
+
+    frame = read_raw("gappy", gappy)
+
+    assert build_sidecar("gappy", gappy).endswith(f".{sidecar_format}")
+    assert frame["ID"].dtype == np.int64
+    assert frame["Count"].dtype == np.float64
+    assert frame["Full_Flag"].dtype == bool
+    pd.testing.assert_frame_equal(frame, expected("gappy", gappy))
+
+
+def test_sidecar_is_reused_until_the_workbook_changes(gappy, sidecar_dir, monkeypatch):
+    first = build_sidecar("gappy", gappy)
+
+    def parse(*args):
+        raise AssertionError("workbook parsed again")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(raw_data, "_parse", parse)
+        assert build_sidecar("gappy", gappy) == first
+
+    frame = pd.read_excel(gappy)
+    frame.loc[0, "Price"] = 9.5
+    frame.to_excel(gappy, index=False)
+
+    second = build_sidecar("gappy", gappy)
+
+    assert second != first
+    assert os.listdir(sidecar_dir) == [os.path.basename(second)]
+    assert read_raw("gappy", gappy)["Price"][0] == 9.5
+
+
+def test_changing_a_dtype_makes_a_new_sidecar(gappy, monkeypatch):
+    first = build_sidecar("gappy", gappy)
+
+    monkeypatch.setitem(RAW_SOURCES, "gappy", {**GAPPY, "dtypes": {**GAPPY["dtypes"], "ID": "float64"}})
+
+    assert build_sidecar("gappy", gappy) != first
+    assert read_raw("gappy", gappy)["ID"].dtype == np.float64
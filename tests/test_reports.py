@@ -0,0 +1,137 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from reports import ReportJobs
+
+# ==============================
+# BACKGROUND PDF REPORTS
+# ==============================
+
+
+def write_report(path, text="report"):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def test_job_renders_once_and_is_served_from_disk(tmp_path):
+    calls = []
+
+    def render(path, text):
+        calls.append(text)
+        write_report(path, text)
+
+    jobs = ReportJobs(str(tmp_path), "test", render)
+
+    assert jobs.status("v1") == "unknown"
+    assert jobs.wait("v1", 5, "first") == "done"
+    assert jobs.wait("v1", 5, "again") == "done"
+
+    assert calls == ["first"]
+    with open(jobs.path("v1")) as f:
+        assert f.read() == "first"
+
+
+def test_running_job_is_not_started_twice(tmp_path):
+    release = threading.Event()
+    calls = []
+
+    def render(path):
+        calls.append(path)
+        release.wait(5)
+        write_report(path)
+
+    jobs = ReportJobs(str(tmp_path), "test", render)
+
+    jobs.submit("v1")
+    jobs.submit("v1")
+    assert jobs.status("v1") == "running"
+
+    release.set()
+    assert jobs.wait("v1", 5) == "done"
+    assert len(calls) == 1
+
+
+def test_failed_render_leaves_no_report(tmp_path):
+    def render(path):
+        write_report(path)
+        raise RuntimeError("database went away")
+
+    jobs = ReportJobs(str(tmp_path), "test", render)
+
+    assert jobs.wait("v1", 5) == "failed"
+    assert os.listdir(tmp_path) == []
+
+
+def test_only_the_newest_reports_are_kept(tmp_path):
+    jobs = ReportJobs(str(tmp_path), "test", write_report, keep=2)
+
+    for number in range(4):
+        assert jobs.wait(f"v{number}", 5) == "done"
+        os.utime(jobs.path(f"v{number}"), (number, number))
+
+    jobs.prune()
+
+    assert sorted(os.listdir(tmp_path)) == ["test-v2.pdf", "test-v3.pdf"]
+
+
+# ==============================
+# REPORT ROWS PINNED TO THEIR VERSION
+# ==============================
+
+BEST = {"Material": "Cardboard", "Total_Cost": 4.0, "Total_CO2": 1.0, "Strength": 3.0, "Score": 80.0}
+
+
+def add(app_module, items):
+    with app_module.app.app_context():
+        app_module.save_recommendations(
+            [app_module.recommendation_row(item, 1.0, 1, "Low", BEST) for item in items])
+        app_module.db.session.commit()
+
+
+@pytest.fixture
+def rendered_rows(app_module, monkeypatch):
+    # The rows each render_report_pdf call would have put in its PDF
+    rendered = []
+
+    for name in os.listdir(app_module.pdf_reports.directory):
+        os.remove(os.path.join(app_module.pdf_reports.directory, name))
+
+    def build_pdf(path, title, headers, rows, intro=()):
+        rendered.append([row[0] for row in rows])
+        write_report(path)
+
+    monkeypatch.setattr(app_module, "build_pdf", build_pdf)
+    return rendered
+
+
+def test_report_excludes_rows_added_after_its_version(app_module, rendered_rows, tmp_path):
+    add(app_module, ["a", "b", "c"])
+
+    with app_module.app.app_context():
+        job_id, max_id = app_module.report_version()
+
+    # Rows committed between choosing the job id and rendering it
+    add(app_module, ["d", "e"])
+
+    app_module.render_report_pdf(str(tmp_path / "report.pdf"), None, None, max_id)
+
+    assert job_id == f"{max_id}-3"
+    assert rendered_rows == [["a", "b", "c"]]
+
+
+def test_export_pdf_serves_the_current_version(app_module, client, rendered_rows):
+    add(app_module, ["a", "b"])
+    assert client.get("/export_pdf").status_code == 200
+
+    add(app_module, ["c"])
+    response = client.post("/api/reports/pdf")
+    job = response.get_json()
+
+    assert job["job_id"].endswith("-3")
+    assert app_module.pdf_reports.wait(job["job_id"], 5) == "done"
+    assert rendered_rows == [["a", "b"], ["a", "b", "c"]]
@@ -0,0 +1,140 @@
+import os
+import sys
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, func, select
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import dashboard
+import rollups
+from history import recommendation, utcnow
+
+# ==============================
+# DASHBOARD ROLLUPS
+# ==============================
+
+
+@pytest.fixture
+def engine(app_module):
+    with app_module.app.app_context():
+        engine = app_module.db.engine
+
+    rollups.metadata.drop_all(engine)
+    dashboard._rollup_tables_ready = False
+    dashboard._rollups_refreshed_at = None
+
+    with engine.begin() as connection:
+        rollups.create_tables(connection)
+
+    return engine
+
+
+def add(app_module, rows, age=timedelta(hours=1)):
+    for row in rows:
+        row.setdefault("created_at", utcnow() - age)
+
+    with app_module.app.app_context():
+        app_module.db.session.execute(app_module.Recommendation.__table__.insert(), rows)
+        app_module.db.session.commit()
+
+
+def raw_kpis(connection):
+    return dict(connection.execute(select(
+        func.count().label("records"),
+        func.max(recommendation.c.total_co2).label("max_co2"),
+        func.avg(recommendation.c.total_co2).label("avg_co2"),
+        func.max(recommendation.c.total_cost).label("max_cost"),
+        func.avg(recommendation.c.total_cost).label("avg_cost"),
+        func.avg(recommendation.c.sustainability_score).label("avg_score")
+    ).select_from(recommendation)).mappings().one())
+
+
+ROWS = [
+    {"best_material": "Cardboard", "total_cost": 4.0, "total_co2": 1.0, "sustainability_score": 80.0},
+    {"best_material": "Cardboard", "total_cost": None, "total_co2": 3.0, "sustainability_score": None},
+    {"best_material": "Foam", "total_cost": 10.0, "total_co2": None, "sustainability_score": 40.0},
+    {"best_material": None, "total_cost": 1.0, "total_co2": 2.0, "sustainability_score": 60.0}
+]
+
+
+def test_averages_skip_null_measures_like_avg(app_module, engine):
+    add(app_module, [dict(row) for row in ROWS[:2]])
+
+    with engine.begin() as connection:
+        assert rollups.compact(connection, horizon=timedelta(0)) == 2
+
+    add(app_module, [dict(row) for row in ROWS[2:]])
+
+    with engine.begin() as connection:
+        assert rollups.compact(connection, horizon=timedelta(0)) == 2
+
+    with engine.connect() as connection:
+        kpis = rollups.load_kpis(connection)
+        expected = raw_kpis(connection)
+
+    assert kpis.keys() == expected.keys()
+    for key, value in expected.items():
+        assert kpis[key] == pytest.approx(value), key
+
+    with engine.connect() as connection:
+        assert rollups.load_material_counts(connection) == [("Cardboard", 2), ("Foam", 1)]
+
+
+def test_compact_waits_out_the_horizon(app_module, engine):
+    add(app_module, [dict(ROWS[0])])
+    add(app_module, [dict(ROWS[2])], age=timedelta(0))
+
+    with engine.begin() as connection:
+        assert rollups.compact(connection, horizon=timedelta(minutes=5)) == 1
+
+    with engine.connect() as connection:
+        assert rollups.load_kpis(connection)["records"] == 1
+        assert rollups.data_version(connection) == 1
+
+
+def test_outdated_rollup_table_is_rebuilt(app_module, engine):
+    add(app_module, [dict(row) for row in ROWS])
+
+    # material_rollup as created before the per-measure counts existed
+    rollups.metadata.drop_all(engine)
+    old = MetaData()
+    Table("material_rollup", old, Column("best_material", String(200), primary_key=True),
+          Column("usage_count", Integer, nullable=False))
+    old.tables["material_rollup"].create(engine)
+    rollups.rollup_watermark.create(engine)
+
+    with engine.begin() as connection:
+        connection.execute(rollups.rollup_watermark.insert().values(
+            name=rollups.WATERMARK, last_id=4))
+
+    with engine.begin() as connection:
+        rollups.create_tables(connection)
+        assert rollups.compact(connection, horizon=timedelta(0)) == 4
+
+    with engine.connect() as connection:
+        assert rollups.load_kpis(connection)["avg_cost"] == pytest.approx(5.0)
+
+
+def test_dashboard_compacts_at_most_once_per_horizon(app_module, engine, monkeypatch):
+    calls = []
+    compact = rollups.compact
+
+    def counted(connection, horizon=rollups.SAFETY_HORIZON):
+        calls.append(horizon)
+        return compact(connection, horizon)
+
+    monkeypatch.setattr(rollups, "compact", counted)
+    add(app_module, [dict(row) for row in ROWS], age=timedelta(hours=1))
+
+    client = app_module.app.test_client()
+    for _ in range(3):
+        assert client.get("/dashboard").status_code == 200
+
+    assert len(calls) == 1
+
+    # Once the horizon has passed the next view folds new rows in again
+    dashboard._rollups_refreshed_at -= rollups.SAFETY_HORIZON.total_seconds()
+    assert client.get("/dashboard").status_code == 200
+    assert len(calls) == 2
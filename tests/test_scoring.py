@@ -0,0 +1,314 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from material_store import DEFAULT_SOURCE
+from scoring import TOPK_SCAN_LIMIT, MaterialFilter, ScoringEngine, pareto_front
+
+# ==============================
+# SCORING ENGINE VS THE ORIGINAL LOOP
+# ==============================
+#
+# The oracle is the per-row loop home() ran before the engine existed
+# (max cost / CO2 over the whole table, rows without a strength skipped,
+# Python round(), stable sort on the score). Every vectorized path must
+# return exactly its rows, in its order. The synthetic catalog is larger
+# than TOPK_SCAN_LIMIT, so top_k() walks instead of scanning, and a third
+# of its rows are exact copies, so ties are common.
+
+SHIPMENTS = [(0.05, "L"), (0.5, "M"), (3, "H"), (12.5, "M"), (40, "H"), (400, "L"), (7, "?")]
+
+FILTERS = [
+    MaterialFilter(excluded_categories=("Metal", "Glass")),
+    MaterialFilter(categories=("Paper", "Wood"), biodegradable=True),
+    MaterialFilter(biodegradable=False, max_cost=2.5),
+    MaterialFilter(max_cost=1.47, max_co2=0.449),
+    MaterialFilter(categories=("Wood",), max_density=700.0),
+    MaterialFilter(max_cost=0.0),
+    MaterialFilter(categories=("Unobtainium",))
+]
+
+
+def scalar_ranking(df, weight, units, fragility, keep=None):
+    max_cost = float(df["Cost_per_kg"].max())
+    max_co2 = float(df["CO2_Emission_kg"].max())
+
+    fragility_factor = {"L": 1, "M": 1.5, "H": 2}
+    f_factor = fragility_factor.get(fragility, 1)
+
+    results = []
+
+    for row in df.to_dict("records"):
+
+        if pd.isna(row["Tensile_Strength_MPa"]) or (keep is not None and not keep(row)):
+            continue
+
+        material_strength = float(row["Tensile_Strength_MPa"])
+        required_strength = weight * 5 * f_factor
+
+        strength_score = min(material_strength / required_strength, 1)
+
+        eco_score = 1 - (float(row["CO2_Emission_kg"]) / max_co2)
+        cost_score = 1 - (float(row["Cost_per_kg"]) / max_cost)
+        biodeg_score = 1 if row["Biodegradable"] == "Yes" else 0.5
+
+        sustainability_score = float(round(
+            (eco_score * 0.3 +
+             cost_score * 0.25 +
+             biodeg_score * 0.2 +
+             strength_score * 0.25) * 100, 2))
+
+        total_cost = float(round(float(row["Cost_per_kg"]) * weight * units, 2))
+        total_co2 = float(round(float(row["CO2_Emission_kg"]) * weight * units, 2))
+
+        reasons = []
+
+        if row["Biodegradable"] == "Yes":
+            reasons.append("Biodegradable and eco-friendly")
+
+        if eco_score > 0.7:
+            reasons.append("Very low carbon footprint")
+
+        if cost_score > 0.7:
+            reasons.append("Cost efficient option")
+
+        if strength_score > 0.8:
+            reasons.append("High structural strength")
+
+        if sustainability_score > 85:
+            reasons.append("Excellent sustainability performance")
+
+        if not reasons:
+            reasons.append("Balanced cost, strength and environmental impact")
+
+        results.append({
+            "Material": str(row["Material_Name"]),
+            "Total_Cost": total_cost,
+            "Total_CO2": total_co2,
+            "Strength": material_strength,
+            "Score": sustainability_score,
+            "Reasons": ", ".join(reasons)
+        })
+
+    return sorted(results, key=lambda x: x["Score"], reverse=True)
+
+
+def allows(material_filter):
+    f = material_filter
+
+    def keep(row):
+        return ((not f.categories or row["Category"] in f.categories)
+                and row["Category"] not in f.excluded_categories
+                and (f.biodegradable is None or (row["Biodegradable"] == "Yes") == f.biodegradable)
+                and (f.max_cost is None or row["Cost_per_kg"] <= f.max_cost)
+                and (f.max_co2 is None or row["CO2_Emission_kg"] <= f.max_co2)
+                and (f.max_density is None or row["Density_kg_m3"] <= f.max_density))
+
+    return keep
+
+
+def names(engine, indices):
+    return [str(engine.names[i]) for i in indices]
+
+
+@pytest.fixture(scope="module", params=["real", "synthetic"])
+def catalog(request):
+    df = pd.read_csv(DEFAULT_SOURCE)
+
+    if request.param == "real":
+        # One material without a strength, which the loop skipped
+        df.loc[17, "Tensile_Strength_MPa"] = np.nan
+    else:
+        rng = np.random.default_rng(3)
+        rows = 3 * TOPK_SCAN_LIMIT
+
+        df = df.sample(rows, replace=True, random_state=3).reset_index(drop=True)
+        df = df.astype({"Density_kg_m3": "float64"})
+        jitter = rng.random(rows) < 2 / 3
+
+        for column in ("Cost_per_kg", "CO2_Emission_kg", "Density_kg_m3"):
+            df.loc[jitter, column] = (df.loc[jitter, column]
+                                      * rng.uniform(0.8, 1.2, jitter.sum())).round(3)
+
+        df["Material_Name"] = df["Material_Name"] + " #" + df.index.astype(str)
+
+    return df, ScoringEngine.from_dataframe(df)
+
+
+# ==============================
+# RANKINGS
+# ==============================
+
+@pytest.mark.parametrize("weight, fragility", SHIPMENTS)
+def test_rank_matches_scalar_loop(catalog, weight, fragility):
+    df, engine = catalog
+    expected = scalar_ranking(df, weight, 3, fragility)
+
+    for k in (1, 5, 20):
+        assert engine.rank(weight, 3, fragility, k) == expected[:k]
+
+
+@pytest.mark.parametrize("weight, fragility", SHIPMENTS)
+def test_top_k_matches_scalar_loop(catalog, weight, fragility):
+    df, engine = catalog
+    expected = scalar_ranking(df, weight, 1, fragility)
+
+    for k in (1, 5, 20):
+        indices, _, scores = engine.top_k(weight, fragility, k)
+
+        assert names(engine, indices) == [row["Material"] for row in expected[:k]]
+        assert scores.tolist() == [row["Score"] for row in expected[:k]]
+
+
+def test_rank_batch_matches_scalar_loop(catalog):
+    df, engine = catalog
+    weights = np.array([weight for weight, _ in SHIPMENTS])
+    units = np.arange(1, len(SHIPMENTS) + 1)
+    fragilities = [fragility for _, fragility in SHIPMENTS]
+
+    results = engine.rank_batch(weights, units, fragilities, k=5)
+
+    for row, (weight, fragility) in enumerate(SHIPMENTS):
+        assert results[row] == scalar_ranking(df, weight, int(units[row]), fragility)[:5]
+
+
+@pytest.mark.parametrize("material_filter", FILTERS)
+def test_filtered_rank_matches_scalar_loop(catalog, material_filter):
+    df, engine = catalog
+
+    for weight, fragility in ((0.5, "L"), (40, "H")):
+        expected = scalar_ranking(df, weight, 2, fragility, allows(material_filter))
+
+        assert engine.rank(weight, 2, fragility, 5, material_filter=material_filter) == expected[:5]
+        assert engine.rank_batch(np.array([weight]), np.array([2]), [fragility], 5,
+                                 material_filter=material_filter) == [expected[:5]]
+
+
+# ==============================
+# FILTER MEMBERS
+# ==============================
+
+def test_members_match_brute_force(catalog):
+    _, engine = catalog
+    assert engine.members(None) is None
+
+    # Bounds on, between and outside the bucket edges and the catalog values
+    bounds = {name: np.concatenate((getattr(engine, f"{name}_edges"),
+                                    np.quantile(getattr(engine, name), [0, 0.13, 0.5, 0.77, 1]),
+                                    [-1.0, 1e9]))
+              for name in ("cost", "co2", "density")}
+
+    filters = FILTERS + [MaterialFilter(**{f"max_{name}": float(bound)})
+                         for name, values in bounds.items() for bound in values]
+
+    for material_filter in filters:
+        f = material_filter
+        expected = np.ones(len(engine), dtype=bool)
+
+        if f.categories:
+            expected &= np.isin(engine.category, f.categories)
+        expected &= ~np.isin(engine.category, f.excluded_categories)
+        if f.biodegradable is not None:
+            expected &= engine.biodegradable == f.biodegradable
+        for name, bound in (("cost", f.max_cost), ("co2", f.max_co2), ("density", f.max_density)):
+            if bound is not None:
+                expected &= getattr(engine, name) <= bound
+
+        members = engine.member_set(material_filter)
+
+        assert engine.members(material_filter).tolist() == expected.tolist(), material_filter
+        assert members.indices.tolist() == np.flatnonzero(expected).tolist()
+        assert set(members.static_order.tolist()) == set(members.indices.tolist())
+
+
+# ==============================
+# PARETO FRONT
+# ==============================
+
+def brute_force_front(cost, co2, strength):
+    front = []
+
+    for i in range(len(cost)):
+        if np.isnan(cost[i]) or np.isnan(co2[i]) or np.isnan(strength[i]):
+            continue
+
+        dominated = False
+        for j in range(len(cost)):
+            at_least = cost[j] <= cost[i] and co2[j] <= co2[i] and strength[j] >= strength[i]
+            better = cost[j] < cost[i] or co2[j] < co2[i] or strength[j] > strength[i]
+            if at_least and better:
+                dominated = True
+                break
+
+        if not dominated:
+            front.append(i)
+
+    return sorted(front, key=lambda i: (-strength[i], cost[i], co2[i], i))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_pareto_front_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n = 300
+
+    # Few distinct values, so ties and duplicate points are common
+    cost = rng.integers(0, 12, n).astype(np.float64)
+    co2 = rng.integers(0, 12, n).astype(np.float64)
+    strength = rng.integers(0, 12, n).astype(np.float64)
+    cost[rng.random(n) < 0.03] = np.nan
+    strength[rng.random(n) < 0.03] = np.nan
+
+    assert pareto_front(cost, co2, strength).tolist() == brute_force_front(cost, co2, strength)
+
+
+def test_pareto_empty():
+    assert pareto_front([], [], []).tolist() == []
+    assert pareto_front([np.nan], [1.0], [1.0]).tolist() == []
+
+
+def test_shipment_pareto_matches_brute_force():
+    df = pd.read_csv(DEFAULT_SOURCE)
+    engine = ScoringEngine.from_dataframe(df)
+
+    for weight, fragility in ((0.5, "L"), (2, "M"), (5, "H")):
+        required = weight * 5 * {"L": 1, "M": 1.5, "H": 2}[fragility]
+        strong = np.flatnonzero(engine.strength >= required)
+        front = strong[brute_force_front(engine.cost[strong], engine.co2[strong],
+                                         engine.strength[strong])]
+
+        assert ([row["Material"] for row in engine.pareto(weight, 10, fragility)]
+                == names(engine, front))
+
+
+# ==============================
+# WEIGHT SWEEP
+# ==============================
+
+@pytest.mark.parametrize("fragility, min_weight, max_weight", [("M", 0.5, 60.0), ("H", 0.02, 4.0)])
+def test_weight_sweep_matches_scalar_loop(fragility, min_weight, max_weight):
+    df = pd.read_csv(DEFAULT_SOURCE)
+    engine = ScoringEngine.from_dataframe(df)
+
+    breakpoints, intervals = engine.weight_sweep(fragility, min_weight, max_weight, k=5)
+
+    assert intervals[0][0] == min_weight
+    assert intervals[-1][1] == max_weight
+    assert breakpoints == [start for start, _, _ in intervals[1:]]
+
+    for (_, end, before), (start, _, after) in zip(intervals, intervals[1:]):
+        assert end == start
+        assert before.tolist() != after.tolist()
+
+    # The ranking holds throughout every interval: a missed breakpoint
+    # would show up as a point that ranks differently
+    for start, end, indices in intervals:
+        for t in (0.25, 0.5, 0.75):
+            weight = start * (end / start) ** t
+            expected = [row["Material"] for row in scalar_ranking(df, weight, 1, fragility)[:5]]
+
+            assert names(engine, indices) == expected, weight
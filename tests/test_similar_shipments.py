@@ -0,0 +1,118 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from similar_shipments import (CURRENT_FILE, MODE_FEATURE, NUMERIC_FEATURES, HistoryUnavailable,
+                               ShipmentIndex, ShipmentIndexStore, _raw_features)
+
+# ==============================
+# SIMILAR SHIPMENTS INDEX
+# ==============================
+
+MODES = ["Air", "Road", "Sea"]
+
+
+def history(rows, seed=0, first_id=1):
+    rng = np.random.default_rng(seed)
+
+    return pd.DataFrame({
+        "Order_ID": np.arange(first_id, first_id + rows),
+        "Date": pd.date_range("2024-01-01", periods=rows, freq="h").astype(str),
+        "Item_Name": rng.choice(["Mug", "Lamp", "Book"], rows),
+        "Category": rng.choice(["Home", "Media"], rows),
+        "Weight_kg": rng.lognormal(0, 1, rows).round(3),
+        "L_cm": rng.integers(5, 120, rows),
+        "W_cm": rng.integers(5, 80, rows),
+        "H_cm": rng.integers(2, 60, rows),
+        "Fragility": rng.integers(1, 11, rows),
+        "Moisture_Sens": rng.random(rows) < 0.3,
+        "Shipping_Mode": rng.choice(MODES, rows),
+        "Distance_km": rng.integers(10, 5000, rows),
+        "Packaging_Used": rng.choice(["Box", "Bubble Wrap", "Crate"], rows),
+        "Cost_USD": rng.uniform(1, 50, rows).round(2),
+        "CO2_Emission_kg": rng.uniform(0.1, 9, rows).round(3)
+    })
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "history.csv"
+    history(500).to_csv(path, index=False)
+
+    return ShipmentIndexStore(str(path), str(tmp_path / "index"), check_interval=0)
+
+
+def append(store, rows, seed):
+    frame = pd.read_csv(store.history_path)
+    more = history(rows, seed, first_id=int(frame["Order_ID"].max()) + 1)
+    more.to_csv(store.history_path, mode="a", header=False, index=False)
+
+
+def published(store):
+    return sorted(name for name in os.listdir(store.root) if not name.startswith("."))
+
+
+def test_query_matches_brute_force(store):
+    frame = pd.read_csv(store.history_path)
+    index = ShipmentIndex.build(frame)
+
+    raw = _raw_features(frame)
+    points = np.hstack([(raw - index.mean) / index.scale,
+                        (frame[MODE_FEATURE].to_numpy()[:, None] == np.array(MODES)).astype(float)])
+
+    for seed in range(5):
+        shipment = history(1, seed=100 + seed).iloc[0].to_dict()
+        distances = np.linalg.norm(points - index.point(shipment), axis=1)
+        expected = np.argsort(distances, kind="stable")[:5]
+
+        results = index.query(shipment, k=5)
+
+        assert [row["Order_ID"] for row in results] == frame["Order_ID"][expected].tolist()
+        assert [row["Distance"] for row in results] == [round(d, 4) for d in distances[expected]]
+        assert set(results[0]) >= set(NUMERIC_FEATURES)
+
+
+def test_get_never_builds(store):
+    with pytest.raises(HistoryUnavailable):
+        store.get()
+
+    assert not os.path.exists(store.root)
+
+
+def test_get_serves_published_index_until_a_new_one_is(store):
+    store.compile()
+    old = store.get()
+    assert len(old) == 500
+
+    # The history grew, but nothing has published its index yet
+    append(store, 20, seed=1)
+    assert store.get() is old
+
+    store.compile()
+    new = store.get()
+
+    assert len(new) == 520
+    assert new.version == store.current_version() != old.version
+
+
+def test_compile_prunes_only_older_indexes(store):
+    versions = []
+
+    for seed in range(4):
+        append(store, 10, seed=seed + 1)
+        store.compile(keep=2)
+        versions.append(store.current_version())
+
+    # The published index and the one before it
+    assert published(store) == sorted([CURRENT_FILE] + versions[-2:])
+
+    # An index newer than the published one (another builder about to
+    # publish it) is never removed
+    os.utime(os.path.join(store.root, versions[-1]), (0, 0))
+    store.prune(keep=1)
+    assert published(store) == sorted([CURRENT_FILE] + versions[-2:])
@@ -0,0 +1,101 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tree_models import DEFAULT_MODEL_DIR, CompiledForest, compile_pickle, compiled_path, load_model
+
+joblib = pytest.importorskip("joblib")
+
+# ==============================
+# COMPILED FORESTS VS THE PICKLES
+# ==============================
+#
+# RandomForest leaves are averaged exactly as sklearn does, so those
+# predictions must match bit for bit. XGBoost sums its leaves in float32
+# internally; the float64 sum here may differ in the last places.
+
+XGB_TOLERANCE = 1.5e-5
+
+
+def copy_model(tmp_path, name):
+    path = tmp_path / name
+    shutil.copy(os.path.join(DEFAULT_MODEL_DIR, name), path)
+    return str(path)
+
+
+def inputs(n_features, seed=0, nan=False):
+    rng = np.random.default_rng(seed)
+    X = np.vstack([rng.normal(0, 1.5, (500, n_features)),
+                   rng.normal(0, 10, (100, n_features))])
+
+    if nan:
+        X[rng.random(X.shape) < 0.15] = np.nan
+
+    return X
+
+
+def test_xgboost_regressor_matches_the_pickle(tmp_path):
+    pytest.importorskip("xgboost")
+    path = copy_model(tmp_path, "co2_model.pkl")
+
+    model = joblib.load(path)
+    compiled = CompiledForest.load(compile_pickle(path))
+
+    for X in (inputs(3), inputs(3, seed=1, nan=True)):
+        np.testing.assert_allclose(compiled.predict(X), model.predict(X),
+                                   rtol=0, atol=XGB_TOLERANCE)
+
+    # One row at a time, the serving path it is built for
+    np.testing.assert_allclose(compiled.predict(X[0]), model.predict(X[:1]),
+                               rtol=0, atol=XGB_TOLERANCE)
+
+
+def test_random_forest_classifier_matches_the_pickle(tmp_path):
+    path = copy_model(tmp_path, "material_recommendation_model.pkl")
+
+    model = joblib.load(path)
+    compiled = CompiledForest.load(compile_pickle(path))
+    X = inputs(3)
+
+    np.testing.assert_array_equal(compiled.predict_proba(X), model.predict_proba(X))
+    np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+
+
+def test_random_forest_regressor_with_missing_values(tmp_path):
+    ensemble = pytest.importorskip("sklearn.ensemble")
+
+    X = inputs(4, seed=2, nan=True)
+    y = np.nan_to_num(X[:, 0]) * 2 + np.nan_to_num(X[:, 1] ** 2)
+    model = ensemble.RandomForestRegressor(n_estimators=8, max_depth=6, random_state=0).fit(X, y)
+
+    path = str(tmp_path / "regressor_model.pkl")
+    joblib.dump(model, path)
+    compiled = CompiledForest.load(compile_pickle(path))
+
+    for X in (inputs(4, seed=3), inputs(4, seed=4, nan=True)):
+        np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+
+
+def test_stale_export_falls_back_to_the_pickle(tmp_path):
+    ensemble = pytest.importorskip("sklearn.ensemble")
+
+    path = str(tmp_path / "regressor_model.pkl")
+    X = inputs(2)
+
+    joblib.dump(ensemble.RandomForestRegressor(n_estimators=3, random_state=0).fit(X, X[:, 0]), path)
+    compile_pickle(path)
+    assert isinstance(load_model(path), CompiledForest)
+
+    # The pickle is retrained after its export was compiled
+    retrained = ensemble.RandomForestRegressor(n_estimators=3, random_state=1).fit(X, X[:, 1])
+    joblib.dump(retrained, path)
+
+    assert not isinstance(load_model(path), CompiledForest)
+
+    assert compile_pickle(path) == compiled_path(path)
+    np.testing.assert_array_equal(load_model(path).predict(X), retrained.predict(X))
@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, select
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from write_behind import WriteBehindQueue
+
+# ==============================
+# WRITE-BEHIND QUEUE ON SQLITE
+# ==============================
+
+
+@pytest.fixture
+def store(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'write_behind.db'}"
+    db = SQLAlchemy()
+    db.init_app(app)
+
+    class Row(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        item = db.Column(db.String(100), nullable=False)
+
+    with app.app_context():
+        db.create_all()
+
+    def items():
+        with app.app_context():
+            return db.session.execute(select(Row.item).order_by(Row.id)).scalars().all()
+
+    return app, db, Row, items
+
+
+def rows(*items):
+    return [{"item": item} for item in items]
+
+
+def test_flush_writes_one_batch(store):
+    app, db, Row, items = store
+    queue = WriteBehindQueue(app, db, Row, batch_size=3)
+
+    queue.submit_many(rows("a", "b", "c", "d"))
+
+    assert queue.flush() == 3
+    assert queue.flush() == 1
+    assert items() == ["a", "b", "c", "d"]
+    assert queue.stats()["flushes"] == 2
+
+
+def test_rejected_rows_do_not_block_the_rest(store):
+    app, db, Row, items = store
+    queue = WriteBehindQueue(app, db, Row, batch_size=100)
+
+    # item is NOT NULL: these two rows can never be inserted
+    batch = rows(*"abcdefg")
+    batch[2]["item"] = None
+    batch[5]["item"] = None
+    queue.submit_many(batch + rows("h"))
+
+    assert queue.flush() == 6
+    assert items() == ["a", "b", "d", "e", "g", "h"]
+    assert queue.depth() == 0
+    assert queue.stats()["rejected_rows"] == 2
+
+
+def test_outage_keeps_rows_for_next_flush(store):
+    app, db, Row, items = store
+    queue = WriteBehindQueue(app, db, Row)
+
+    with app.app_context():
+        Row.__table__.drop(db.engine)
+
+    queue.submit_many(rows("a", "b"))
+
+    assert queue.flush() == 0
+    assert queue.depth() == 2
+    assert queue.stats()["rejected_rows"] == 0
+
+    with app.app_context():
+        db.create_all()
+
+    assert queue.flush() == 2
+    assert items() == ["a", "b"]
+
+
+def test_submit_drops_instead_of_blocking_when_full(store):
+    app, db, Row, items = store
+    queue = WriteBehindQueue(app, db, Row, max_queue=2)
+
+    started = time.perf_counter()
+    queue.submit_many(rows("a", "b", "c", "d"))
+
+    assert time.perf_counter() - started < 1
+    assert queue.stats()["dropped_rows"] == 2
+    assert queue.flush() == 2
+    assert items() == ["a", "b"]
+
+
+def test_stop_drains_the_queue(store):
+    app, db, Row, items = store
+    queue = WriteBehindQueue(app, db, Row, batch_size=2, flush_interval=60).start()
+
+    queue.submit_many(rows("a", "b", "c", "d", "e"))
+    queue.stop()
+
+    assert sorted(items()) == ["a", "b", "c", "d", "e"]
+    assert queue.depth() == 0
+
+    with app.app_context():
+        assert db.session.execute(select(func.count()).select_from(Row)).scalar() == 5
@@ -0,0 +1,362 @@
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from file_utils import file_hash, publish_snapshot
+
+# ==============================
+# COMPILED TREE ENSEMBLES
+# ==============================
+#
+# The RandomForest / XGBoost pickles in models/ are flattened into plain
+# arrays, one directory per model:
+#
+#   <dir>/feature.npy    int32   split feature per node (-1 on leaves)
+#   <dir>/threshold.npy  float   split value per node
+#   <dir>/left.npy       int32   global index of the left child
+#   <dir>/right.npy      int32   global index of the right child
+#   <dir>/missing_left.npy bool  where NaN goes (XGBoost default_left)
+#   <dir>/value.npy      float   leaf output per node, (nodes, outputs)
+#   <dir>/roots.npy      int32   root node of every tree
+#   <dir>/meta.json      kind, comparison, base score, classes, source hash
+#
+# Loading them is a handful of mmaps instead of an unpickle, and
+# CompiledForest evaluates every tree of a batch at once with NumPy, which
+# avoids the per-call overhead of predict() on one or a few rows. Large
+# batches (thousands of rows) are still faster through the native
+# predict(); benchmarks/tree_inference.py shows where the two cross.
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+DEFAULT_MODEL_DIR = os.path.join(BASE_DIR, "models")
+COMPILED_DIR = "compiled"
+
+ARRAYS = ("feature", "threshold", "left", "right", "missing_left", "value", "roots")
+META_FILE = "meta.json"
+
+# Rows evaluated together; bounds the (rows x trees) index arrays
+EVAL_CHUNK_ROWS = 65_536
+
+
+# ==============================
+# EXPORT
+# ==============================
+
+def _flatten(trees):
+    # trees: per-tree dicts of feature/threshold/left/right/missing_left/value
+    # with tree-local child indices, -1 marking a leaf
+    arrays = {name: [] for name in ARRAYS if name != "roots"}
+    roots = []
+    offset = 0
+    max_depth = 0
+
+    for tree in trees:
+        n = len(tree["feature"])
+        local = np.arange(n)
+        leaf = tree["left"] < 0
+
+        roots.append(offset)
+        arrays["feature"].append(np.where(leaf, -1, tree["feature"]))
+        arrays["threshold"].append(np.where(leaf, 0.0, tree["threshold"]))
+        arrays["left"].append(np.where(leaf, local, tree["left"]) + offset)
+        arrays["right"].append(np.where(leaf, local, tree["right"]) + offset)
+        arrays["missing_left"].append(tree["missing_left"])
+        arrays["value"].append(tree["value"])
+
+        depth = np.zeros(n, dtype=np.int64)
+        for node in range(n):
+            if not leaf[node]:
+                depth[tree["left"][node]] = depth[node] + 1
+                depth[tree["right"][node]] = depth[node] + 1
+        max_depth = max(max_depth, int(depth.max()))
+
+        offset += n
+
+    flat = {
+        "feature": np.concatenate(arrays["feature"]).astype(np.int32),
+        "left": np.concatenate(arrays["left"]).astype(np.int32),
+        "right": np.concatenate(arrays["right"]).astype(np.int32),
+        "missing_left": np.concatenate(arrays["missing_left"]).astype(bool),
+        "value": np.concatenate(arrays["value"]).astype(np.float64),
+        "roots": np.asarray(roots, dtype=np.int32)
+    }
+    thresholds = np.concatenate(arrays["threshold"])
+
+    return flat, thresholds, max_depth
+
+
+def _export_sklearn(model):
+    classes = getattr(model, "classes_", None)
+    trees = []
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :]
+
+        if classes is not None:
+            # Per-leaf class probabilities, as predict_proba averages them
+            totals = value.sum(axis=1, keepdims=True)
+            value = np.divide(value, totals, out=np.zeros_like(value), where=totals > 0)
+
+        trees.append({
+            "feature": tree.feature,
+            "threshold": tree.threshold,
+            "left": tree.children_left,
+            "right": tree.children_right,
+            "missing_left": tree.missing_go_to_left.astype(bool)
+            if hasattr(tree, "missing_go_to_left") else np.zeros(tree.node_count, dtype=bool),
+            "value": value
+        })
+
+    arrays, thresholds, max_depth = _flatten(trees)
+    # sklearn casts X to float32 and tests x <= threshold (a float64)
+    arrays["threshold"] = thresholds.astype(np.float64)
+
+    meta = {
+        "kind": "classifier" if classes is not None else "regressor",
+        "comparison": "le",
+        "input_dtype": "float32",
+        "aggregate": "mean",
+        "base_score": 0.0,
+        "max_depth": max_depth,
+        "n_features": int(model.n_features_in_),
+        "classes": classes.tolist() if classes is not None else None
+    }
+
+    return arrays, meta
+
+
+def _export_xgboost(model):
+    config = json.loads(model.get_booster().save_raw("json"))
+    learner = config["learner"]
+
+    if learner["gradient_booster"]["name"] != "gbtree":
+        raise ValueError("only gbtree boosters can be compiled")
+    if learner["objective"]["name"] != "reg:squarederror":
+        raise ValueError(f"unsupported objective {learner['objective']['name']}")
+
+    trees = []
+
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        if any(tree["split_type"]):
+            raise ValueError("categorical splits are not supported")
+
+        left = np.asarray(tree["left_children"])
+        trees.append({
+            "feature": np.asarray(tree["split_indices"]),
+            "threshold": np.asarray(tree["split_conditions"], dtype=np.float32),
+            "left": left,
+            "right": np.asarray(tree["right_children"]),
+            "missing_left": np.asarray(tree["default_left"], dtype=bool),
+            # Leaves keep their (already shrunk) weight in split_conditions
+            "value": np.where(left < 0, np.asarray(tree["split_conditions"]), 0.0)[:, None]
+        })
+
+    arrays, thresholds, max_depth = _flatten(trees)
+    # XGBoost tests float32(x) < split in single precision
+    arrays["threshold"] = thresholds.astype(np.float32)
+
+    base_score = learner["learner_model_param"]["base_score"].strip("[]")
+
+    meta = {
+        "kind": "regressor",
+        "comparison": "lt",
+        "input_dtype": "float32",
+        "aggregate": "sum",
+        "base_score": float(base_score),
+        "max_depth": max_depth,
+        "n_features": int(learner["learner_model_param"]["num_feature"]),
+        "classes": None
+    }
+
+    return arrays, meta
+
+
+def export_model(model):
+    """(arrays, meta) for a fitted RandomForest* or XGBRegressor."""
+    if hasattr(model, "get_booster"):
+        return _export_xgboost(model)
+    if hasattr(model, "estimators_"):
+        return _export_sklearn(model)
+
+    raise TypeError(f"cannot compile {type(model).__name__}")
+
+
+def compiled_path(pickle_path):
+    directory, name = os.path.split(pickle_path)
+    return os.path.join(directory, COMPILED_DIR, os.path.splitext(name)[0])
+
+
+def compile_pickle(pickle_path, target=None):
+    import joblib
+
+    target = target or compiled_path(pickle_path)
+    source_hash = file_hash(pickle_path)
+
+    if is_current(target, pickle_path, source_hash):
+        return target
+
+    arrays, meta = export_model(joblib.load(pickle_path))
+
+    parent = os.path.dirname(target)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=parent)
+
+    for name, values in arrays.items():
+        np.save(os.path.join(staging, f"{name}.npy"), values)
+
+    with open(os.path.join(staging, META_FILE), "w") as f:
+        json.dump({
+            **meta,
+            "source": os.path.basename(pickle_path),
+            "source_sha256": source_hash,
+            "created_at": time.time()
+        }, f, indent=2)
+
+    # Replace a stale export
+    publish_snapshot(staging, target, replace=True)
+
+    return target
+
+
+def is_current(target, pickle_path, source_hash=None):
+    try:
+        with open(os.path.join(target, META_FILE)) as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return False
+
+    return meta.get("source_sha256") == (source_hash or file_hash(pickle_path))
+
+
+# ==============================
+# EVALUATION
+# ==============================
+
+class CompiledForest:
+    """Vectorized predict over a flattened forest."""
+
+    def __init__(self, arrays, meta):
+        for name in ARRAYS:
+            # Plain ndarray views; indexing a memmap object is much slower
+            setattr(self, name, np.asarray(arrays[name]))
+
+        self.meta = meta
+        self.kind = meta["kind"]
+        self.classes = np.asarray(meta["classes"]) if meta["classes"] is not None else None
+        self.base_score = meta["base_score"]
+        self.max_depth = meta["max_depth"]
+        self.n_features = meta["n_features"]
+
+        self._input_dtype = np.dtype(meta["input_dtype"])
+        self._go_left = np.less if meta["comparison"] == "lt" else np.less_equal
+
+        # Inputs are rounded to the model's input dtype first, so comparing
+        # in float64 gives the same branch as the original in either case.
+        self._threshold = self.threshold.astype(np.float64)
+        # children[2 * node] is the left child, children[2 * node + 1] the right
+        self._children = np.stack([self.left, self.right], axis=1).ravel()
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                  for name in ARRAYS}
+
+        return cls(arrays, meta)
+
+    def _leaves(self, X):
+        n_trees = len(self.roots)
+        node = np.tile(self.roots.astype(np.intp), len(X))
+        # Offset of each (row, tree) pair's row in the flattened X
+        base = np.repeat(np.arange(len(X)) * self.n_features, n_trees)
+        values = X.ravel()
+        has_nan = np.isnan(values).any()
+
+        # Only (row, tree) pairs still at a split move on each step
+        active = np.flatnonzero(self.feature[node] >= 0)
+
+        while len(active):
+            current = node[active]
+            x = values[base[active] + self.feature[current]]
+            right = ~self._go_left(x, self._threshold[current])
+
+            if has_nan:
+                missing = np.isnan(x)
+                right[missing] = ~self.missing_left[current[missing]]
+
+            current = self._children[2 * current + right]
+            node[active] = current
+            active = active[self.feature[current] >= 0]
+
+        return node.reshape(len(X), n_trees)
+
+    def _raw(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"expected {self.n_features} features, got {X.shape[1]}")
+
+        X = X.astype(self._input_dtype).astype(np.float64)
+        out = np.empty((len(X), self.value.shape[1]))
+
+        for start in range(0, len(X), EVAL_CHUNK_ROWS):
+            chunk = X[start:start + EVAL_CHUNK_ROWS]
+            values = self.value[self._leaves(chunk)]
+
+            if self.meta["aggregate"] == "sum":
+                out[start:start + len(chunk)] = values.sum(axis=1) + self.base_score
+            else:
+                # Tree by tree, then divided, in sklearn's order: mean()'s
+                # pairwise sum can differ from it in the last bit
+                total = np.zeros((len(chunk), values.shape[2]))
+                for tree in range(values.shape[1]):
+                    total += values[:, tree]
+                out[start:start + len(chunk)] = total / values.shape[1]
+
+        return out
+
+    def predict_proba(self, X):
+        if self.kind != "classifier":
+            raise TypeError("predict_proba needs a classifier")
+        return self._raw(X)
+
+    def predict(self, X):
+        raw = self._raw(X)
+
+        if self.kind == "classifier":
+            return self.classes[raw.argmax(axis=1)]
+
+        return raw[:, 0]
+
+
+def load_model(pickle_path):
+    """CompiledForest for ``pickle_path`` when its export is current, else
+    the unpickled model."""
+    target = compiled_path(pickle_path)
+
+    if is_current(target, pickle_path):
+        return CompiledForest.load(target)
+
+    import joblib
+    return joblib.load(pickle_path)
+
+
+# ==============================
+# CLI
+# ==============================
+
+if __name__ == "__main__":
+    model_dir = os.environ.get("ML_MODEL_DIR", DEFAULT_MODEL_DIR)
+    paths = sys.argv[1:] or sorted(glob.glob(os.path.join(model_dir, "*_model.pkl")))
+
+    for path in paths:
+        print(f"✅ {os.path.basename(path)} -> {compile_pickle(path)}")
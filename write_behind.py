@@ -0,0 +1,212 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+log = logging.getLogger(__name__)
+
+# ==============================
+# WRITE-BEHIND QUEUE
+# ==============================
+
+class WriteBehindQueue:
+    """Buffers rows for one model and inserts them in the background.
+
+    A batch is flushed once ``batch_size`` rows are waiting or the oldest
+    waiting row is ``flush_interval`` seconds old, whichever comes first,
+    with a single executemany INSERT. ``stop()`` (also registered with
+    atexit) drains whatever is still queued.
+
+    A batch the database rejects for its data (IntegrityError, DataError)
+    is split in halves until the offending rows are isolated; those are
+    logged and dropped so they cannot hold up the rows behind them. Any
+    other failure (database down) keeps the batch for the next flush.
+    ``submit()`` never blocks: when the queue is full the row is dropped
+    and counted instead of stalling the request thread.
+    """
+
+    def __init__(self, app, db, model, batch_size=500, flush_interval=1.0,
+                 max_queue=100_000):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = []
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.errors = 0
+        self.rejected_rows = 0
+        self.dropped_rows = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="write-behind",
+                                            daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+        return self
+
+    def submit(self, row):
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            # The database has been down long enough to fill the queue;
+            # losing the row beats blocking the request
+            self.dropped_rows += 1
+            if self.dropped_rows == 1 or self.dropped_rows % 1000 == 0:
+                log.warning("Write-behind queue full, %d rows dropped so far", self.dropped_rows)
+
+    def submit_many(self, rows):
+        for row in rows:
+            self.submit(row)
+
+    def depth(self):
+        with self._flush_lock:
+            return self._queue.qsize() + len(self._pending)
+
+    # ==============================
+    # FLUSHING
+    # ==============================
+
+    def _drain(self, limit):
+        rows = []
+
+        while len(rows) < limit:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return rows
+
+    def _insert(self, rows):
+        with self.app.app_context():
+            self.db.session.execute(insert(self.model), rows)
+            self.db.session.commit()
+
+    def flush(self):
+        """Insert the pending rows plus up to a batch from the queue;
+        returns the number of rows written."""
+        with self._flush_lock:
+            batch = self._pending + self._drain(self.batch_size - len(self._pending))
+            self._pending = []
+
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            written = 0
+            parts = [batch]
+
+            while parts:
+                rows = parts.pop()
+
+                try:
+                    self._insert(rows)
+                except (DataError, IntegrityError):
+                    self.errors += 1
+
+                    if len(rows) == 1:
+                        self.rejected_rows += 1
+                        log.exception("Write-behind dropped a row the database rejects: %r",
+                                      rows[0])
+                        continue
+
+                    # Retry each half; the first half goes first
+                    middle = len(rows) // 2
+                    parts += [rows[middle:], rows[:middle]]
+                    continue
+                except Exception:
+                    # Keep the rows not yet written and retry them with the
+                    # next flush
+                    self.errors += 1
+                    self._pending = rows + [row for part in reversed(parts) for row in part]
+                    log.exception("Write-behind flush of %d rows failed", len(self._pending))
+                    break
+
+                written += len(rows)
+
+            if not written:
+                return 0
+
+            elapsed = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.flushed_rows += written
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            self.total_flush_ms += elapsed
+
+            return written
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._pending:
+                    self.flush()
+                continue
+
+            with self._flush_lock:
+                self._pending.append(first)
+            deadline = time.monotonic() + self.flush_interval
+
+            # Wait for a full batch, but no longer than the flush interval
+            while (self.depth() < self.batch_size
+                   and time.monotonic() < deadline and not self._stop.is_set()):
+                time.sleep(min(0.01, self.flush_interval))
+
+            self.flush()
+            if self._pending:
+                self._stop.wait(self.flush_interval)
+
+    def stop(self, timeout=10.0):
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+        # Drain until empty, or until a flush makes no progress (database
+        # still down); rejected rows count as progress
+        while True:
+            before = self.depth()
+            if not before:
+                break
+
+            self.flush()
+            if self.depth() >= before:
+                break
+
+    # ==============================
+    # METRICS
+    # ==============================
+
+    def stats(self):
+        return {
+            "queue_depth": self.depth(),
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "errors": self.errors,
+            "rejected_rows": self.rejected_rows,
+            "dropped_rows": self.dropped_rows,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.flushes, 3) if self.flushes else 0.0
+        }